@@ -0,0 +1,103 @@
+"""
+Hot/cold split: moving finished rows to archive tables, and reading them back on request.
+
+Projects that ended and reviews approved long ago are rarely read, yet they would keep the
+hot tables, their indexes and the pages the database keeps cached growing forever.
+`projects.archival` and `performance.archival` move them, one short transaction per batch,
+to archive tables keeping their ids and field names: each table takes one `INSERT ... SELECT`
+and one `DELETE` per batch, and no row passes through Python. The moves bypass `save()` and
+`delete()`, so the counters and rollups, which count archived rows too, are left as they are.
+
+`ArchiveMixin` serves the archived rows again to `list` and `retrieve` with `?include_archived=true`.
+"""
+from contextlib import contextmanager
+
+from django.db import connection
+from django.http import Http404
+from django.utils.functional import cached_property
+from rest_framework import serializers
+
+ARCHIVE_BATCH_SIZE = 1000
+
+
+class ArchiveQuerySerializer(serializers.Serializer):
+    include_archived = serializers.BooleanField(default=False)
+
+
+def copy_rows(queryset, model, fields):
+    """
+    Inserts `fields` of every row of `queryset` into the table of `model`, which names its
+    fields alike, with one `INSERT ... SELECT`. Returns the number of rows copied.
+    """
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(model._meta.get_field(field).column) for field in fields)
+    select, params = queryset.order_by().values_list(*fields).query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'INSERT INTO {quote(model._meta.db_table)} ({columns}) {select}', params)
+        return cursor.rowcount
+
+
+def delete_rows(model, pks):
+    """Deletes the rows of `model` with the given primary keys in one statement, without signals."""
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {quote(model._meta.db_table)} WHERE {quote(model._meta.pk.column)} = ANY(%s)', [list(pks)],
+        )
+        return cursor.rowcount
+
+
+class ArchiveMixin:
+    """
+    Viewset mixin serving archived rows to `list` and `retrieve` given `?include_archived=true`.
+
+    `archive_queryset` is the base queryset of the archive, for a model with the field names
+    of the viewset's own, so the role scoping of `get_queryset` and the filters apply to it
+    unchanged. Lists merge a page from each table on the cursor ordering; a detail lookup
+    missing the hot table falls back to the archive. Writes only ever see the hot table.
+    Viewsets whose filters can ask for rows that only the archive holds override `archive_needed`.
+    """
+    archive_queryset = None
+    _reading_archive = False
+
+    @cached_property
+    def include_archived(self):
+        if self.action not in ('list', 'retrieve'):
+            return False
+        params = ArchiveQuerySerializer(data=self.request.query_params)
+        params.is_valid(raise_exception=True)
+        return params.validated_data['include_archived'] or self.archive_needed()
+
+    def archive_needed(self):
+        """Whether the request reaches rows that only the archive can hold, even without `?include_archived=true`."""
+        return False
+
+    @contextmanager
+    def reading_archive(self):
+        """Makes `get_queryset` start from `archive_queryset` for the duration of the block."""
+        self._reading_archive = True
+        try:
+            yield
+        finally:
+            self._reading_archive = False
+
+    def get_queryset(self):
+        if self._reading_archive:
+            return self.archive_queryset.all()
+        return super().get_queryset()
+
+    def paginate_queryset(self, queryset):
+        if not self.include_archived or self.paginator is None:
+            return super().paginate_queryset(queryset)
+        with self.reading_archive():
+            archived = self.filter_queryset(self.get_queryset())
+        return self.paginator.paginate_querysets([queryset, archived], self.request, view=self)
+
+    def get_object(self):
+        try:
+            return super().get_object()
+        except Http404:
+            if not self.include_archived:
+                raise
+        with self.reading_archive():
+            return super().get_object()
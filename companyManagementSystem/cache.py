@@ -0,0 +1,139 @@
+"""
+Versioned cache namespaces, hit/miss metrics and the response cache of read-mostly viewsets.
+
+Cached values are stored under keys that embed a version token: one per namespace (covering
+collections such as list pages) and one per object. Invalidating drops the tokens, so the
+next read mints new ones and every key built from the old tokens is simply never read again
+(the entries expire on their own). Tokens are dropped immediately and again once the
+current transaction commits, so a concurrent request cannot cache pre-commit data under the
+new token.
+"""
+import hashlib
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date
+from rest_framework.response import Response
+
+# Response headers stored with a cached body and replayed on hits.
+CACHED_HEADERS = ('ETag', 'Last-Modified', 'Cache-Control')
+
+# Namespaces whose hit/miss counters are reported by `cache_metrics()`.
+NAMESPACES = set()
+
+
+def _version_key(namespace, object_id=None):
+    suffix = '' if object_id is None else f':{object_id}'
+    return f'cache:{namespace}{suffix}:version'
+
+
+def namespace_version(namespace, object_id=None):
+    """Returns the current token of a namespace, or of one object in it."""
+    return cache.get_or_set(_version_key(namespace, object_id), lambda: uuid4().hex, None)
+
+
+def invalidate(namespace, *object_ids):
+    """Invalidates the collections of `namespace` and the given objects in it."""
+    keys = [_version_key(namespace)] + [_version_key(namespace, object_id) for object_id in set(object_ids)]
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys), robust=True)
+
+
+def model_namespace(model):
+    return model._meta.label_lower
+
+
+def record_lookup(namespace, hit):
+    """Counts a hit or a miss of `namespace`; the counters are shared by every process using the cache."""
+    key = f'cache:metrics:{namespace}:{"hits" if hit else "misses"}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+def cache_metrics():
+    """Returns `{namespace: {'hits': n, 'misses': n, 'hit_rate': ratio}}` for the registered namespaces."""
+    counts = cache.get_many([
+        f'cache:metrics:{namespace}:{kind}' for namespace in NAMESPACES for kind in ('hits', 'misses')
+    ])
+    metrics = {}
+    for namespace in sorted(NAMESPACES):
+        hits = counts.get(f'cache:metrics:{namespace}:hits', 0)
+        misses = counts.get(f'cache:metrics:{namespace}:misses', 0)
+        metrics[namespace] = {
+            'hits': hits, 'misses': misses, 'hit_rate': hits / (hits + misses) if hits + misses else None,
+        }
+    return metrics
+
+
+def reset_cache_metrics():
+    cache.delete_many([f'cache:metrics:{namespace}:{kind}' for namespace in NAMESPACES for kind in ('hits', 'misses')])
+
+
+class CachedResponseMixin:
+    """
+    Viewset mixin serving `list` and `retrieve` from the cache.
+
+    Keys combine the namespace token (or, for a detail, the object's token), the caller's
+    scope and the query string. Place it before `ConditionalMixin`, so a hit also answers
+    `If-None-Match` from the cached ETag without touching the database.
+
+    Models served this way must call `invalidate(model_namespace(Model), pk)` whenever a
+    rendered row changes; `organizations.signals` does so for companies and departments.
+    Hits skip `get_object`, so this suits viewsets whose object permissions follow from the
+    scope alone. Without a shared cache (`SHARED_CACHE`) other processes would never see the
+    invalidations, so responses are not cached at all.
+    """
+    cache_timeout = settings.RESPONSE_CACHE_TIMEOUT
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if getattr(cls, 'queryset', None) is not None:
+            NAMESPACES.add(model_namespace(cls.queryset.model))
+
+    @property
+    def cache_namespace(self):
+        return model_namespace(self.queryset.model)
+
+    def get_cache_scope(self):
+        """The part of the key separating callers who may see different data. The role by default."""
+        user = self.request.user
+        return user.role if user and user.is_authenticated else 'anonymous'
+
+    def _response_cache_key(self):
+        object_id = self.kwargs.get(self.lookup_url_kwarg or self.lookup_field) if self.action == 'retrieve' else None
+        version = namespace_version(self.cache_namespace, object_id)
+        query = hashlib.md5(self.request.META.get('QUERY_STRING', '').encode(), usedforsecurity=False).hexdigest()
+        return f'response:{self.cache_namespace}:{self.action}:{object_id}:{version}:{self.get_cache_scope()}:{query}'
+
+    def _cached_response(self, handler, request, *args, **kwargs):
+        if not settings.SHARED_CACHE:
+            return handler(request, *args, **kwargs)
+        key = self._response_cache_key()
+        entry = cache.get(key)
+        record_lookup(self.cache_namespace, entry is not None)
+        if entry is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code == 200:
+                headers = {header: response[header] for header in CACHED_HEADERS if header in response}
+                cache.set(key, (response.data, headers), self.cache_timeout)
+            return response
+
+        data, headers = entry
+        last_modified = parse_http_date(headers['Last-Modified']) if 'Last-Modified' in headers else None
+        response = get_conditional_response(request, etag=headers.get('ETag'), last_modified=last_modified)
+        response = response or Response(data)
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self._cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached_response(super().retrieve, request, *args, **kwargs)
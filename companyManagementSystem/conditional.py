@@ -0,0 +1,111 @@
+"""
+Conditional requests driven by `TimeBaseModel.updated_at`.
+
+Detail responses carry an ETag and a Last-Modified built from the row's `updated_at`
+(together with those of the related rows it renders), loaded as an annotation on the same
+query as the row. Lists carry an ETag built from `MAX(updated_at)` and `COUNT(*)` of the
+role-scoped, filtered queryset, so adding, changing or deleting a row changes it; the
+aggregate is one query and runs before anything is serialized. A matching `If-None-Match`
+(or `If-Modified-Since` on details) is answered with 304 Not Modified.
+
+Writes to a detail route honour `If-Match` / `If-Unmodified-Since`: the row is locked, its
+validators checked, and 412 Precondition Failed returned when it changed in the meantime.
+"""
+import hashlib
+from calendar import timegm
+
+from django.db import transaction
+from django.db.models import Count, F, Max
+from django.db.models.functions import Greatest
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+WRITE_ACTIONS = ('update', 'partial_update', 'destroy')
+PRECONDITION_HEADERS = ('If-Match', 'If-Unmodified-Since')
+
+
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = 'The resource has changed since it was last fetched.'
+    default_code = 'precondition_failed'
+
+
+class ConditionalMixin:
+    """
+    Viewset mixin adding ETag / Last-Modified validators to `list` and `retrieve` and
+    optimistic concurrency to writes.
+
+    `conditional_sources` lists the `updated_at` paths of every row a representation shows,
+    such as `'user__updated_at'` for an employee rendering its user.
+    """
+    conditional_sources = ('updated_at',)
+
+    def _modified_expression(self):
+        fields = [F(source) for source in self.conditional_sources]
+        return Greatest(*fields) if len(fields) > 1 else fields[0]
+
+    def _etag(self, *validators):
+        # The query string selects the representation (`?fields=`, `?cursor=`, ...), so it is part of the tag.
+        key = '|'.join([*map(str, validators), self.request.META.get('QUERY_STRING', '')])
+        return f'"{hashlib.md5(key.encode(), usedforsecurity=False).hexdigest()}"'
+
+    def _has_preconditions(self):
+        return self.action in WRITE_ACTIONS and any(header in self.request.headers for header in PRECONDITION_HEADERS)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'retrieve' or self._has_preconditions():
+            queryset = queryset.annotate(last_modified_at=self._modified_expression())
+        if self._has_preconditions():
+            # Locked until the write commits, so no other write can slip in after the check.
+            queryset = queryset.select_for_update(of=('self',))
+        return queryset
+
+    def _conditional_response(self, etag, modified=None):
+        last_modified = timegm(modified.utctimetuple()) if modified else None
+        return get_conditional_response(self.request, etag=etag, last_modified=last_modified)
+
+    def _add_validators(self, response, etag, modified=None):
+        response['ETag'] = etag
+        if modified:
+            response['Last-Modified'] = http_date(timegm(modified.utctimetuple()))
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        aggregate = queryset.order_by().aggregate(modified=Max(self._modified_expression()), count=Count('pk'))
+        etag = self._etag(aggregate['modified'], aggregate['count'])
+        # Without a Last-Modified, If-Modified-Since cannot miss a deletion.
+        response = self._conditional_response(etag) or super().list(request, *args, **kwargs)
+        return self._add_validators(response, etag)
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        etag, modified = self._etag(instance.last_modified_at), instance.last_modified_at
+        response = self._conditional_response(etag, modified) or Response(self.get_serializer(instance).data)
+        return self._add_validators(response, etag, modified)
+
+    def get_object(self):
+        instance = super().get_object()
+        if self._has_preconditions():
+            etag = self._etag(instance.last_modified_at)
+            response = self._conditional_response(etag, instance.last_modified_at)
+            if response is not None and response.status_code == status.HTTP_412_PRECONDITION_FAILED:
+                raise PreconditionFailed()
+        return instance
+
+    def update(self, request, *args, **kwargs):
+        if not self._has_preconditions():
+            return super().update(request, *args, **kwargs)
+        with transaction.atomic():
+            return super().update(request, *args, **kwargs)
+
+    def destroy(self, request, *args, **kwargs):
+        if not self._has_preconditions():
+            return super().destroy(request, *args, **kwargs)
+        with transaction.atomic():
+            return super().destroy(request, *args, **kwargs)
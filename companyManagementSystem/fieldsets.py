@@ -0,0 +1,156 @@
+"""
+Sparse fieldsets: `?fields=` keeps only the listed fields of a response, `?omit=` drops them.
+
+Both take comma-separated names, with dots reaching into nested serializers
+(`?fields=id,user.email`, `?omit=address,user.role`). `SparseFieldsetsMixin` trims what
+serializers render; `SparseQuerysetMixin` trims what viewsets load to match, loading only the
+columns, joins and prefetches the remaining fields read.
+
+Fields whose source is not a model field (methods, properties) declare the model paths they
+read in `Meta.field_sources`; a queryset is left as it is when a rendered field's columns
+cannot be worked out.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+
+FIELDS_PARAM = 'fields'
+OMIT_PARAM = 'omit'
+
+# Actions whose queryset only feeds the serializer's output.
+READ_ACTIONS = ('list', 'retrieve')
+
+
+def parse_fieldset(value):
+    """
+    Parses `a,b.c,b.d` into `{'a': None, 'b': {'c': None, 'd': None}}`, where None stands
+    for the whole field. Returns None when nothing is given.
+    """
+    tree = {}
+    for path in (part.strip() for part in (value or '').split(',')):
+        if not path:
+            continue
+        node = tree
+        *parents, leaf = path.split('.')
+        for name in parents:
+            node = node.setdefault(name, {})
+            if node is None:  # The whole field is already selected.
+                break
+        else:
+            node[leaf] = None
+    return tree or None
+
+
+def request_fieldsets(request):
+    """Returns the (fields, omit) trees of a request, each None when not given."""
+    if request is None:
+        return None, None
+    params = request.query_params
+    return parse_fieldset(params.get(FIELDS_PARAM)), parse_fieldset(params.get(OMIT_PARAM))
+
+
+def _subtree(tree, path):
+    for name in path:
+        if tree is None:
+            return None
+        tree = tree.get(name)
+    return tree
+
+
+class SparseFieldsetsMixin:
+    """Serializer mixin rendering only the fields selected by `?fields=` and `?omit=`."""
+
+    def _fieldset_path(self):
+        path, node = [], self
+        while node.parent is not None:
+            if getattr(node, 'field_name', None):
+                path.append(node.field_name)
+            node = node.parent
+        return path[::-1]
+
+    @property
+    def _readable_fields(self):
+        if not hasattr(self, '_sparse_readable_fields'):
+            root = self.root
+            if not hasattr(root, '_fieldsets'):
+                root._fieldsets = request_fieldsets(self.context.get('request'))
+            fields, omit = root._fieldsets
+            path = self._fieldset_path()
+            fields, omit = _subtree(fields, path), _subtree(omit, path) or {}
+            self._sparse_readable_fields = [
+                field for field in super()._readable_fields
+                if (fields is None or field.field_name in fields)
+                and not (field.field_name in omit and omit[field.field_name] is None)
+            ]
+        return self._sparse_readable_fields
+
+
+class _Unresolved(Exception):
+    pass
+
+
+def _lookup_name(lookup):
+    return getattr(lookup, 'prefetch_to', lookup)
+
+
+def serializer_sources(serializer, prefix=''):
+    """
+    Returns (columns, prefetches): the model paths the rendered fields of `serializer` read,
+    and the to-many relations they render. Raises `_Unresolved` for fields it cannot map.
+    """
+    model = serializer.Meta.model
+    hints = getattr(serializer.Meta, 'field_sources', {})
+    columns, prefetches = set(), set()
+    for field in serializer._readable_fields:
+        if field.field_name in hints:
+            columns.update(prefix + path for path in hints[field.field_name])
+            continue
+        if field.source == '*':
+            raise _Unresolved(field.field_name)
+        path = '__'.join(field.source_attrs)
+        if isinstance(field, (serializers.ListSerializer, serializers.ManyRelatedField)):
+            prefetches.add(prefix + path)
+            continue
+
+        current = model
+        for attr in field.source_attrs:
+            try:
+                model_field = current._meta.get_field(attr)
+            except FieldDoesNotExist:
+                raise _Unresolved(field.field_name)
+            current = model_field.related_model if model_field.is_relation else None
+        if isinstance(field, serializers.BaseSerializer):
+            nested_columns, nested_prefetches = serializer_sources(field, f'{prefix}{path}__')
+            columns |= nested_columns
+            prefetches |= nested_prefetches
+        columns.add(prefix + path)
+    return columns, prefetches
+
+
+class SparseQuerysetMixin:
+    """
+    Viewset mixin narrowing read querysets to what a sparse fieldset renders: `.only()` the
+    columns it reads, `select_related` only the joins it reaches and drop unused prefetches.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action not in READ_ACTIONS or request_fieldsets(self.request) == (None, None):
+            return queryset
+        try:
+            columns, prefetches = serializer_sources(self.get_serializer())
+        except _Unresolved:
+            return queryset
+
+        columns.add('pk')
+        if self.action == 'list' and self.paginator is not None and hasattr(self.paginator, 'get_ordering'):
+            # The cursor paginator reads the ordering fields of the last row.
+            columns.update(field.lstrip('-') for field in self.paginator.get_ordering(self.request, queryset, self))
+        joins = {column.rsplit('__', 1)[0] for column in columns if '__' in column}
+        lookups = [
+            lookup for lookup in queryset._prefetch_related_lookups
+            if _lookup_name(lookup).split('__')[0] in prefetches
+        ]
+        queryset = queryset.select_related(None).prefetch_related(None).only(*columns)
+        if joins:
+            queryset = queryset.select_related(*joins)
+        return queryset.prefetch_related(*lookups)
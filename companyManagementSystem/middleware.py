@@ -0,0 +1,38 @@
+import logging
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .query_budget import count_queries, get_query_budget, get_view_action
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetMiddleware:
+    """
+    Logs a warning when a request runs more queries than its view declares in `query_budgets`.
+    Only active with DEBUG enabled.
+    """
+
+    def __init__(self, get_response):
+        if not settings.DEBUG:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with count_queries() as queries:
+            response = self.get_response(request)
+
+        match = request.resolver_match
+        view_class = getattr(match.func, 'cls', None) if match else None
+        if view_class is None:
+            return response
+
+        action = get_view_action(match.func, request.method)
+        budget = get_query_budget(view_class, action)
+        if budget is not None and queries.count > budget:
+            logger.warning(
+                f'{view_class.__name__}.{action} ran {queries.count} queries, '
+                f'over its budget of {budget}: {request.method} {request.path}'
+            )
+        return response
@@ -0,0 +1,15 @@
+class ActionQuerysetMixin:
+    """
+    Lets a viewset tailor its base queryset to the current action.
+
+    `action_querysets` maps action names to querysets carrying the joins, prefetches and
+    column sets that action needs; actions without an entry fall back to `queryset`.
+    Role scoping in `get_queryset` should build on `super().get_queryset()`.
+    """
+    action_querysets = {}
+
+    def get_queryset(self):
+        queryset = self.action_querysets.get(self.action)
+        if queryset is None:
+            return super().get_queryset()
+        return queryset.all()
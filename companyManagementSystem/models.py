@@ -1,9 +1,104 @@
 from django.db import models
 
 class TimeBaseModel(models.Model):
+    """
+    Abstract base adding creation/update timestamps and field-change tracking.
+
+    Instances loaded from the database remember the values they were loaded with, so
+    callers can ask `has_changed('department')` without another query, and `save()`
+    only writes the columns that actually changed (plus the `auto_now` timestamps).
+    """
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         abstract = True
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_loaded_values()
+        return instance
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._remember_loaded_values(kwargs.get('fields'))
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields', args[3] if len(args) > 3 else None)
+        self._tracking_changes = self._tracks_update(args, kwargs)
+        if self._tracking_changes:
+            kwargs['update_fields'] = self._fields_to_update()
+        try:
+            super().save(*args, **kwargs)
+        finally:
+            self._tracking_changes = False
+        # Fields left out of an explicit `update_fields` were not written and stay changed.
+        self._remember_loaded_values(update_fields)
+
+    def _save_table(self, raw=False, cls=None, force_insert=False, force_update=False, using=None,
+                    update_fields=None):
+        # `pre_save` receivers run between `save()` and here, so the columns they changed
+        # are only known now.
+        if getattr(self, '_tracking_changes', False):
+            update_fields = frozenset(self._fields_to_update())
+        return super()._save_table(raw, cls, force_insert, force_update, using, update_fields)
+
+    def _remember_loaded_values(self, fields=None):
+        """Snapshots the current values of `fields` (names or attribute names), or of every loaded field."""
+        # Read straight from __dict__ so deferred fields are skipped rather than fetched.
+        if fields is None:
+            self._loaded_values = {
+                field.attname: self.__dict__[field.attname]
+                for field in self._meta.concrete_fields
+                if field.attname in self.__dict__
+            }
+        else:
+            attnames = {self._meta.get_field(name).attname for name in fields}
+            self._loaded_values = {
+                **getattr(self, '_loaded_values', {}),
+                **{name: self.__dict__[name] for name in attnames if name in self.__dict__},
+            }
+
+    def _tracks_update(self, args, kwargs):
+        return (
+            not args
+            and hasattr(self, '_loaded_values')
+            and not self._state.adding
+            and kwargs.get('update_fields') is None
+            and not kwargs.get('force_insert')
+            and kwargs.get('using') in (None, self._state.db)
+        )
+
+    def _fields_to_update(self):
+        changed = self.changed_fields
+        return [
+            field.name for field in self._meta.concrete_fields
+            if not field.primary_key and (field.attname in changed or getattr(field, 'auto_now', False))
+        ]
+
+    @property
+    def changed_fields(self):
+        """
+        Attribute names (`department_id` for foreign keys) whose current value differs from
+        the loaded one. Instances that were not loaded from the database report every loaded field.
+        """
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None:
+            return {field.attname for field in self._meta.concrete_fields if field.attname in self.__dict__}
+        return {
+            field.attname for field in self._meta.concrete_fields
+            if field.attname in self.__dict__
+            and (field.attname not in loaded or loaded[field.attname] != self.__dict__[field.attname])
+        }
+
+    def has_changed(self, field_name):
+        """Returns whether `field_name` (a field name or attribute name) changed since the instance was loaded."""
+        return self._meta.get_field(field_name).attname in self.changed_fields
+
+    def previous_value(self, field_name):
+        """
+        Returns the value `field_name` had when the instance was loaded, the primary key for
+        foreign keys. Returns None if that value is not known.
+        """
+        return getattr(self, '_loaded_values', {}).get(self._meta.get_field(field_name).attname)
@@ -1,6 +1,114 @@
 # pagination.py
-from rest_framework.pagination import CursorPagination
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import F
+from django.db.models.fields.tuple_lookups import Tuple, TupleGreaterThan, TupleLessThan
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, _reverse_ordering
+
 
 class CustomCursorPagination(CursorPagination):
-    ordering = "-created_at"  # Descending order by 'created_at'
-    page_size = 10  # Optional: Override default page size here
\ No newline at end of file
+    """
+    Keyset pagination over a unique compound ordering.
+
+    The ordering always ends with the primary key, so every row has a distinct position and
+    the cursor stores the full sort key of the last row seen. A page is then fetched with a
+    row comparison, `(created_at, id) < (:created_at, :id)`, which the `(created_at, id)`
+    indexes (or `(department_id, created_at, id)` for scoped lists) answer without sorting
+    the table or skipping rows, so page 1000 costs the same as page 1. Rows sharing a
+    timestamp, as bulk inserts produce, are neither skipped nor repeated.
+    """
+    ordering = ("-created_at", "-id")  # Newest first; the id breaks ties.
+    page_size = 10  # Optional: Override default page size here
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        descending = ordering[0].startswith('-')
+        assert all(field.startswith('-') == descending for field in ordering), (
+            'Keyset pagination compares whole rows, so every ordering field must sort the same way.'
+        )
+        if not {field.lstrip('-') for field in ordering} & {'id', 'pk'}:
+            ordering += ('-id' if descending else 'id',)
+        return ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.paginate_querysets([queryset], request, view)
+
+    def paginate_querysets(self, querysets, request, view=None):
+        """
+        Paginates several querysets as one list, for models sharing the ordering fields and
+        a primary key sequence (such as a table and its archive). A page is read from each
+        after the cursor position and the pages are merged.
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, querysets[0], view)
+
+        # Positions are unique, so the offsets of the base class are never needed.
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is not None:
+            self.cursor = self.cursor._replace(offset=0)
+        reverse = bool(self.cursor and self.cursor.reverse)
+        current_position = self.cursor.position if self.cursor else None
+
+        # One extra row tells whether there is a following page.
+        results = []
+        for queryset in querysets:
+            queryset = queryset.order_by(*(_reverse_ordering(self.ordering) if reverse else self.ordering))
+            if current_position is not None:
+                queryset = queryset.filter(self._seek(queryset.model, current_position, reverse))
+            results += queryset[:self.page_size + 1]
+        if len(querysets) > 1:
+            names = [field.lstrip('-') for field in self.ordering]
+            results.sort(key=lambda row: [getattr(row, name) for name in names],
+                         reverse=self.ordering[0].startswith('-') != reverse)
+            results = results[:self.page_size + 1]
+
+        self.page = results[:self.page_size]
+        following_position = None
+        if len(results) > len(self.page):
+            following_position = self._get_position_from_instance(results[-1], self.ordering)
+
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.next_position = True, current_position
+            self.has_previous, self.previous_position = following_position is not None, following_position
+        else:
+            self.has_next, self.next_position = following_position is not None, following_position
+            self.has_previous, self.previous_position = current_position is not None, current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def _seek(self, model, position, reverse):
+        """Returns the lookup keeping the rows after `position` in the direction of travel."""
+        names = [field.lstrip('-') for field in self.ordering]
+        try:
+            values = json.loads(position)
+            if not isinstance(values, list) or len(values) != len(names):
+                raise ValueError(position)
+            values = tuple(
+                model._meta.pk.to_python(value) if name == 'pk' else model._meta.get_field(name).to_python(value)
+                for name, value in zip(names, values)
+            )
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+        descending = self.ordering[0].startswith('-')
+        lookup = TupleLessThan if reverse != descending else TupleGreaterThan
+        return lookup(Tuple(*(F(name) for name in names)), values)
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for field in ordering:
+            name = field.lstrip('-')
+            values.append(instance[name] if isinstance(instance, dict) else getattr(instance, name))
+        return json.dumps([str(value) for value in values])
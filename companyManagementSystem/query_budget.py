@@ -0,0 +1,54 @@
+"""
+Per-endpoint SQL query budgets.
+
+Views declare the most queries a request may run as a `query_budgets` mapping, keyed by
+viewset action (`list`, `retrieve`, custom `@action` names) or, for plain API views, by
+lower-case HTTP method. Budgets cover the whole request, including authentication, and
+must not depend on the page size.
+"""
+from django.db import connections
+
+
+class QueryCounter:
+    """Execute wrapper that counts every query run while it is installed."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class count_queries:
+    """Context manager counting the queries run on all database connections."""
+
+    def __init__(self):
+        self.counter = QueryCounter()
+        self._wrappers = []
+
+    @property
+    def count(self):
+        return self.counter.count
+
+    def __enter__(self):
+        for connection in connections.all():
+            wrapper = connection.execute_wrapper(self.counter)
+            wrapper.__enter__()
+            self._wrappers.append(wrapper)
+        return self
+
+    def __exit__(self, *exc_info):
+        while self._wrappers:
+            self._wrappers.pop().__exit__(*exc_info)
+
+
+def get_view_action(view_func, method):
+    """Returns the viewset action a request is dispatched to, or the HTTP method for plain views."""
+    actions = getattr(view_func, 'actions', None) or {}
+    return actions.get(method.lower(), method.lower())
+
+
+def get_query_budget(view_class, action):
+    """Returns the declared budget of `action` on `view_class`, or None if it has none."""
+    return getattr(view_class, 'query_budgets', {}).get(action)
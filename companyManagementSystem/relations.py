@@ -0,0 +1,56 @@
+"""
+Related fields resolving a whole list of primary keys with one query.
+
+DRF's `PrimaryKeyRelatedField(many=True)` looks every submitted key up on its own. The field
+here fetches them all with a single `pk IN (...)` and reports every missing key in one error.
+"""
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.utils.translation import gettext_lazy as _
+from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS, ManyRelatedField
+
+
+class BulkManyRelatedField(ManyRelatedField):
+    default_error_messages = {
+        **ManyRelatedField.default_error_messages,
+        'does_not_exist': _('Invalid pk {pk_values} - objects do not exist.'),
+        'incorrect_type': _('Incorrect type. Expected pk values, received {data_type}.'),
+    }
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        child = self.child_relation
+        model_field = child.get_queryset().model._meta.pk
+        keys = []
+        for item in data:
+            if isinstance(item, bool):
+                self.fail('incorrect_type', data_type=type(item).__name__)
+            if child.pk_field is not None:
+                item = child.pk_field.to_internal_value(item)
+            try:
+                keys.append(model_field.to_python(item))
+            except (DjangoValidationError, TypeError, ValueError):
+                self.fail('incorrect_type', data_type=type(item).__name__)
+
+        keys = list(dict.fromkeys(keys))  # Duplicates resolve to the same object.
+        found = child.get_queryset().in_bulk(keys)
+        missing = [key for key in keys if key not in found]
+        if missing:
+            self.fail('does_not_exist', pk_values=', '.join(map(str, missing)))
+        return [found[key] for key in keys]
+
+
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """A `PrimaryKeyRelatedField` whose `many=True` form resolves all keys in one query."""
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BulkManyRelatedField(**list_kwargs)
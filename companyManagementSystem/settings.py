@@ -34,11 +34,13 @@ INSTALLED_APPS = [
     'organizations',
     'performance',
     'users',
+    'search',
 
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'companyManagementSystem.middleware.QueryBudgetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -96,6 +98,39 @@ DATABASES = {
     },
 }
 
+# Cache
+# Redis when REDIS_URL is set. The local-memory fallback is per process, so it only suits
+# tests and single-process development: invalidations would not reach other workers.
+
+REDIS_URL = config("REDIS_URL", default="")
+
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django_redis.cache.RedisCache",
+            "LOCATION": REDIS_URL,
+            "KEY_PREFIX": "cms",
+            "OPTIONS": {
+                "CLIENT_CLASS": "django_redis.client.DefaultClient",
+                # An unreachable Redis degrades to cache misses instead of failing requests.
+                "IGNORE_EXCEPTIONS": True,
+            },
+        },
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        },
+    }
+
+# Whether every process reads and writes the same cache. Invalidations that other processes
+# must see (the token blacklist filter, revocation markers, cached responses) are only relied
+# on when it does; with the per-process local-memory cache they fall back to the database.
+SHARED_CACHE = bool(REDIS_URL)
+
+RESPONSE_CACHE_TIMEOUT = config("RESPONSE_CACHE_TIMEOUT", default=300, cast=int)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -152,7 +187,7 @@ SPECTACULAR_SETTINGS = {
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.ScopedJWTAuthentication',
 
     ),
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
@@ -169,10 +204,22 @@ SIMPLE_JWT = {
     "REFRESH_TOKEN_LIFETIME": timedelta(
         days=config("JWT_REFRESH_EXPIRES_IN_DAYS", default=1, cast=int)
     ),
+    # Tokens carry the user's role and employee scope; see users.tokens.
+    'TOKEN_OBTAIN_SERIALIZER': 'users.serializers.ScopedTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'users.serializers.ScopedTokenRefreshSerializer',
+    'TOKEN_USER_CLASS': 'users.authentication.ScopedTokenUser',
     # 'ROTATE_REFRESH_TOKENS': True,
     # 'BLACKLIST_AFTER_ROTATION': True,
 }
 
+# Seconds between counter flushes triggered by commits. 0 applies the deltas of every
+# transaction right after it commits, so the counters are always current; a larger value
+# trades up to that much lag for less contention on hot Company/Department rows, queueing the
+# deltas in the CounterDelta table. The throttle only takes effect while a
+# `manage.py flush_counters --interval N` loop is running (it announces itself through the
+# shared cache); without one, commits keep applying their deltas so counters never go stale.
+COUNTER_FLUSH_INTERVAL = config("COUNTER_FLUSH_INTERVAL", default=0, cast=int)
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
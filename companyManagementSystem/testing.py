@@ -0,0 +1,108 @@
+"""
+Shared fixtures and assertions for the test suites.
+"""
+from datetime import date, timedelta
+
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework.test import APITestCase
+from users.tokens import ScopedAccessToken
+
+from .query_budget import count_queries, get_query_budget
+
+# More rows than fit on one page, so an N+1 on any list endpoint overshoots its budget.
+ROWS_PER_PAGE = 12
+
+
+def seed_organization(name='Acme', departments=2, employees_per_department=ROWS_PER_PAGE,
+                      projects_per_department=ROWS_PER_PAGE, assignees_per_project=3):
+    """
+    Creates a company with departments, employees (each with a user and a review) and
+    projects with assigned employees. Returns the created objects in a dict.
+    """
+    from organizations.models import Company, Department, Employee
+    from performance.models import PerformanceReview
+    from projects.models import Project
+    from users.models import User
+
+    company = Company.objects.create(name=name)
+    seeded = {'company': company, 'departments': [], 'employees': [], 'projects': [], 'reviews': []}
+    for d in range(departments):
+        department = Department.objects.create(name=f'{name} department {d}', company=company)
+        seeded['departments'].append(department)
+        employees = []
+        for e in range(employees_per_department):
+            user = User.objects.create(
+                email=f'{name}.{d}.{e}@example.com'.lower(), username=f'{name}-{d}-{e}', role=User.Role.EMPLOYEE,
+            )
+            employees.append(Employee.objects.create(
+                user=user, company=company, department=department, designation='Engineer',
+                address='Somewhere', hired_on=date(2020, 1, 1) + timedelta(days=e),
+            ))
+        seeded['employees'] += employees
+        seeded['reviews'] += [PerformanceReview.objects.create(employee=employee) for employee in employees]
+        for p in range(projects_per_department):
+            project = Project.objects.create(
+                name=f'{name} project {d}.{p}', description='Description', company=company, department=department,
+                start_date=date(2024, 1, 1), end_date=date(2024, 12, 31),
+            )
+            project.assigned_employees.set(employees[:assignees_per_project])
+            seeded['projects'].append(project)
+    return seeded
+
+
+def create_user(email, role, employee_of=None):
+    """Creates a user with the given role, optionally with an employee profile in `employee_of` (a department)."""
+    from organizations.models import Employee
+    from users.models import User
+
+    user = User.objects.create(email=email, username=email.split('@')[0], role=role)
+    if employee_of is not None:
+        Employee.objects.create(
+            user=user, company=employee_of.company, department=employee_of, designation='Staff',
+        )
+    return user
+
+
+# The tests run in one process, so its local-memory cache is shared by every request they make.
+@override_settings(SHARED_CACHE=True)
+class QueryBudgetTestCase(APITestCase):
+    """
+    Base class for asserting that endpoints stay within the `query_budgets` their views declare.
+    Requests are authenticated with a real (scoped) JWT, as clients are.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        from users.models import User
+
+        # The test data never commits, so the counter updates deferred to commit are run here.
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.org = seed_organization()
+            department = cls.org['departments'][0]
+            cls.admin = create_user('admin@example.com', User.Role.ADMIN)
+            cls.manager = create_user('manager@example.com', User.Role.MANAGER, employee_of=department)
+        cls.employee = cls.org['employees'][0].user
+
+    @classmethod
+    def _pre_setup(cls):
+        super()._pre_setup()
+        # Cached responses and lookups would otherwise outlive the rolled-back data of a test.
+        cache.clear()
+
+    def authenticate(self, user):
+        self.client.credentials(HTTP_AUTHORIZATION=f'JWT {ScopedAccessToken.for_user(user)}')
+
+    def assertWithinQueryBudget(self, view_class, action, method, url, data=None, format='json', **extra):
+        """Performs the request and fails if it ran more queries than `view_class` allows for `action`."""
+        budget = get_query_budget(view_class, action)
+        self.assertIsNotNone(budget, f'{view_class.__name__} declares no query budget for {action!r}.')
+        # On-commit work (such as the counter flush) runs inside the request in production, so it counts too.
+        with count_queries() as queries, self.captureOnCommitCallbacks(execute=True):
+            response = getattr(self.client, method)(url, data, format=format, **extra)
+        self.assertLessEqual(
+            queries.count, budget,
+            f'{method.upper()} {url} ran {queries.count} queries, '
+            f'over the {budget} budgeted for {view_class.__name__}.{action}.'
+        )
+        return response
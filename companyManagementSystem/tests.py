@@ -0,0 +1,456 @@
+import csv
+import io
+import json
+from datetime import timedelta
+from unittest import mock
+
+from django.db import DatabaseError, connection, transaction
+from django.db.models.signals import post_save, pre_save
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from django.utils import timezone
+from django.utils.http import http_date
+
+from organizations.models import Company, Department, Employee
+from organizations.views import CompanyViewSet, DepartmentViewSet, EmployeeViewSet
+from performance.models import PerformanceReview
+from performance.views import PerformanceReviewViewSet
+from projects.models import Project
+from projects.views import ProjectViewSet
+from users.models import User
+from organizations.caching import EMPLOYEE_BY_USER, employee_for_user
+from .cache import cache_metrics
+from .fieldsets import parse_fieldset
+from .query_budget import get_query_budget
+from .testing import QueryBudgetTestCase
+
+SKIPPED_METHODS = {'options', 'head'}
+# Router roots and schema views come from third-party packages and never touch the database.
+THIRD_PARTY_MODULES = ('rest_framework.', 'drf_spectacular.')
+
+
+def iter_api_views(patterns=None, prefix=''):
+    """Yields (route, view function) for every DRF view routed in the project URLconf."""
+    if patterns is None:
+        patterns = get_resolver().url_patterns
+    for pattern in patterns:
+        route = prefix + str(pattern.pattern)
+        if isinstance(pattern, URLResolver):
+            yield from iter_api_views(pattern.url_patterns, route)
+        elif isinstance(pattern, URLPattern) and hasattr(pattern.callback, 'cls'):
+            yield route, pattern.callback
+
+
+class QueryBudgetCoverageTests(SimpleTestCase):
+    def test_every_api_route_declares_budgets(self):
+        missing = []
+        for route, view in iter_api_views():
+            if view.cls.__module__.startswith(THIRD_PARTY_MODULES):
+                continue
+            if getattr(view, 'actions', None):
+                actions = view.actions.values()
+            else:
+                actions = [m for m in view.cls.http_method_names if m not in SKIPPED_METHODS and hasattr(view.cls, m)]
+            missing += [f'{route} {view.cls.__name__}.{a}' for a in actions if get_query_budget(view.cls, a) is None]
+        self.assertEqual(missing, [], 'Routes without a query budget.')
+
+
+class QueryBudgetMiddlewareTests(QueryBudgetTestCase):
+    def setUp(self):
+        self.authenticate(self.admin)
+
+    @override_settings(DEBUG=True)
+    def test_logs_requests_over_budget(self):
+        budgets = {**CompanyViewSet.query_budgets, 'list': 0}
+        with mock.patch.object(CompanyViewSet, 'query_budgets', budgets), \
+                self.assertLogs('companyManagementSystem.middleware', 'WARNING') as logs:
+            self.client.get(reverse('company-list'))
+        self.assertIn('CompanyViewSet.list', logs.output[0])
+
+    @override_settings(DEBUG=True)
+    def test_silent_within_budget(self):
+        with self.assertNoLogs('companyManagementSystem.middleware', 'WARNING'):
+            self.client.get(reverse('company-list'))
+
+
+class KeysetPaginationTests(QueryBudgetTestCase):
+    def setUp(self):
+        self.authenticate(self.admin)
+        self.url = reverse('employee-list')
+
+    def walk(self, url, link='next'):
+        ids = []
+        while url:
+            response = self.assertWithinQueryBudget(EmployeeViewSet, 'list', 'get', url)
+            self.assertEqual(response.status_code, 200)
+            ids += [row['id'] for row in response.data['results']]
+            url = response.data[link]
+        return ids
+
+    def test_rows_sharing_a_timestamp_are_paged_once(self):
+        # Bulk inserts give many rows the same creation time.
+        Employee.objects.update(created_at=timezone.now())
+        expected = list(Employee.objects.order_by('-id').values_list('id', flat=True))
+        self.assertEqual(self.walk(f'{self.url}?page_size=5'), expected)
+
+    def test_previous_links_walk_back(self):
+        response = self.client.get(self.url, {'page_size': 4})
+        for _ in range(2):
+            response = self.client.get(response.data['next'])
+        last_page = [row['id'] for row in response.data['results']]
+        back = self.walk(response.data['previous'], link='previous')
+        expected = list(Employee.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(back, expected[4:8] + expected[:4])
+        self.assertEqual(last_page, expected[8:12])
+
+    def test_page_size_is_bounded(self):
+        response = self.client.get(self.url, {'page_size': 1000})
+        self.assertEqual(len(response.data['results']), Employee.objects.count())
+        with mock.patch('companyManagementSystem.pagination.CustomCursorPagination.max_page_size', 3):
+            response = self.client.get(self.url, {'page_size': 1000})
+        self.assertEqual(len(response.data['results']), 3)
+
+    def test_ordering_from_filters_gets_a_tie_breaker(self):
+        Employee.objects.update(hired_on=timezone.localdate())
+        expected = list(Employee.objects.order_by('-id').values_list('id', flat=True))
+        self.assertEqual(self.walk(f'{self.url}?ordering=tenure&page_size=7'), expected)
+
+    def test_invalid_cursor(self):
+        # The position `["x"]` has too few values and an invalid timestamp.
+        self.assertEqual(self.client.get(self.url, {'cursor': 'cD0lNUIlMjJ4JTIyJTVE'}).status_code, 404)
+
+
+class ExportTests(QueryBudgetTestCase):
+    def setUp(self):
+        self.authenticate(self.admin)
+
+    def export(self, view_class, name, **params):
+        response = self.assertWithinQueryBudget(view_class, 'export', 'get', reverse(f'{name}-export'), params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_ndjson(self):
+        rows = [json.loads(line) for line in self.export(EmployeeViewSet, 'employee').splitlines()]
+        self.assertEqual([row['id'] for row in rows], sorted(Employee.objects.values_list('id', flat=True)))
+        employee = self.org['employees'][0]
+        self.assertEqual(rows[0]['email'], employee.user.email)
+        self.assertEqual(rows[0]['hired_on'], employee.hired_on.isoformat())
+
+    def test_csv(self):
+        content = self.export(ProjectViewSet, 'project', output='csv')
+        rows = list(csv.DictReader(io.StringIO(content)))
+        project = self.org['projects'][0]
+        self.assertEqual(len(rows), Project.objects.count())
+        self.assertEqual(rows[0]['name'], project.name)
+        expected = sorted(project.assigned_employees.values_list('id', flat=True))
+        self.assertEqual(rows[0]['assigned_employees'], ';'.join(map(str, expected)))
+
+    def test_updated_since(self):
+        review = self.org['reviews'][3]
+        PerformanceReview.objects.update(updated_at=timezone.now() - timedelta(days=2))
+        # Reviews render their employee's user, so its changes count too.
+        User.objects.update(updated_at=timezone.now() - timedelta(days=2))
+        PerformanceReview.objects.filter(pk=review.pk).update(updated_at=timezone.now())
+        since = (timezone.now() - timedelta(days=1)).isoformat()
+        lines = self.export(PerformanceReviewViewSet, 'performancereview', updated_since=since).splitlines()
+        self.assertEqual([json.loads(line)['id'] for line in lines], [review.pk])
+
+    def test_updated_since_includes_rendered_relations(self):
+        employee = self.org['employees'][4]
+        past = timezone.now() - timedelta(days=2)
+        Employee.objects.update(updated_at=past)
+        User.objects.update(updated_at=past)
+        since = (timezone.now() - timedelta(days=1)).isoformat()
+        self.assertEqual(self.export(EmployeeViewSet, 'employee', updated_since=since), '')
+
+        # Renaming the user leaves the employee row untouched, but changes the exported email.
+        user = User.objects.get(pk=employee.user_id)
+        user.email = 'renamed@example.com'
+        user.save()
+        rows = [json.loads(line) for line in self.export(EmployeeViewSet, 'employee', updated_since=since).splitlines()]
+        self.assertEqual([(row['id'], row['email']) for row in rows], [(employee.pk, 'renamed@example.com')])
+
+        # The same holds for a review, which renders its employee's user.
+        PerformanceReview.objects.update(updated_at=past)
+        lines = self.export(PerformanceReviewViewSet, 'performancereview', updated_since=since).splitlines()
+        self.assertEqual([json.loads(line)['employee'] for line in lines], [employee.pk])
+
+    def test_scoped_to_the_user(self):
+        self.authenticate(self.employee)
+        lines = self.export(EmployeeViewSet, 'employee').splitlines()
+        self.assertEqual([json.loads(line)['user'] for line in lines], [self.employee.pk])
+
+    def test_invalid_output(self):
+        self.assertEqual(self.client.get(reverse('employee-export'), {'output': 'xml'}).status_code, 400)
+
+
+class SparseFieldsetTests(QueryBudgetTestCase):
+    def setUp(self):
+        self.authenticate(self.admin)
+
+    def get(self, name, params, *args):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(name, args=args), params)
+        self.assertEqual(response.status_code, 200)
+        return response.data, [query['sql'] for query in queries]
+
+    def test_parse(self):
+        self.assertIsNone(parse_fieldset(''))
+        self.assertEqual(parse_fieldset('id, user.email,user.role'), {'id': None, 'user': {'email': None, 'role': None}})
+        self.assertEqual(parse_fieldset('user.email,user'), {'user': None})
+        self.assertEqual(parse_fieldset('user,user.email'), {'user': None})
+
+    def test_fields_trim_response_and_columns(self):
+        data, queries = self.get('employee-list', {'fields': 'id,user.email'})
+        self.assertEqual(data['results'][0], {'id': data['results'][0]['id'], 'user': {'email': mock.ANY}})
+        select = queries[-1]
+        self.assertIn('"users_user"."email"', select)
+        self.assertNotIn('"address"', select)
+        self.assertNotIn('"users_user"."role"', select)
+
+    def test_omit_skips_joins(self):
+        data, queries = self.get('employee-list', {'omit': 'user,address'})
+        self.assertNotIn('user', data['results'][0])
+        self.assertIn('designation', data['results'][0])
+        self.assertNotIn('users_user', queries[-1])
+
+    def test_omit_nested_field(self):
+        data, _ = self.get('employee-detail', {'omit': 'user.role'}, self.org['employees'][0].pk)
+        self.assertEqual(set(data['user']), {'id', 'email', 'username'})
+
+    def test_unrendered_relations_are_not_prefetched(self):
+        _, full = self.get('project-list', {})
+        data, sparse = self.get('project-list', {'fields': 'id,name'})
+        self.assertEqual(set(data['results'][0]), {'id', 'name'})
+        self.assertEqual(len(sparse), len(full) - 1)
+        data, _ = self.get('project-list', {'fields': 'id,assigned_employees_details.full_name'})
+        self.assertEqual(set(data['results'][0]['assigned_employees_details'][0]), {'full_name'})
+
+    def test_field_sources(self):
+        data, queries = self.get('performancereview-list', {'fields': 'id,employee_name'})
+        self.assertEqual(set(data['results'][0]), {'id', 'employee_name'})
+        self.assertNotIn('"feedback"', queries[-1])
+        self.assertIn('"users_user"."username"', queries[-1])
+
+    def test_ordering_fields_stay_loaded(self):
+        _, full = self.get('employee-list', {'ordering': 'tenure'})
+        _, sparse = self.get('employee-list', {'fields': 'id', 'ordering': 'tenure'})
+        self.assertEqual(len(sparse), len(full))
+        self.assertIn('"hired_on"', sparse[-1].split(' FROM ')[0])
+
+
+class ConditionalRequestTests(QueryBudgetTestCase):
+    def setUp(self):
+        self.authenticate(self.admin)
+        self.company = self.org['company']
+        self.list_url = reverse('department-list')
+        self.detail_url = reverse('company-detail', args=[self.company.pk])
+
+    def test_list_not_modified(self):
+        response = self.assertWithinQueryBudget(DepartmentViewSet, 'list', 'get', self.list_url)
+        etag = response['ETag']
+        self.assertIn('no-cache', response['Cache-Control'])
+        with self.assertNumQueries(0):  # The ETag comes from the cached response.
+            response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_list_etag_follows_changes_and_deletions(self):
+        etag = self.client.get(self.list_url)['ETag']
+        department = self.org['departments'][1]
+        department.name = 'Renamed'
+        department.save()
+        changed = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        Department.objects.filter(pk=department.pk).delete()
+        self.assertNotEqual(self.client.get(self.list_url)['ETag'], changed['ETag'])
+
+    def test_list_etag_depends_on_the_representation(self):
+        etag = self.client.get(self.list_url)['ETag']
+        self.assertNotEqual(self.client.get(self.list_url, {'fields': 'id'})['ETag'], etag)
+
+    def test_counter_flushes_change_validators(self):
+        etag = self.client.get(self.detail_url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Department.objects.create(name='New', company=self.company)
+        self.assertEqual(self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_detail_not_modified(self):
+        response = self.assertWithinQueryBudget(CompanyViewSet, 'retrieve', 'get', self.detail_url)
+        updated_at = Company.objects.get(pk=self.company.pk).updated_at
+        self.assertEqual(response['Last-Modified'], http_date(updated_at.timestamp()))
+        not_modified = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        since = self.client.get(self.detail_url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(since.status_code, 304)
+
+    def test_detail_validators_include_related_rows(self):
+        url = reverse('employee-detail', args=[self.org['employees'][0].pk])
+        etag = self.client.get(url)['ETag']
+        user = self.org['employees'][0].user
+        user.username = 'Renamed'
+        user.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_if_match(self):
+        etag = self.client.get(self.detail_url)['ETag']
+        response = self.client.patch(self.detail_url, {'name': 'First'}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        # The first write changed the company, so a second one with the same tag is refused.
+        response = self.client.patch(self.detail_url, {'name': 'Second'}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 412)
+        self.assertEqual(Company.objects.get(pk=self.company.pk).name, 'First')
+        response = self.client.delete(self.detail_url, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 412)
+
+
+class CachedResponseTests(QueryBudgetTestCase):
+    def setUp(self):
+        self.authenticate(self.admin)
+        self.department = self.org['departments'][0]
+
+    def metrics(self, namespace='organizations.department'):
+        return {key: cache_metrics()[namespace][key] for key in ('hits', 'misses')}
+
+    def test_hits_skip_the_database(self):
+        url = reverse('department-list')
+        first = self.client.get(url)
+        with self.assertNumQueries(0):
+            second = self.client.get(url)
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertEqual(self.metrics(), {'hits': 1, 'misses': 1})
+
+    @override_settings(SHARED_CACHE=False)
+    def test_not_cached_without_a_shared_cache(self):
+        url = reverse('department-list')
+        self.client.get(url)
+        Department.objects.filter(pk=self.department.pk).update(name='Renamed elsewhere')
+        self.assertIn('Renamed elsewhere', [row['name'] for row in self.client.get(url).json()['results']])
+        self.assertEqual(self.metrics(), {'hits': 0, 'misses': 0})
+
+    def test_keys_are_scoped(self):
+        url = reverse('department-list')
+        self.client.get(url)
+        self.authenticate(self.manager)
+        self.client.get(url)
+        self.client.get(url, {'fields': 'id'})
+        self.assertEqual(self.metrics(), {'hits': 0, 'misses': 3})
+
+    def test_saves_invalidate(self):
+        self.client.get(reverse('department-list'))
+        self.department.name = 'Renamed'
+        self.department.save()
+        names = [row['name'] for row in self.client.get(reverse('department-list')).data['results']]
+        self.assertIn('Renamed', names)
+
+    def test_details_are_invalidated_per_object(self):
+        other = self.org['departments'][1]
+        urls = [reverse('department-detail', args=[pk]) for pk in (self.department.pk, other.pk)]
+        for url in urls:
+            self.client.get(url)
+        other.name = 'Renamed'
+        other.save()
+        self.assertEqual(self.client.get(urls[0]).status_code, 200)
+        self.assertEqual(self.client.get(urls[1]).data['name'], 'Renamed')
+        self.assertEqual(self.metrics(), {'hits': 1, 'misses': 3})
+
+    def test_counter_flushes_invalidate(self):
+        url = reverse('company-detail', args=[self.org['company'].pk])
+        before = self.client.get(url).data['number_of_departments']
+        with self.captureOnCommitCallbacks(execute=True):
+            Department.objects.create(name='New', company=self.org['company'])
+        self.assertEqual(self.client.get(url).data['number_of_departments'], before + 1)
+
+
+class EmployeeLookupCacheTests(QueryBudgetTestCase):
+    def test_cached_until_the_employee_changes(self):
+        employee = self.org['employees'][0]
+        self.assertEqual(employee_for_user(self.employee).pk, employee.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(employee_for_user(self.employee).department_id, employee.department_id)
+
+        employee.department = self.org['departments'][1]
+        employee.save()
+        self.assertEqual(employee_for_user(self.employee).department_id, self.org['departments'][1].pk)
+
+    @override_settings(SHARED_CACHE=False)
+    def test_loaded_without_a_shared_cache(self):
+        employee_for_user(self.employee)
+        Employee.objects.filter(user=self.employee).update(department=self.org['departments'][1])
+        self.assertEqual(employee_for_user(self.employee).department_id, self.org['departments'][1].pk)
+
+    def test_missing_profiles_are_cached(self):
+        self.assertIsNone(employee_for_user(self.admin))
+        with self.assertNumQueries(0):
+            self.assertIsNone(employee_for_user(self.admin))
+        self.assertEqual(cache_metrics()[EMPLOYEE_BY_USER]['hits'], 1)
+
+
+class TimeBaseModelTests(QueryBudgetTestCase):
+    def setUp(self):
+        self.employee = Employee.objects.get(pk=self.org['employees'][0].pk)
+
+    def test_saves_only_changed_columns(self):
+        self.employee.designation = 'Lead'
+        with CaptureQueriesContext(connection) as queries:
+            self.employee.save()
+        update = next(query['sql'] for query in queries if query['sql'].startswith('UPDATE "organizations_employee"'))
+        assignments = update.split(' SET ')[1].split(' WHERE ')[0]
+        self.assertEqual(
+            [column.split(' = ')[0] for column in assignments.split(', ')],
+            ['"updated_at"', '"designation"'],
+        )
+        self.assertEqual(Employee.objects.get(pk=self.employee.pk).designation, 'Lead')
+        self.assertEqual(self.employee.changed_fields, set())
+
+    def test_post_save_sees_the_changes(self):
+        seen = []
+
+        def receiver(instance, created, **kwargs):
+            seen.append((created, instance.has_changed('designation'), instance.previous_value('designation')))
+
+        post_save.connect(receiver, sender=Employee)
+        self.addCleanup(post_save.disconnect, receiver, sender=Employee)
+        self.employee.designation = 'Lead'
+        self.employee.save()
+        self.employee.save()
+        self.assertEqual(seen, [(False, True, 'Engineer'), (False, False, 'Lead')])
+
+    def test_explicit_update_fields_keep_other_changes_pending(self):
+        self.employee.designation = 'Lead'
+        self.employee.address = 'Elsewhere'
+        self.employee.save(update_fields=['address'])
+        self.assertEqual(self.employee.changed_fields, {'designation'})
+        self.employee.save()
+        stored = Employee.objects.get(pk=self.employee.pk)
+        self.assertEqual((stored.designation, stored.address), ('Lead', 'Elsewhere'))
+
+    def test_saves_columns_changed_by_pre_save_receivers(self):
+        def receiver(instance, **kwargs):
+            instance.designation = instance.designation.upper()
+
+        pre_save.connect(receiver, sender=Employee)
+        self.addCleanup(pre_save.disconnect, receiver, sender=Employee)
+        self.employee.address = 'Elsewhere'
+        self.employee.save()
+        self.assertEqual(Employee.objects.get(pk=self.employee.pk).designation, 'ENGINEER')
+        self.assertEqual(self.employee.changed_fields, set())
+
+    def test_department_move_adjusts_both_counters(self):
+        source, target = self.org['departments']
+        counts = dict(Department.objects.values_list('pk', 'number_of_employees'))
+        self.employee.department = target
+        with self.captureOnCommitCallbacks(execute=True):
+            self.employee.save()
+        moved = dict(Department.objects.values_list('pk', 'number_of_employees'))
+        self.assertEqual(moved[source.pk], counts[source.pk] - 1)
+        self.assertEqual(moved[target.pk], counts[target.pk] + 1)
+
+    def test_saving_a_deleted_row_raises(self):
+        Employee.objects.filter(pk=self.employee.pk).delete()
+        self.employee.designation = 'Lead'
+        with self.assertRaises(DatabaseError), transaction.atomic():
+            self.employee.save()
+        self.assertFalse(Employee.objects.filter(pk=self.employee.pk).exists())
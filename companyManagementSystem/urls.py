@@ -14,6 +14,7 @@ urlpatterns = [
             path('projects/', include('projects.urls')),
             path('organizations/', include('organizations.urls')),
             path('performance/', include('performance.urls')),
+            path('search/', include('search.urls')),
             ])
         )
 ]
@@ -1,6 +1,24 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.http import HttpResponse
+
 from .models import Company, Department, Employee
+from .reconcile import CounterReconciler, write_drift_report
+
+
+@admin.register(Company)
+class CompanyAdmin(admin.ModelAdmin):
+    actions = ['reconcile_counters']
+
+    @admin.action(description="Reconcile counters and download drift report")
+    def reconcile_counters(self, request, queryset):
+        reconciler = CounterReconciler(company_ids=list(queryset.values_list('pk', flat=True)))
+        response = HttpResponse(content_type='text/csv')
+        response['Content-Disposition'] = 'attachment; filename="counter-drift.csv"'
+        drifted = write_drift_report(reconciler.run(), response)
+        self.message_user(request, f"Fixed {drifted} drifted counters in {reconciler.companies_checked} companies.",
+                          messages.SUCCESS)
+        return response
+
 
-admin.site.register(Company)
 admin.site.register(Department)
 admin.site.register(Employee)
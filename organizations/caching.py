@@ -0,0 +1,44 @@
+"""
+Cached lookups of hot single objects.
+
+`employee_for_user` answers "which employee profile (and so which company and department)
+does this user have?", asked by the role scoping of most endpoints. Profiles are cached per
+user, including the absence of one, and dropped by the Employee save/delete signals. Without a
+shared cache (`SHARED_CACHE`) a move made by another process would go unseen, so profiles are
+always loaded.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from companyManagementSystem.cache import NAMESPACES, invalidate, namespace_version, record_lookup
+from .models import Employee
+
+EMPLOYEE_BY_USER = 'organizations.employee-by-user'
+EMPLOYEE_CACHE_TIMEOUT = 60 * 60
+
+NAMESPACES.add(EMPLOYEE_BY_USER)
+
+_MISSING = object()
+
+
+def _employee_key(user_id):
+    return f'{EMPLOYEE_BY_USER}:{user_id}:{namespace_version(EMPLOYEE_BY_USER, user_id)}'
+
+
+def employee_for_user(user):
+    """Returns the employee profile of `user`, or None when it has none."""
+    if not user or not user.is_authenticated:
+        return None
+    if not settings.SHARED_CACHE:
+        return Employee.objects.filter(user_id=user.pk).first()
+    key = _employee_key(user.pk)
+    employee = cache.get(key, _MISSING)
+    record_lookup(EMPLOYEE_BY_USER, employee is not _MISSING)
+    if employee is _MISSING:
+        employee = Employee.objects.filter(user_id=user.pk).first()
+        cache.set(key, employee, EMPLOYEE_CACHE_TIMEOUT)
+    return employee
+
+
+def invalidate_employee_for_user(*user_ids):
+    invalidate(EMPLOYEE_BY_USER, *(user_id for user_id in user_ids if user_id is not None))
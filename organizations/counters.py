@@ -0,0 +1,186 @@
+"""
+Coalesced maintenance of the denormalized counters on Company and Department.
+
+Writers call `record()` with the deltas caused by their change. The deltas of a transaction
+are summed in memory and applied once it commits, one UPDATE per touched row, without a
+write to the delta tables. While a `flush_counters --interval` loop throttles the flushes
+(see `COUNTER_FLUSH_INTERVAL`), they are appended to the CounterDelta table inside the
+writer's transaction instead, and folded in after commit or by the loop. The analytics
+rollups in `organizations.stats` ride along: `record()` also accepts their StatDelta rows.
+
+Applying a delta also sets the row's `updated_at`. The counters are rendered with the row,
+so its ETag, Last-Modified and `?updated_since` exports have to change with them.
+
+Deltas held in memory are lost if the process dies between the commit and the update;
+`reconcile_counters` repairs the drift.
+"""
+import logging
+import threading
+from collections import Counter, defaultdict
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from companyManagementSystem.cache import invalidate, model_namespace
+from . import stats
+from .models import Company, Department, CounterDelta, StatDelta
+
+logger = logging.getLogger(__name__)
+
+COUNTER_MODELS = {
+    CounterDelta.Target.COMPANY: Company,
+    CounterDelta.Target.DEPARTMENT: Department,
+}
+
+FLUSH_BATCH_SIZE = 1000
+FLUSH_THROTTLE_KEY = 'organizations:counters:flush-throttle'
+FLUSH_WORKER_KEY = 'organizations:counters:flush-worker'
+
+
+def delta(model, pk, field, amount):
+    """Builds an unsaved CounterDelta for `field` of the `model` row with primary key `pk`."""
+    return CounterDelta(target=model._meta.model_name, object_id=pk, field=field, delta=amount)
+
+
+def record(*deltas):
+    """
+    Records the given CounterDelta and StatDelta rows, to be applied once the surrounding
+    transaction commits. See the module docstring for where they are kept until then.
+    """
+    deltas = [d for d in deltas if d.delta]
+    if not deltas:
+        return
+    if not _flush_loop_running():
+        _transaction_batch(deltas)
+        return
+    by_model = defaultdict(list)
+    for d in deltas:
+        by_model[type(d)].append(d)
+    for model, rows in by_model.items():
+        model.objects.bulk_create(rows)
+    transaction.on_commit(partial(_flush_after_commit, list(by_model)), robust=True)
+
+
+def mark_flush_worker(interval):
+    """Announces a `flush_counters --interval` loop that flushes every `interval` seconds."""
+    cache.set(FLUSH_WORKER_KEY, True, timeout=int(interval * 2) + 1)
+
+
+def _flush_loop_running():
+    # Deltas are only left for the loop while one has announced itself, so a missing loop
+    # costs contention, never stale counters.
+    return bool(getattr(settings, 'COUNTER_FLUSH_INTERVAL', 0)) and bool(cache.get(FLUSH_WORKER_KEY))
+
+
+def _flush_after_commit(models):
+    # Only one process flushes per interval and the counters may lag by up to that long;
+    # a throttled flush leaves its deltas for the next one.
+    interval = getattr(settings, 'COUNTER_FLUSH_INTERVAL', 0)
+    if _flush_loop_running() and not cache.add(FLUSH_THROTTLE_KEY, True, timeout=interval):
+        return
+    if CounterDelta in models:
+        flush_counter_deltas()
+    if StatDelta in models:
+        stats.flush_stat_deltas()
+
+
+class _Batch:
+    """The deltas recorded in one transaction, summed and applied after it commits."""
+
+    def __init__(self, savepoint_ids):
+        self.savepoint_ids = savepoint_ids
+        self.counters = defaultdict(Counter)
+        self.stats = Counter()
+        self.applied = False
+
+    def add(self, deltas):
+        for d in deltas:
+            if isinstance(d, CounterDelta):
+                self.counters[(d.target, d.object_id)][d.field] += d.delta
+            else:
+                self.stats[(d.company_id, d.department_id, d.dimension, d.key)] += d.delta
+
+    def __call__(self):
+        self.applied = True
+        with transaction.atomic():
+            apply_counter_totals(self.counters)
+            stats.apply_stat_totals(self.stats)
+
+
+_batches = threading.local()
+
+
+def _transaction_batch(deltas):
+    connection = transaction.get_connection()
+    batch = getattr(_batches, 'current', None)
+    # A batch takes more deltas until it is applied, as long as no savepoint was entered since
+    # it was scheduled. A rolled back savepoint discards the batches scheduled inside it.
+    if (
+        batch is not None and not batch.applied and batch.savepoint_ids == connection.savepoint_ids
+        and any(callback is batch for _, callback, _ in connection.run_on_commit)
+    ):
+        batch.add(deltas)
+        return
+    batch = _batches.current = _Batch(list(connection.savepoint_ids))
+    batch.add(deltas)
+    transaction.on_commit(batch, robust=True)
+
+
+def apply_counter_totals(totals):
+    """
+    Adds `{(target, object_id): {field: amount}}` to the counters, one UPDATE per touched
+    row, and invalidates the cached responses of the rows. Call it inside a transaction.
+    """
+    # Sorting puts companies before departments, each in primary key order, so every
+    # writer of counter rows takes its row locks in the same order.
+    changed = defaultdict(list)
+    for target, object_id in sorted(totals):
+        changes = {field: F(field) + amount for field, amount in totals[(target, object_id)].items() if amount}
+        if changes:
+            COUNTER_MODELS[target].objects.filter(pk=object_id).update(**changes, updated_at=timezone.now())
+            changed[COUNTER_MODELS[target]].append(object_id)
+    for model, object_ids in changed.items():
+        invalidate(model_namespace(model), *object_ids)
+
+
+def flush_counter_deltas(batch_size=FLUSH_BATCH_SIZE):
+    """
+    Folds up to `batch_size` pending deltas into the counters and deletes them.
+    Returns the number of deltas applied.
+
+    Deltas claimed by a concurrent flusher are skipped rather than waited on.
+    """
+    with transaction.atomic():
+        pending = CounterDelta.objects.order_by('pk')
+        if connection.features.has_select_for_update_skip_locked:
+            pending = pending.select_for_update(skip_locked=True)
+        pending = list(pending.values_list('pk', 'target', 'object_id', 'field', 'delta')[:batch_size])
+        if not pending:
+            return 0
+
+        totals = defaultdict(Counter)
+        for _, target, object_id, field, amount in pending:
+            totals[(target, object_id)][field] += amount
+        apply_counter_totals(totals)
+
+        CounterDelta.objects.filter(pk__in=[pk for pk, *_ in pending]).delete()
+
+    logger.debug(f'Flushed {len(pending)} counter deltas into {len(totals)} rows.')
+    return len(pending)
+
+
+def flush_all_counter_deltas(batch_size=FLUSH_BATCH_SIZE):
+    """
+    Flushes batches until no pending counter or stat deltas are left.
+    Returns the number of deltas applied.
+    """
+    total = 0
+    while flushed := flush_counter_deltas(batch_size):
+        total += flushed
+        if flushed < batch_size:
+            break
+    return total + stats.flush_all_stat_deltas(batch_size)
@@ -0,0 +1,59 @@
+from django.utils import timezone
+from rest_framework.filters import BaseFilterBackend
+
+from .serializers import EmployeeTenureQuerySerializer
+
+
+class TenureFilter(BaseFilterBackend):
+    """
+    Filters and orders employees by tenure:
+
+    - `?min_tenure_days=` / `?max_tenure_days=` bound the days since `hired_on`.
+    - `?anniversary_years=` keeps employees completing that many years in `?anniversary_month=`
+      (`YYYY-MM`, the current month by default).
+    - `?ordering=tenure` / `?ordering=-tenure` sorts by tenure.
+
+    Every condition is a range on `hired_on`, so the `hired_on` indexes answer it. Employees
+    without a hire date count as employed for 0 days, as `days_employed` reports, so the bounds
+    keep them when 0 is within range. They have no anniversaries, and ordering by tenure leaves
+    them out, since the cursor cannot seek past a missing date.
+    """
+    ORDERINGS = {'tenure': '-hired_on', '-tenure': 'hired_on'}
+
+    def get_params(self, request):
+        params = EmployeeTenureQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        return params.validated_data
+
+    def filter_queryset(self, request, queryset, view):
+        params = self.get_params(request)
+        today = timezone.now().date()
+        if 'min_tenure_days' in params:
+            queryset = queryset.with_min_tenure(params['min_tenure_days'], today)
+        if 'max_tenure_days' in params:
+            queryset = queryset.with_max_tenure(params['max_tenure_days'], today)
+        if 'anniversary_years' in params:
+            queryset = queryset.anniversaries(params['anniversary_years'], params.get('anniversary_month', today))
+        if 'ordering' in params:
+            # The cursor paginator applies the ordering itself, through `get_ordering`.
+            queryset = queryset.exclude(hired_on=None).order_by(self.ORDERINGS[params['ordering']])
+        return queryset
+
+    def get_ordering(self, request, queryset, view):
+        """Ordering used by the cursor paginator: by hire date for tenure, else the paginator's own."""
+        ordering = self.get_params(request).get('ordering')
+        if ordering:
+            return (self.ORDERINGS[ordering],)
+        return view.paginator.ordering
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {'name': name, 'required': False, 'in': 'query', 'description': description, 'schema': {'type': kind}}
+            for name, kind, description in (
+                ('min_tenure_days', 'integer', 'Only employees employed for at least this many days.'),
+                ('max_tenure_days', 'integer', 'Only employees employed for at most this many days.'),
+                ('anniversary_years', 'integer', 'Only employees completing this many years in `anniversary_month`.'),
+                ('anniversary_month', 'string', 'Month of the anniversaries, as YYYY-MM. Defaults to the current month.'),
+                ('ordering', 'string', '`tenure` or `-tenure`.'),
+            )
+        ]
@@ -0,0 +1,170 @@
+from collections import Counter
+from itertools import islice
+
+from django.db import IntegrityError, transaction
+from rest_framework.exceptions import ValidationError
+
+from search.indexing import update_search_vectors
+from users.models import User
+from . import counters, stats
+from .models import Company, Department, Employee
+from .serializers import EmployeeImportRowSerializer
+from .tree import invalidate_tree
+
+
+class EmployeeImporter:
+    """
+    Imports employees in bulk from an iterable of rows (dicts).
+
+    Rows are consumed lazily and validated in chunks. Each chunk costs a fixed number of
+    queries: one lookup for companies, one for departments, one for existing emails, one
+    `bulk_create` each for users and employees and one UPDATE of the new employees' search
+    vectors. Row-level `post_save` signals are bypassed, so the counter and stat deltas are
+    recorded (and the cached organization trees dropped) once per touched company and
+    department at the end.
+
+    The whole import runs in a single transaction; rows that fail validation are skipped
+    and reported, they never abort the import.
+    """
+    chunk_size = 1000
+
+    def __init__(self, chunk_size=None):
+        if chunk_size:
+            self.chunk_size = chunk_size
+        self.created = 0
+        self.errors = []
+        self.seen_emails = set()
+        self.company_counts = Counter()
+        self.department_counts = Counter()
+        self.stat_counts = Counter()
+        # A single serializer is reused for every row; binding fresh fields per row dominates the run time.
+        self.row_serializer = EmployeeImportRowSerializer()
+
+    def run(self, rows):
+        numbered_rows = enumerate(rows, start=1)
+        with transaction.atomic():
+            while chunk := list(islice(numbered_rows, self.chunk_size)):
+                self._import_chunk(chunk)
+            self._update_counters()
+            invalidate_tree(*self.company_counts)
+        return self.report()
+
+    def report(self):
+        return {
+            'created': self.created,
+            'failed': len(self.errors),
+            'errors': sorted(self.errors, key=lambda error: error['row']),
+        }
+
+    def _add_error(self, row_number, errors):
+        self.errors.append({'row': row_number, 'errors': errors})
+
+    def _validate(self, chunk):
+        valid_rows = []
+        for row_number, row in chunk:
+            try:
+                valid_rows.append((row_number, self.row_serializer.run_validation(row)))
+            except ValidationError as e:
+                self._add_error(row_number, e.detail)
+        return valid_rows
+
+    def _import_chunk(self, chunk):
+        valid_rows = self._validate(chunk)
+        if not valid_rows:
+            return
+
+        company_ids = set(Company.objects.filter(
+            pk__in={data['company'] for _, data in valid_rows}
+        ).values_list('pk', flat=True))
+        department_companies = dict(Department.objects.filter(
+            pk__in={data['department'] for _, data in valid_rows}
+        ).values_list('pk', 'company_id'))
+        existing_emails = set(User.objects.filter(
+            email__in={data['email'] for _, data in valid_rows}
+        ).values_list('email', flat=True))
+
+        users, employees = [], []
+        for row_number, data in valid_rows:
+            errors = self._check_references(data, company_ids, department_companies, existing_emails)
+            if errors:
+                self._add_error(row_number, errors)
+                continue
+            self.seen_emails.add(data['email'])
+            user = User(email=data['email'], username=data.get('username'), role=data['role'])
+            users.append(user)
+            employees.append((row_number, Employee(
+                user=user,
+                company_id=data['company'],
+                department_id=data['department'],
+                mobile_number=data.get('mobile_number'),
+                address=data.get('address'),
+                designation=data['designation'],
+                hired_on=data.get('hired_on'),
+            )))
+
+        if not employees:
+            return
+
+        try:
+            with transaction.atomic():
+                self._create(users, [employee for _, employee in employees])
+        except IntegrityError:
+            # Another request created one of these users after our email check. The chunk is
+            # rolled back to its savepoint and retried row by row, so only the conflicting rows fail.
+            employees = [
+                (row_number, employee) for (row_number, employee), user in zip(employees, users)
+                if self._create_row(row_number, user, employee)
+            ]
+
+        self.created += len(employees)
+        for _, employee in employees:
+            self.company_counts[employee.company_id] += 1
+            self.department_counts[employee.department_id] += 1
+            cell = (employee.company_id, employee.department_id)
+            self.stat_counts[(*cell, stats.Dimension.DESIGNATION, employee.designation)] += 1
+            self.stat_counts[(*cell, stats.Dimension.HIRED_ON, employee.hired_on)] += 1
+
+    @staticmethod
+    def _create(users, employees):
+        User.objects.bulk_create(users)
+        created = Employee.objects.bulk_create(employees)
+        update_search_vectors(Employee.objects.filter(pk__in=[employee.pk for employee in created]))
+
+    def _create_row(self, row_number, user, employee):
+        """Creates one row on its own, reporting a constraint violation as a row error. Returns whether it was created."""
+        user.pk = employee.pk = employee.user_id = None
+        try:
+            with transaction.atomic():
+                self._create([user], [employee])
+        except IntegrityError as e:
+            self._add_error(row_number, self._integrity_errors(e))
+            return False
+        return True
+
+    @staticmethod
+    def _integrity_errors(error):
+        constraint = getattr(getattr(error.__cause__, 'diag', None), 'constraint_name', None) or ''
+        if 'email' in constraint:
+            return {'email': ['User with this email already exists.']}
+        return {'non_field_errors': [str(error)]}
+
+    def _check_references(self, data, company_ids, department_companies, existing_emails):
+        errors = {}
+        if data['email'] in existing_emails or data['email'] in self.seen_emails:
+            errors['email'] = ['User with this email already exists.']
+        if data['company'] not in company_ids:
+            errors['company'] = [f"Company {data['company']} does not exist."]
+        if data['department'] not in department_companies:
+            errors['department'] = [f"Department {data['department']} does not exist."]
+        elif department_companies[data['department']] != data['company']:
+            errors['department'] = [f"Department {data['department']} does not belong to company {data['company']}."]
+        return errors
+
+    def _update_counters(self):
+        counters.record(
+            *(counters.delta(Company, company_id, 'number_of_employees', count)
+              for company_id, count in self.company_counts.items()),
+            *(counters.delta(Department, department_id, 'number_of_employees', count)
+              for department_id, count in self.department_counts.items()),
+            *(stats.stat_delta(*cell, count) for cell, count in self.stat_counts.items()),
+        )
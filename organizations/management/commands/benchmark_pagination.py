@@ -0,0 +1,87 @@
+import json
+import time
+from base64 import b64encode
+from urllib.parse import urlencode
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.urls import reverse
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from companyManagementSystem.pagination import CustomCursorPagination
+from organizations.models import Company, Department
+from projects.models import Project
+from projects.views import ProjectViewSet
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures fetching a page of the project list at increasing depths: keyset cursors "
+        "against OFFSET paging. Inserts the rows in one statement, many sharing a timestamp, "
+        "and rolls them back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10_000_000, help='Projects to insert.')
+        parser.add_argument('--page-size', type=int, default=50)
+        parser.add_argument('--ties', type=int, default=100,
+                            help='Rows sharing each creation timestamp, as bulk inserts produce.')
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Runs per measurement; the fastest one is reported.')
+
+    def handle(self, *args, **options):
+        rows, page_size = options['rows'], options['page_size']
+        try:
+            with transaction.atomic():
+                self.stderr.write(f'Inserting {rows} projects...')
+                company = Company.objects.create(name='Benchmark')
+                department = Department.objects.create(name='Benchmark', company=company)
+                self._insert(company, department, rows, options['ties'])
+
+                queryset = ProjectViewSet.action_querysets['list']
+                self.stdout.write(f"{'depth':>12}{'keyset ms':>12}{'offset ms':>12}")
+                for depth in sorted({0, rows // 100, rows // 2, max(rows - page_size, 0)}):
+                    request = self._request(depth, page_size)
+                    keyset = self._measure(options['repeat'],
+                                           lambda: CustomCursorPagination().paginate_queryset(queryset, request))
+                    ordered = queryset.order_by('-created_at', '-id')
+                    offset = self._measure(options['repeat'], lambda: list(ordered[depth:depth + page_size]))
+                    self.stdout.write(f'{depth:>12}{keyset:>12.1f}{offset:>12.1f}')
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _insert(self, company, department, rows, ties):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {Project._meta.db_table} '
+                '(name, description, start_date, end_date, company_id, department_id, created_at, updated_at) '
+                "SELECT 'Project ' || n, '', CURRENT_DATE, CURRENT_DATE, %s, %s, "
+                "now() - (n / %s) * interval '1 second', now() "
+                'FROM generate_series(1, %s) AS n',
+                [company.pk, department.pk, max(ties, 1), rows],
+            )
+            cursor.execute(f'ANALYZE {Project._meta.db_table}')
+
+    def _request(self, depth, page_size):
+        params = {'page_size': page_size}
+        if depth:
+            # The cursor a client holds after paging down to `depth`.
+            row = Project.objects.order_by('-created_at', '-id').values_list('created_at', 'id')[depth - 1]
+            position = urlencode({'p': json.dumps([str(value) for value in row])})
+            params['cursor'] = b64encode(position.encode()).decode()
+        return Request(APIRequestFactory().get(reverse('project-list'), params))
+
+    def _measure(self, repeat, run):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run()
+            elapsed = (time.perf_counter() - start) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        return best
@@ -0,0 +1,73 @@
+import time
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from companyManagementSystem.query_budget import count_queries
+from companyManagementSystem.testing import create_user, seed_organization
+from organizations.views import CompanyViewSet, DepartmentViewSet, EmployeeViewSet
+from performance.views import PerformanceReviewViewSet
+from projects.views import ProjectViewSet
+from users.models import User
+
+VIEWSETS = (CompanyViewSet, DepartmentViewSet, EmployeeViewSet, ProjectViewSet, PerformanceReviewViewSet)
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the query count and latency of serializing a list page from the bare model "
+        "queryset (before) and from each viewset's list queryset (after). Runs on seeded data "
+        "that is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000],
+                            help='Page sizes to measure.')
+        parser.add_argument('--repeat', type=int, default=3,
+                            help='Runs per measurement; the fastest one is reported.')
+
+    def handle(self, *args, **options):
+        sizes = options['sizes']
+        try:
+            with transaction.atomic():
+                self.stderr.write('Seeding benchmark data...')
+                # Enough departments that every model has at least max(sizes) rows.
+                departments = max(1, -(-max(sizes) // 50))
+                seed_organization('Benchmark', departments=departments, employees_per_department=50,
+                                  projects_per_department=50, assignees_per_project=5)
+                admin = create_user('benchmark-admin@example.com', User.Role.ADMIN)
+
+                self.stdout.write(f"{'endpoint':<32}{'rows':>6}{'queries':>18}{'ms':>22}")
+                for viewset in VIEWSETS:
+                    for size in sizes:
+                        before = self._measure(viewset, admin, size, options['repeat'], optimized=False)
+                        after = self._measure(viewset, admin, size, options['repeat'], optimized=True)
+                        self.stdout.write(
+                            f'{viewset.__name__ + ".list":<32}{after[2]:>6}'
+                            f'{before[0]:>8} -> {after[0]:<6}{before[1]:>10.1f} -> {after[1]:.1f}'
+                        )
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _measure(self, viewset, user, size, repeat, optimized):
+        view = viewset(action='list', request=SimpleNamespace(user=user), format_kwarg=None, kwargs={})
+        serializer_class = view.get_serializer_class()
+        best = None
+        for _ in range(repeat):
+            if optimized:
+                queryset = view.get_queryset()
+            else:
+                queryset = viewset.queryset.model.objects.all()
+            start = time.perf_counter()
+            with count_queries() as queries:
+                rows = len(serializer_class(queryset.order_by('-created_at')[:size], many=True).data)
+            elapsed = (time.perf_counter() - start) * 1000
+            if best is None or elapsed < best[1]:
+                best = (queries.count, elapsed)
+        return best + (rows,)
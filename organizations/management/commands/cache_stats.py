@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from companyManagementSystem.cache import cache_metrics, reset_cache_metrics
+# Imported for their cache namespaces.
+import organizations.caching  # noqa: F401
+import organizations.views  # noqa: F401
+
+
+class Command(BaseCommand):
+    help = "Prints the hit rate of each cache namespace, counted across every process sharing the cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Zero the counters after printing them.')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'namespace':<36}{'hits':>10}{'misses':>10}{'hit rate':>10}")
+        for namespace, metrics in cache_metrics().items():
+            rate = '-' if metrics['hit_rate'] is None else f"{metrics['hit_rate']:.1%}"
+            self.stdout.write(f"{namespace:<36}{metrics['hits']:>10}{metrics['misses']:>10}{rate:>10}")
+        if options['reset']:
+            reset_cache_metrics()
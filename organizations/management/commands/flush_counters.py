@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from organizations.counters import flush_all_counter_deltas, mark_flush_worker, FLUSH_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = "Folds pending counter and stat deltas into the Company and Department counters and rollups."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=FLUSH_BATCH_SIZE,
+                            help='Number of deltas applied per transaction.')
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Keep running and flush every N seconds instead of exiting.')
+
+    def handle(self, *args, **options):
+        while True:
+            if options['interval']:
+                # Lets after-commit flushes honour COUNTER_FLUSH_INTERVAL while this loop runs.
+                mark_flush_worker(options['interval'])
+            flushed = flush_all_counter_deltas(options['batch_size'])
+            if flushed:
+                self.stdout.write(f'Flushed {flushed} deltas.')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from organizations.models import Company
+from organizations.stats import rebuild_stats
+
+
+class Command(BaseCommand):
+    help = "Recomputes the company analytics rollups from the source tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', type=int, action='append', dest='company_ids',
+                            help='Only rebuild this company. May be repeated.')
+
+    def handle(self, *args, **options):
+        companies = Company.objects.order_by('pk')
+        if options['company_ids']:
+            companies = companies.filter(pk__in=options['company_ids'])
+
+        rebuilt = rows = 0
+        for company_id in list(companies.values_list('pk', flat=True)):
+            rows += rebuild_stats(company_id)
+            rebuilt += 1
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt the stats of {rebuilt} companies ({rows} rows).'))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from organizations.reconcile import CounterReconciler, write_drift_report
+
+
+class Command(BaseCommand):
+    help = "Recomputes the Company and Department counters and fixes any drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=CounterReconciler.chunk_size,
+                            help='Number of companies reconciled per transaction.')
+        parser.add_argument('--company', type=int, action='append', dest='company_ids',
+                            help='Only reconcile this company. May be repeated.')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report drift without fixing it.')
+        parser.add_argument('--report', default='-',
+                            help='Path of the CSV drift report, "-" for stdout.')
+
+    def handle(self, *args, **options):
+        reconciler = CounterReconciler(
+            chunk_size=options['chunk_size'],
+            company_ids=options['company_ids'],
+            dry_run=options['dry_run'],
+        )
+        if options['report'] == '-':
+            drifted = write_drift_report(reconciler.run(), self.stdout)
+        else:
+            with open(options['report'], 'w', newline='') as report:
+                drifted = write_drift_report(reconciler.run(), report)
+
+        action = 'found' if options['dry_run'] else 'fixed'
+        self.stderr.write(self.style.SUCCESS(
+            f'Checked {reconciler.companies_checked} companies, {action} {drifted} drifted counters.'
+        ))
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0004_counterdelta'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='counterdelta',
+            index=models.Index(fields=['target', 'object_id', 'field'], name='counterdelta_target_idx'),
+        ),
+    ]
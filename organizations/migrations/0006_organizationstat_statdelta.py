@@ -0,0 +1,43 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0005_counterdelta_target_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatDelta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('company_id', models.BigIntegerField()),
+                ('department_id', models.BigIntegerField()),
+                ('dimension', models.CharField(choices=[('designation', 'Employee designation'), ('hired_on', 'Employee hire date'), ('project_end', 'Project end date'), ('review_state', 'Review state')], max_length=20)),
+                ('key', models.CharField(blank=True, max_length=100)),
+                ('delta', models.IntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['company_id'], name='statdelta_company_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='OrganizationStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(choices=[('designation', 'Employee designation'), ('hired_on', 'Employee hire date'), ('project_end', 'Project end date'), ('review_state', 'Review state')], max_length=20)),
+                ('key', models.CharField(blank=True, max_length=100)),
+                ('count', models.IntegerField(default=0)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='organizations.company')),
+                ('department', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='organizations.department')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('department', 'dimension', 'key'), name='unique_stat_per_department')],
+            },
+        ),
+    ]
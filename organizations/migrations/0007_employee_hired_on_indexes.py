@@ -0,0 +1,26 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:17
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Build the indexes without locking the employee table against writes.
+    atomic = False
+
+    dependencies = [
+        ('organizations', '0006_organizationstat_statdelta'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='employee',
+            index=models.Index(fields=['hired_on'], name='employee_hired_on_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='employee',
+            index=models.Index(fields=['department', 'hired_on'], name='employee_department_hired_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:19
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # Build the GIN indexes without locking the tables against writes.
+    atomic = False
+
+    dependencies = [
+        ('organizations', '0007_employee_hired_on_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='department',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='employee',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        AddIndexConcurrently(
+            model_name='department',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='department_search_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='employee',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='employee_search_idx'),
+        ),
+    ]
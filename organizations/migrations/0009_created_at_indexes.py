@@ -0,0 +1,34 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:24
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Build the indexes without locking the tables against writes.
+    atomic = False
+
+    dependencies = [
+        ('organizations', '0008_search_vectors'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='company',
+            index=models.Index(fields=['created_at', 'id'], name='company_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='department',
+            index=models.Index(fields=['created_at', 'id'], name='department_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='employee',
+            index=models.Index(fields=['department', 'created_at', 'id'], name='employee_dept_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='employee',
+            index=models.Index(fields=['created_at', 'id'], name='employee_created_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:27
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Build the indexes without locking the tables against writes.
+    atomic = False
+
+    dependencies = [
+        ('organizations', '0009_created_at_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='employee',
+            index=models.Index(fields=['updated_at'], name='employee_updated_idx'),
+        ),
+    ]
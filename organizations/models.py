@@ -1,4 +1,10 @@
+from datetime import timedelta
+
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models import ExpressionWrapper, F, Q, Value
+from django.db.models.functions import Coalesce, ExtractDay
 from django.conf import settings
 from django.utils import timezone
 
@@ -14,6 +20,9 @@ class Company(TimeBaseModel):
 
     class Meta:
         verbose_name_plural = "Companies"
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='company_created_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -25,14 +34,52 @@ class Department(TimeBaseModel):
     number_of_employees = models.PositiveIntegerField(default=0)
     number_of_projects = models.PositiveIntegerField(default=0)
 
+    # Maintained by the `search` app.
+    search_vector = SearchVectorField(null=True, editable=False)
+
     class Meta:
         constraints = [
             models.UniqueConstraint(fields=['name', 'company'], name='unique_department_per_company')
         ]
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='department_created_idx'),
+            GinIndex(fields=['search_vector'], name='department_search_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.company.name})"
 
+class EmployeeQuerySet(models.QuerySet):
+    """
+    Tenure helpers. Filters are expressed as ranges on `hired_on`, so they are answered
+    from the `hired_on` indexes instead of computing every employee's tenure. Employees
+    without a hire date have a tenure of 0 days, as `with_tenure` and `days_employed` report.
+    """
+
+    def with_tenure(self, today=None):
+        """Annotates `tenure_days`, the days since `hired_on` (0 without a hire date)."""
+        today = today or timezone.now().date()
+        elapsed = ExpressionWrapper(Value(today, output_field=models.DateField()) - F('hired_on'),
+                                    output_field=models.DurationField())
+        return self.annotate(tenure_days=Coalesce(ExtractDay(elapsed), 0))
+
+    def with_min_tenure(self, days, today=None):
+        today = today or timezone.now().date()
+        condition = Q(hired_on__lte=today - timedelta(days=days))
+        return self.filter(condition | Q(hired_on=None) if days <= 0 else condition)
+
+    def with_max_tenure(self, days, today=None):
+        today = today or timezone.now().date()
+        condition = Q(hired_on__gte=today - timedelta(days=days))
+        return self.filter(condition | Q(hired_on=None) if days >= 0 else condition)
+
+    def anniversaries(self, years, month):
+        """Employees completing `years` years of service in the month starting on `month`."""
+        start = month.replace(day=1)
+        end = (start + timedelta(days=31)).replace(day=1)
+        return self.filter(hired_on__gte=start.replace(year=start.year - years),
+                           hired_on__lt=end.replace(year=end.year - years))
+
 class Employee(TimeBaseModel):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='employee')
     company = models.ForeignKey(Company, related_name='employees', on_delete=models.CASCADE)
@@ -42,11 +89,106 @@ class Employee(TimeBaseModel):
     designation = models.CharField(max_length=100)
     hired_on = models.DateField(null=True, blank=True)
 
+    # Maintained by the `search` app, from the user's name and email and the designation.
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = EmployeeQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['hired_on'], name='employee_hired_on_idx'),
+            models.Index(fields=['department', 'hired_on'], name='employee_department_hired_idx'),
+            models.Index(fields=['department', 'created_at', 'id'], name='employee_dept_created_idx'),
+            models.Index(fields=['created_at', 'id'], name='employee_created_idx'),
+            models.Index(fields=['updated_at'], name='employee_updated_idx'),
+            GinIndex(fields=['search_vector'], name='employee_search_idx'),
+        ]
+
     @property
     def days_employed(self):
+        # Querysets annotated with `with_tenure()` have already computed it in the database.
+        if hasattr(self, 'tenure_days'):
+            return self.tenure_days
         if self.hired_on:
             return (timezone.now().date() - self.hired_on).days
         return 0
 
     def __str__(self):
         return f"{self.user.get_full_name()} ({self.user.email})"
+
+class CounterDelta(models.Model):
+    """
+    A pending change to one of the denormalized counters on Company or Department.
+
+    While a `flush_counters --interval` loop throttles the flushes, signals append rows here
+    instead of updating the counter rows in place, so concurrent writers never queue up on the
+    same company row. Pending deltas are folded into the counters by
+    `organizations.counters.flush_counter_deltas`.
+    """
+    class Target(models.TextChoices):
+        COMPANY = 'company', 'Company'
+        DEPARTMENT = 'department', 'Department'
+
+    target = models.CharField(max_length=20, choices=Target.choices)
+    object_id = models.BigIntegerField()
+    field = models.CharField(max_length=50)
+    delta = models.IntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['target', 'object_id', 'field'], name='counterdelta_target_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.target} {self.object_id}: {self.field} {self.delta:+d}"
+
+
+class OrganizationStat(models.Model):
+    """
+    One cell of the analytics rollups: how many employees, projects or reviews of a
+    department share a value of one dimension (e.g. designation "Engineer").
+
+    Rows are maintained incrementally from `StatDelta` rows by `organizations.stats`; values
+    whose meaning depends on the current date (tenure, project status) are stored as dates
+    and bucketed when read.
+    """
+    class Dimension(models.TextChoices):
+        DESIGNATION = 'designation', 'Employee designation'
+        HIRED_ON = 'hired_on', 'Employee hire date'
+        PROJECT_END = 'project_end', 'Project end date'
+        REVIEW_STATE = 'review_state', 'Review state'
+
+    company = models.ForeignKey(Company, related_name='stats', on_delete=models.CASCADE)
+    department = models.ForeignKey(Department, related_name='stats', on_delete=models.CASCADE)
+    dimension = models.CharField(max_length=20, choices=Dimension.choices)
+    key = models.CharField(max_length=100, blank=True)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['department', 'dimension', 'key'], name='unique_stat_per_department')
+        ]
+
+    def __str__(self):
+        return f"{self.department_id} {self.dimension}={self.key!r}: {self.count}"
+
+class StatDelta(models.Model):
+    """
+    A pending change to an OrganizationStat row, recorded alongside the counter deltas and
+    folded in by `organizations.stats.flush_stat_deltas`.
+    """
+    company_id = models.BigIntegerField()
+    department_id = models.BigIntegerField()
+    dimension = models.CharField(max_length=20, choices=OrganizationStat.Dimension.choices)
+    key = models.CharField(max_length=100, blank=True)
+    delta = models.IntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['company_id'], name='statdelta_company_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.department_id} {self.dimension}={self.key!r}: {self.delta:+d}"
@@ -0,0 +1,57 @@
+import csv
+import json
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+class CSVStreamParser(BaseParser):
+    """
+    Parses a CSV body lazily, yielding one dict per data row.
+    The first line is expected to be the header row. Rows are read while the caller consumes
+    them, so undecodable or malformed input raises `ParseError` (a 400) at that point.
+    """
+    media_type = 'text/csv'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        return self._iter_rows(stream, encoding)
+
+    @staticmethod
+    def _iter_rows(stream, encoding):
+        reader = csv.DictReader(line.decode(encoding) for line in stream)
+        try:
+            yield from reader
+        except UnicodeDecodeError:
+            # Neither error has counted the line it failed on yet.
+            raise ParseError(f'CSV parse error - line {reader.line_num + 1} is not valid {encoding}.')
+        except csv.Error as e:
+            raise ParseError(f'CSV parse error - line {reader.line_num + 1}: {e}')
+
+
+class NDJSONStreamParser(BaseParser):
+    """
+    Parses a newline-delimited JSON body lazily, yielding one value per non-blank line.
+    Lines that are not valid JSON are yielded as the raw string so the caller can report them;
+    a line that cannot be decoded raises `ParseError` (a 400) when it is reached.
+    """
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        return self._iter_rows(stream, encoding)
+
+    @staticmethod
+    def _iter_rows(stream, encoding):
+        for line_number, line in enumerate(stream, start=1):
+            try:
+                line = line.decode(encoding).strip()
+            except UnicodeDecodeError:
+                raise ParseError(f'NDJSON parse error - line {line_number} is not valid {encoding}.')
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield line
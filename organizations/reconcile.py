@@ -0,0 +1,126 @@
+"""
+Recomputes the denormalized counters on Company and Department from the source tables
+and repairs any drift.
+
+Companies are processed in primary-key order, a chunk at a time, each chunk in its own
+short transaction. Within a chunk the counter rows are locked first (companies, then
+departments, in the same order `counters.flush_counter_deltas` uses) and the actual
+values are read with a single aggregate statement per model, so the comparison runs
+against one consistent snapshot. Pending counter deltas are subtracted from the actual
+values, because they will still be added when they are flushed.
+"""
+import csv
+
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from companyManagementSystem.cache import invalidate, model_namespace
+from projects.models import ArchivedProject, Project
+from .models import Company, CounterDelta, Department, Employee
+
+# Each counter counts the rows of its models; archived projects still count.
+COMPANY_COUNTERS = {
+    'number_of_departments': ((Department,), 'company'),
+    'number_of_employees': ((Employee,), 'company'),
+    'number_of_projects': ((Project, ArchivedProject), 'company'),
+}
+
+DEPARTMENT_COUNTERS = {
+    'number_of_employees': ((Employee,), 'department'),
+    'number_of_projects': ((Project, ArchivedProject), 'department'),
+}
+
+REPORT_FIELDS = ('model', 'id', 'field', 'stored', 'expected')
+
+
+def _actual_count(models, fk):
+    counts = []
+    for model in models:
+        rows = model.objects.filter(**{fk: OuterRef('pk')}).order_by().values(fk).annotate(total=Count('pk'))
+        counts.append(Coalesce(Subquery(rows.values('total')), 0))
+    return sum(counts[1:], counts[0])
+
+
+def _pending_delta(target, field):
+    rows = CounterDelta.objects.filter(target=target, object_id=OuterRef('pk'), field=field) \
+        .order_by().values('object_id').annotate(total=Sum('delta'))
+    return Coalesce(Subquery(rows.values('total')), 0)
+
+
+class CounterReconciler:
+    """
+    Finds and fixes counter drift. Iterating `run()` yields one dict per drifted
+    counter with the stored value and the value it was (or, in a dry run, would be) set to.
+    """
+    chunk_size = 500
+
+    def __init__(self, chunk_size=None, company_ids=None, dry_run=False):
+        if chunk_size:
+            self.chunk_size = chunk_size
+        self.company_ids = company_ids
+        self.dry_run = dry_run
+        self.companies_checked = 0
+
+    def run(self):
+        last_pk = 0
+        while True:
+            with transaction.atomic():
+                company_ids = self._lock_next_companies(last_pk)
+                if not company_ids:
+                    return
+                drift = self._reconcile(Company, COMPANY_COUNTERS, {'pk__in': company_ids})
+                drift += self._reconcile(Department, DEPARTMENT_COUNTERS, {'company_id__in': company_ids})
+
+            self.companies_checked += len(company_ids)
+            last_pk = company_ids[-1]
+            yield from drift
+
+    def _lock_next_companies(self, last_pk):
+        companies = Company.objects.select_for_update().filter(pk__gt=last_pk).order_by('pk')
+        if self.company_ids is not None:
+            companies = companies.filter(pk__in=self.company_ids)
+        return list(companies.values_list('pk', flat=True)[:self.chunk_size])
+
+    def _reconcile(self, model, counters, filters):
+        rows = model.objects.filter(**filters).order_by('pk')
+        # Lock before reading so no flush can land between the read and the fix.
+        list(rows.select_for_update().values_list('pk', flat=True))
+
+        target = model._meta.model_name
+        annotations = {}
+        for field, (sources, fk) in counters.items():
+            annotations[f'actual_{field}'] = _actual_count(sources, fk)
+            annotations[f'pending_{field}'] = _pending_delta(target, field)
+
+        drift, fixes, now = [], [], timezone.now()
+        for row in rows.annotate(**annotations).values('pk', *counters, *annotations):
+            expected = {
+                field: row[f'actual_{field}'] - row[f'pending_{field}']
+                for field in counters
+            }
+            drifted = [field for field in counters if row[field] != expected[field]]
+            if not drifted:
+                continue
+            fixes.append(model(pk=row['pk'], updated_at=now, **expected))
+            drift += [
+                {'model': target, 'id': row['pk'], 'field': field, 'stored': row[field], 'expected': expected[field]}
+                for field in drifted
+            ]
+
+        if fixes and not self.dry_run:
+            model.objects.bulk_update(fixes, [*counters, 'updated_at'], batch_size=self.chunk_size)
+            invalidate(model_namespace(model), *(fix.pk for fix in fixes))
+        return drift
+
+
+def write_drift_report(drift, file):
+    """Writes drift entries as CSV to the given file-like object and returns how many were written."""
+    writer = csv.DictWriter(file, fieldnames=REPORT_FIELDS)
+    writer.writeheader()
+    written = 0
+    for entry in drift:
+        writer.writerow(entry)
+        written += 1
+    return written
@@ -1,27 +1,49 @@
 from rest_framework import serializers
+
+from companyManagementSystem.fieldsets import SparseFieldsetsMixin
 from .models import Company, Department, Employee
+from users.models import User
 from users.serializers import UserSerializer
+from .tree import TREE_DEPTH
 
-class CompanySerializer(serializers.ModelSerializer):
+class CompanySerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     class Meta:
         model = Company
         fields = ('id', 'name', 'number_of_departments', 'number_of_employees', 'number_of_projects')
         read_only_fields = ('number_of_departments', 'number_of_employees', 'number_of_projects')
 
-class DepartmentSerializer(serializers.ModelSerializer):
+class DepartmentSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
 
     class Meta:
         model = Department
         fields = ('id', 'name', 'company', 'number_of_employees', 'number_of_projects')
         read_only_fields = ('number_of_employees', 'number_of_projects')
 
-class EmployeeSerializer(serializers.ModelSerializer):
+class CompanyTreeQuerySerializer(serializers.Serializer):
+    """Validates the query parameters of the company tree action."""
+    depth = serializers.IntegerField(min_value=0, max_value=TREE_DEPTH, default=TREE_DEPTH)
+    stream = serializers.BooleanField(default=False)
+
+class CompanyStatsQuerySerializer(serializers.Serializer):
+    """Validates the query parameters of the company stats action."""
+    department = serializers.IntegerField(required=False)
+
+class EmployeeTenureQuerySerializer(serializers.Serializer):
+    """Validates the tenure query parameters of the employee list."""
+    min_tenure_days = serializers.IntegerField(min_value=0, required=False)
+    max_tenure_days = serializers.IntegerField(min_value=0, required=False)
+    anniversary_years = serializers.IntegerField(min_value=1, required=False)
+    anniversary_month = serializers.DateField(input_formats=['%Y-%m'], required=False)
+    ordering = serializers.ChoiceField(choices=['tenure', '-tenure'], required=False)
+
+class EmployeeSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     user = UserSerializer()
 
     class Meta:
         model = Employee
         fields = ('id', 'user', 'company', 'department', 'mobile_number', 'address', 'designation', 'hired_on', 'days_employed')
         read_only_fields = ('days_employed',)
+        field_sources = {'days_employed': ('hired_on',)}
 
     def create(self, validated_data):
         user_data = validated_data.pop('user')
@@ -39,3 +61,25 @@ class EmployeeSerializer(serializers.ModelSerializer):
 
         return super().update(instance, validated_data)
 
+
+class EmployeeImportRowSerializer(serializers.Serializer):
+    """
+    Validates a single row of a bulk employee import.
+    Foreign keys are plain integers here; they are checked per chunk by the importer
+    so that validating a row never hits the database.
+    """
+    email = serializers.EmailField()
+    username = serializers.CharField(max_length=50, required=False, allow_blank=True, allow_null=True)
+    role = serializers.ChoiceField(choices=User.Role.choices, default=User.Role.EMPLOYEE)
+    company = serializers.IntegerField(min_value=1)
+    department = serializers.IntegerField(min_value=1)
+    mobile_number = serializers.CharField(max_length=20, required=False, allow_blank=True, allow_null=True)
+    address = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    designation = serializers.CharField(max_length=100)
+    hired_on = serializers.DateField(required=False, allow_null=True)
+
+    def to_internal_value(self, data):
+        # CSV has no notion of null, so empty cells are treated as missing values.
+        if isinstance(data, dict):
+            data = {key: value for key, value in data.items() if value not in ('', None)}
+        return super().to_internal_value(data)
@@ -1,20 +1,24 @@
-from django.db.models import F
+from django.db.models import Count
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from .models import Department, Employee
+from users.models import User
+from users.tokens import revoke_user_tokens
+from companyManagementSystem.cache import invalidate, model_namespace
+from . import counters, stats
+from .caching import invalidate_employee_for_user
+from .models import Company, Department, Employee
+from .tree import invalidate_tree
 
 # --- Department Counter Signals ---
 
 @receiver(post_save, sender=Department)
 def increment_department_count(sender, instance, created, **kwargs):
     if created:
-        instance.company.number_of_departments = F('number_of_departments') + 1
-        instance.company.save(update_fields=['number_of_departments'])
+        counters.record(counters.delta(Company, instance.company_id, 'number_of_departments', 1))
 
 @receiver(post_delete, sender=Department)
 def decrement_department_count(sender, instance, **kwargs):
-    instance.company.number_of_departments = F('number_of_departments') - 1
-    instance.company.save(update_fields=['number_of_departments'])
+    counters.record(counters.delta(Company, instance.company_id, 'number_of_departments', -1))
 
 
 @receiver(post_save, sender=Employee)
@@ -24,28 +28,118 @@ def handle_employee_save(sender, instance, created, **kwargs):
     """
     if created:
         # New employee is created
-        instance.company.number_of_employees = F('number_of_employees') + 1
-        instance.department.number_of_employees = F('number_of_employees') + 1
-        instance.company.save(update_fields=['number_of_employees'])
-        instance.department.save(update_fields=['number_of_employees'])
-    else:
-        # Check if the department was changed on an existing employee
-        try:
-            old_instance = Employee.objects.get(pk=instance.pk)
-            if old_instance.department != instance.department:
-                # Department has changed, decrement old and increment new
-                old_instance.department.number_of_employees = F('number_of_employees') - 1
-                instance.department.number_of_employees = F('number_of_employees') + 1
-                old_instance.department.save(update_fields=['number_of_employees'])
-                instance.department.save(update_fields=['number_of_employees'])
-        except Employee.DoesNotExist:
-            # This case can be ignored as it means the object is being created
-            pass
+        counters.record(
+            counters.delta(Company, instance.company_id, 'number_of_employees', 1),
+            counters.delta(Department, instance.department_id, 'number_of_employees', 1),
+            *stats.employee_deltas(instance.company_id, instance.department_id, instance.designation, instance.hired_on, 1),
+        )
+        return
+
+    previous_department = instance.previous_value('department')
+    if previous_department is None:
+        # Not loaded from the database, so there is nothing to compare against.
+        return
+
+    deltas = []
+    if instance.has_changed('department'):
+        # Department has changed, decrement old and increment new. The previous department
+        # comes from the values the instance was loaded with, so no extra query is needed.
+        deltas += [
+            counters.delta(Department, previous_department, 'number_of_employees', -1),
+            counters.delta(Department, instance.department_id, 'number_of_employees', 1),
+        ]
+    if any(instance.has_changed(field) for field in ('company', 'department', 'designation', 'hired_on')):
+        previous_company = instance.previous_value('company') or instance.company_id
+        deltas += [
+            *stats.employee_deltas(previous_company, previous_department, instance.previous_value('designation'),
+                                   instance.previous_value('hired_on'), -1),
+            *stats.employee_deltas(instance.company_id, instance.department_id, instance.designation,
+                                   instance.hired_on, 1),
+        ]
+        if instance.has_changed('department'):
+            # The employee's reviews move to the new department with them.
+            review_states = instance.performance_reviews.order_by().values_list('state').annotate(total=Count('pk'))
+            for state, total in review_states:
+                deltas += [
+                    *stats.review_deltas(previous_company, previous_department, state, -total),
+                    *stats.review_deltas(instance.company_id, instance.department_id, state, total),
+                ]
+    counters.record(*deltas)
 
 
 @receiver(post_delete, sender=Employee)
 def decrement_employee_count(sender, instance, **kwargs):
-    instance.company.number_of_employees = F('number_of_employees') - 1
-    instance.department.number_of_employees = F('number_of_employees') - 1
-    instance.company.save(update_fields=['number_of_employees'])
-    instance.department.save(update_fields=['number_of_employees'])
+    counters.record(
+        counters.delta(Company, instance.company_id, 'number_of_employees', -1),
+        counters.delta(Department, instance.department_id, 'number_of_employees', -1),
+        *stats.employee_deltas(instance.company_id, instance.department_id, instance.designation, instance.hired_on, -1),
+    )
+
+
+# --- Organization Tree Cache ---
+
+@receiver(post_save, sender=Company)
+@receiver(post_delete, sender=Company)
+def invalidate_company_tree(sender, instance, **kwargs):
+    invalidate_tree(instance.pk)
+
+
+@receiver(post_save, sender=Department)
+def invalidate_tree_on_department_save(sender, instance, created, **kwargs):
+    if created or instance.has_changed('company') or instance.has_changed('name'):
+        invalidate_tree(instance.company_id, instance.previous_value('company'))
+
+
+@receiver(post_save, sender=Employee)
+def invalidate_tree_on_employee_save(sender, instance, created, **kwargs):
+    if created or any(instance.has_changed(field) for field in ('company', 'department', 'designation')):
+        invalidate_tree(instance.company_id, instance.previous_value('company'))
+
+
+@receiver(post_delete, sender=Department)
+@receiver(post_delete, sender=Employee)
+def invalidate_tree_on_delete(sender, instance, **kwargs):
+    invalidate_tree(instance.company_id)
+
+
+@receiver(post_save, sender=User)
+def invalidate_tree_on_user_save(sender, instance, created, **kwargs):
+    # Employees are listed by username or email, so renaming a user changes their company's tree.
+    if created or not (instance.has_changed('username') or instance.has_changed('email')):
+        return
+    try:
+        # Usually cached already, as employee updates load the user through `select_related`.
+        employee = instance.employee
+    except Employee.DoesNotExist:
+        return
+    invalidate_tree(employee.company_id)
+
+
+# --- Response and Object Caches ---
+
+@receiver(post_save, sender=Company)
+@receiver(post_delete, sender=Company)
+@receiver(post_save, sender=Department)
+@receiver(post_delete, sender=Department)
+def invalidate_cached_responses(sender, instance, **kwargs):
+    invalidate(model_namespace(sender), instance.pk)
+
+
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Employee)
+def invalidate_cached_employee(sender, instance, **kwargs):
+    invalidate_employee_for_user(instance.user_id, instance.previous_value('user'))
+
+
+# --- Access Tokens ---
+
+@receiver(post_save, sender=Employee)
+def revoke_tokens_on_employee_save(sender, instance, created, **kwargs):
+    # Tokens carry the employee, department and company ids of their user.
+    if created or any(instance.has_changed(field) for field in ('user', 'company', 'department')):
+        revoke_user_tokens(instance.user_id, instance.previous_value('user'))
+
+
+@receiver(post_delete, sender=Employee)
+def revoke_tokens_on_employee_delete(sender, instance, **kwargs):
+    revoke_user_tokens(instance.user_id)
@@ -0,0 +1,269 @@
+"""
+Per-department analytics rollups served by `/companies/{id}/stats/`.
+
+The save and delete hooks that maintain the Company/Department counters also record
+StatDelta rows (through `counters.record`); those are folded into OrganizationStat after
+commit, with one UPDATE for all touched cells (cells seen for the first time are inserted first). Reading a company's dashboard is then a single
+aggregate over its OrganizationStat rows.
+
+Tenure and project status change with the calendar rather than with writes, so hire dates
+and project end dates are stored as-is and bucketed at read time.
+
+`rebuild_stats` recomputes the rollups of a company from the source tables, for recovery.
+"""
+import datetime
+import logging
+import operator
+from collections import Counter
+from functools import reduce
+
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Case, Count, F, IntegerField, Q, Sum, Value, When
+from django.utils import timezone
+
+from performance.models import ArchivedPerformanceReview, PerformanceReview
+from projects.models import ArchivedProject, Project
+from .models import Department, Employee, OrganizationStat, StatDelta
+
+logger = logging.getLogger(__name__)
+
+Dimension = OrganizationStat.Dimension
+
+FLUSH_BATCH_SIZE = 1000
+REBUILD_ATTEMPTS = 3
+
+# Upper bounds in days, checked in order; the last bucket is open-ended.
+TENURE_BUCKETS = (
+    ('under_1_year', 365),
+    ('1_to_3_years', 3 * 365),
+    ('3_to_5_years', 5 * 365),
+    ('over_5_years', None),
+)
+
+
+def _key(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    return str(value)
+
+
+def stat_delta(company_id, department_id, dimension, value, amount):
+    """Builds an unsaved StatDelta counting `amount` more rows with `value` along `dimension`."""
+    return StatDelta(company_id=company_id, department_id=department_id, dimension=dimension,
+                     key=_key(value), delta=amount)
+
+
+def employee_deltas(company_id, department_id, designation, hired_on, amount):
+    return [
+        stat_delta(company_id, department_id, Dimension.DESIGNATION, designation, amount),
+        stat_delta(company_id, department_id, Dimension.HIRED_ON, hired_on, amount),
+    ]
+
+
+def project_deltas(company_id, department_id, end_date, amount):
+    return [stat_delta(company_id, department_id, Dimension.PROJECT_END, end_date, amount)]
+
+
+def review_deltas(company_id, department_id, state, amount):
+    return [stat_delta(company_id, department_id, Dimension.REVIEW_STATE, state, amount)]
+
+
+def flush_stat_deltas(batch_size=FLUSH_BATCH_SIZE):
+    """
+    Folds up to `batch_size` pending stat deltas into OrganizationStat and deletes them.
+    Returns the number of deltas applied.
+
+    Deltas of departments that no longer exist are dropped; their rollups were deleted
+    with them.
+    """
+    with transaction.atomic():
+        pending = StatDelta.objects.order_by('pk')
+        if connection.features.has_select_for_update_skip_locked:
+            pending = pending.select_for_update(skip_locked=True)
+        pending = list(pending.values_list(
+            'pk', 'company_id', 'department_id', 'dimension', 'key', 'delta',
+        )[:batch_size])
+        if not pending:
+            return 0
+
+        totals = Counter()
+        for _, company_id, department_id, dimension, key, amount in pending:
+            totals[(company_id, department_id, dimension, key)] += amount
+        cells = apply_stat_totals(totals)
+
+        StatDelta.objects.filter(pk__in=[pk for pk, *_ in pending]).delete()
+
+    logger.debug(f'Flushed {len(pending)} stat deltas into {cells} rows.')
+    return len(pending)
+
+
+def apply_stat_totals(totals):
+    """
+    Adds `{(company_id, department_id, dimension, key): amount}` to the rollups. Call it inside
+    a transaction. Returns the number of cells touched.
+
+    The existing cells are locked and incremented with one UPDATE however many there are;
+    cells seen for the first time cost three more queries.
+    """
+    cells = sorted(cell for cell, amount in totals.items() if amount)
+    if not cells:
+        return 0
+    # Locked in sorted order, so every flusher takes its row locks in the same order.
+    existing = set(
+        OrganizationStat.objects.filter(_cells_filter(cells)).order_by('department_id', 'dimension', 'key')
+        .select_for_update().values_list('department_id', 'dimension', 'key')
+    )
+    found = [cell for cell in cells if cell[1:] in existing]
+    if found:
+        _add_to_cells(found, totals)
+    missing = [cell for cell in cells if cell[1:] not in existing]
+    if missing:
+        _create_cells(missing, totals)
+    return len(cells)
+
+
+def _cell_filter(cell):
+    _, department_id, dimension, key = cell
+    return Q(department_id=department_id, dimension=dimension, key=key)
+
+
+def _cells_filter(cells):
+    return reduce(operator.or_, map(_cell_filter, cells))
+
+
+def _add_to_cells(cells, totals):
+    OrganizationStat.objects.filter(_cells_filter(cells)).update(count=F('count') + Case(
+        *(When(_cell_filter(cell), then=Value(totals[cell])) for cell in cells), output_field=IntegerField(),
+    ))
+
+
+def _create_cells(cells, totals):
+    # Cells of departments deleted since the delta was recorded are dropped. The rows are
+    # inserted empty and then incremented, so a concurrent flusher creating the same cell
+    # cannot make either increment get lost.
+    departments = set(Department.objects.filter(
+        pk__in={department_id for _, department_id, _, _ in cells},
+    ).values_list('pk', flat=True))
+    cells = [cell for cell in cells if cell[1] in departments]
+    if not cells:
+        return
+    OrganizationStat.objects.bulk_create([
+        OrganizationStat(company_id=company_id, department_id=department_id, dimension=dimension, key=key)
+        for company_id, department_id, dimension, key in cells
+    ], ignore_conflicts=True)
+    _add_to_cells(cells, totals)
+
+
+def flush_all_stat_deltas(batch_size=FLUSH_BATCH_SIZE):
+    """Flushes batches until no pending stat deltas are left. Returns the number of deltas applied."""
+    total = 0
+    while flushed := flush_stat_deltas(batch_size):
+        total += flushed
+        if flushed < batch_size:
+            break
+    return total
+
+
+def _tenure_bucket(hired_on, today):
+    days = (today - datetime.date.fromisoformat(hired_on)).days
+    for bucket, limit in TENURE_BUCKETS:
+        if limit is None or days < limit:
+            return bucket
+
+
+def company_stats(company, department_id=None, today=None):
+    """
+    Returns the dashboard of `company`, or of one of its departments, from its rollups.
+    Runs a single aggregate query over the company's OrganizationStat rows.
+    """
+    today = today or timezone.localdate()
+    rows = OrganizationStat.objects.filter(company=company)
+    if department_id is not None:
+        rows = rows.filter(department_id=department_id)
+    rows = rows.order_by().values_list('dimension', 'key').annotate(total=Sum('count'))
+
+    designations = {}
+    tenure = dict.fromkeys([bucket for bucket, _ in TENURE_BUCKETS] + ['unknown'], 0)
+    projects = {'active': 0, 'ended': 0}
+    reviews = dict.fromkeys(PerformanceReview.Stages.values, 0)
+    for dimension, key, total in rows:
+        if not total:
+            continue
+        if dimension == Dimension.DESIGNATION:
+            designations[key] = total
+        elif dimension == Dimension.HIRED_ON:
+            tenure[_tenure_bucket(key, today) if key else 'unknown'] += total
+        elif dimension == Dimension.PROJECT_END:
+            projects['ended' if key and key < today.isoformat() else 'active'] += total
+        elif dimension == Dimension.REVIEW_STATE:
+            reviews[key] = reviews.get(key, 0) + total
+
+    return {
+        'company': company.pk,
+        'department': department_id,
+        'headcount': sum(designations.values()),
+        'designations': dict(sorted(designations.items())),
+        'tenure': tenure,
+        'projects': projects,
+        'reviews': reviews,
+    }
+
+
+def _actual_stats(company_id):
+    sources = (
+        (Employee.objects.filter(company_id=company_id), 'department_id', 'designation', Dimension.DESIGNATION),
+        (Employee.objects.filter(company_id=company_id), 'department_id', 'hired_on', Dimension.HIRED_ON),
+        (Project.objects.filter(company_id=company_id), 'department_id', 'end_date', Dimension.PROJECT_END),
+        (PerformanceReview.objects.filter(employee__company_id=company_id),
+         'employee__department_id', 'state', Dimension.REVIEW_STATE),
+        # Archived rows are still counted.
+        (ArchivedProject.objects.filter(company_id=company_id), 'department_id', 'end_date', Dimension.PROJECT_END),
+        (ArchivedPerformanceReview.objects.filter(employee__company_id=company_id),
+         'employee__department_id', 'state', Dimension.REVIEW_STATE),
+    )
+    actual = Counter()
+    for queryset, department, value, dimension in sources:
+        for department_id, key, total in queryset.order_by().values_list(department, value).annotate(total=Count('pk')):
+            actual[(department_id, dimension, _key(key))] += total
+    return actual
+
+
+def _rebuild_company(company_id):
+    actual = _actual_stats(company_id)
+    # Pending deltas will still be added when they are flushed, so they are subtracted here.
+    pending = StatDelta.objects.filter(company_id=company_id).order_by() \
+        .values_list('department_id', 'dimension', 'key').annotate(total=Sum('delta'))
+    for department_id, dimension, key, total in pending:
+        actual[(department_id, dimension, key)] -= total
+
+    departments = set(Department.objects.filter(company_id=company_id).values_list('pk', flat=True))
+    OrganizationStat.objects.filter(company_id=company_id).delete()
+    rows = OrganizationStat.objects.bulk_create([
+        OrganizationStat(company_id=company_id, department_id=department_id, dimension=dimension, key=key, count=total)
+        for (department_id, dimension, key), total in sorted(actual.items())
+        if total and department_id in departments
+    ])
+    return len(rows)
+
+
+def rebuild_stats(company_id):
+    """
+    Recomputes the rollups of a company from the source tables. Returns the number of rows written.
+
+    On PostgreSQL the rebuild reads one repeatable-read snapshot, so the source counts and the
+    pending deltas agree; it is retried if a concurrent flush touches the same rows.
+    """
+    snapshot = connection.vendor == 'postgresql' and not connection.in_atomic_block
+    for attempt in range(1, REBUILD_ATTEMPTS + 1):
+        try:
+            with transaction.atomic():
+                if snapshot:
+                    with connection.cursor() as cursor:
+                        cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ')
+                return _rebuild_company(company_id)
+        except DatabaseError:
+            if not snapshot or attempt == REBUILD_ATTEMPTS:
+                raise
+            logger.info(f'Rebuilding the stats of company {company_id} conflicted with a flush, retrying.')
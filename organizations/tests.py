@@ -1,3 +1,624 @@
-from django.test import TestCase
+import csv
+import json
+import os
+import tempfile
+from datetime import date, timedelta
+from io import StringIO
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import transaction
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from companyManagementSystem.testing import QueryBudgetTestCase, ROWS_PER_PAGE
+from users.models import User
+from . import counters, stats
+from .importers import EmployeeImporter
+from .models import Company, CounterDelta, Department, Employee
+from .reconcile import CounterReconciler, write_drift_report
+from .views import CompanyViewSet, DepartmentViewSet, EmployeeViewSet
+
+
+class CompanyQueryBudgetTests(QueryBudgetTestCase):
+    def setUp(self):
+        self.authenticate(self.admin)
+        self.company = self.org['company']
+
+    def test_list(self):
+        response = self.assertWithinQueryBudget(CompanyViewSet, 'list', 'get', reverse('company-list'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_retrieve(self):
+        url = reverse('company-detail', args=[self.company.pk])
+        response = self.assertWithinQueryBudget(CompanyViewSet, 'retrieve', 'get', url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_create(self):
+        url = reverse('company-list')
+        response = self.assertWithinQueryBudget(CompanyViewSet, 'create', 'post', url, {'name': 'Initech'})
+        self.assertEqual(response.status_code, 201)
+
+    def test_update(self):
+        url = reverse('company-detail', args=[self.company.pk])
+        response = self.assertWithinQueryBudget(CompanyViewSet, 'update', 'put', url, {'name': 'Acme Corp'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_partial_update(self):
+        url = reverse('company-detail', args=[self.company.pk])
+        response = self.assertWithinQueryBudget(CompanyViewSet, 'partial_update', 'patch', url, {'name': 'Acme Inc'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_destroy(self):
+        company = Company.objects.create(name='Empty')
+        url = reverse('company-detail', args=[company.pk])
+        response = self.assertWithinQueryBudget(CompanyViewSet, 'destroy', 'delete', url)
+        self.assertEqual(response.status_code, 204)
+
+
+class DepartmentQueryBudgetTests(QueryBudgetTestCase):
+    def setUp(self):
+        self.authenticate(self.admin)
+        self.department = self.org['departments'][0]
+
+    def test_list(self):
+        response = self.assertWithinQueryBudget(DepartmentViewSet, 'list', 'get', reverse('department-list'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_retrieve(self):
+        url = reverse('department-detail', args=[self.department.pk])
+        response = self.assertWithinQueryBudget(DepartmentViewSet, 'retrieve', 'get', url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_create(self):
+        data = {'name': 'Research', 'company': self.org['company'].pk}
+        response = self.assertWithinQueryBudget(DepartmentViewSet, 'create', 'post', reverse('department-list'), data)
+        self.assertEqual(response.status_code, 201)
+
+    def test_update(self):
+        url = reverse('department-detail', args=[self.department.pk])
+        data = {'name': 'Renamed', 'company': self.org['company'].pk}
+        response = self.assertWithinQueryBudget(DepartmentViewSet, 'update', 'put', url, data)
+        self.assertEqual(response.status_code, 200)
+
+    def test_partial_update(self):
+        url = reverse('department-detail', args=[self.department.pk])
+        response = self.assertWithinQueryBudget(DepartmentViewSet, 'partial_update', 'patch', url, {'name': 'Renamed'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_destroy(self):
+        department = Department.objects.create(name='Empty', company=self.org['company'])
+        url = reverse('department-detail', args=[department.pk])
+        response = self.assertWithinQueryBudget(DepartmentViewSet, 'destroy', 'delete', url)
+        self.assertEqual(response.status_code, 204)
+
+
+class EmployeeQueryBudgetTests(QueryBudgetTestCase):
+    def setUp(self):
+        self.authenticate(self.admin)
+        self.target = self.org['employees'][1]
+
+    def employee_payload(self, email):
+        return {
+            'user': {'email': email, 'username': 'new', 'role': 'EMPLOYEE'},
+            'company': self.org['company'].pk,
+            'department': self.org['departments'][0].pk,
+            'designation': 'Engineer',
+        }
+
+    def test_list(self):
+        response = self.assertWithinQueryBudget(EmployeeViewSet, 'list', 'get', reverse('employee-list'))
+        self.assertEqual(len(response.data['results']), 10)
+
+    def test_list_as_manager(self):
+        self.authenticate(self.manager)
+        response = self.assertWithinQueryBudget(EmployeeViewSet, 'list', 'get', reverse('employee-list'))
+        self.assertEqual(len(response.data['results']), 10)
+
+    def test_list_as_employee(self):
+        self.authenticate(self.employee)
+        response = self.assertWithinQueryBudget(EmployeeViewSet, 'list', 'get', reverse('employee-list'))
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_retrieve(self):
+        url = reverse('employee-detail', args=[self.target.pk])
+        response = self.assertWithinQueryBudget(EmployeeViewSet, 'retrieve', 'get', url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_create(self):
+        url = reverse('employee-list')
+        response = self.assertWithinQueryBudget(EmployeeViewSet, 'create', 'post', url, self.employee_payload('new@example.com'))
+        self.assertEqual(response.status_code, 201)
+
+    def test_update(self):
+        url = reverse('employee-detail', args=[self.target.pk])
+        data = self.employee_payload('renamed@example.com')
+        response = self.assertWithinQueryBudget(EmployeeViewSet, 'update', 'put', url, data)
+        self.assertEqual(response.status_code, 200)
+
+    def test_partial_update(self):
+        url = reverse('employee-detail', args=[self.target.pk])
+        data = {'department': self.org['departments'][1].pk}
+        response = self.assertWithinQueryBudget(EmployeeViewSet, 'partial_update', 'patch', url, data)
+        self.assertEqual(response.status_code, 200)
+
+    def test_destroy(self):
+        url = reverse('employee-detail', args=[self.target.pk])
+        response = self.assertWithinQueryBudget(EmployeeViewSet, 'destroy', 'delete', url)
+        self.assertEqual(response.status_code, 204)
+
+    def test_bulk_import(self):
+        company, department = self.org['company'].pk, self.org['departments'][0].pk
+        rows = '\n'.join(
+            f'{{"email": "bulk{i}@example.com", "company": {company}, "department": {department}, "designation": "x"}}'
+            for i in range(50)
+        )
+        response = self.assertWithinQueryBudget(
+            EmployeeViewSet, 'bulk_import', 'post', reverse('employee-bulk-import'), rows,
+            format=None, content_type='application/x-ndjson',
+        )
+        self.assertEqual(response.data['created'], 50)
+
+
+class CounterTests(QueryBudgetTestCase):
+    def setUp(self):
+        self.company = Company.objects.get(pk=self.org['company'].pk)
+        self.department = Department.objects.get(pk=self.org['departments'][0].pk)
+
+    def assertCounters(self, company, department):
+        self.company.refresh_from_db()
+        self.department.refresh_from_db()
+        self.assertEqual((self.company.number_of_employees, self.department.number_of_employees), (company, department))
+
+    def hire(self, email):
+        return Employee.objects.create(
+            user=User.objects.create(email=email), company=self.company, department=self.department, designation='x',
+        )
+
+    def test_counters_are_current_after_commit(self):
+        company, department = self.company.number_of_employees, self.department.number_of_employees
+        with self.captureOnCommitCallbacks(execute=True):
+            self.hire('hired@example.com')
+        self.assertCounters(company + 1, department + 1)
+        self.assertFalse(CounterDelta.objects.exists())
+
+    def test_transaction_deltas_are_summed_in_memory(self):
+        company, department = self.company.number_of_employees, self.department.number_of_employees
+        with self.captureOnCommitCallbacks() as callbacks:
+            counters.record(*(counters.delta(Company, self.company.pk, 'number_of_employees', 1) for _ in range(3)))
+            counters.record(
+                counters.delta(Department, self.department.pk, 'number_of_employees', 2),
+                counters.delta(Department, self.department.pk, 'number_of_employees', -1),
+            )
+        self.assertEqual(len(callbacks), 1)
+        self.assertFalse(CounterDelta.objects.exists())
+        # Savepoint, one UPDATE per touched row, release.
+        with self.assertNumQueries(4):
+            callbacks[0]()
+        self.assertCounters(company + 3, department + 1)
+
+    def test_rolled_back_savepoints_drop_their_deltas(self):
+        company, department = self.company.number_of_employees, self.department.number_of_employees
+        with self.captureOnCommitCallbacks(execute=True):
+            counters.record(counters.delta(Company, self.company.pk, 'number_of_employees', 1))
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                counters.record(counters.delta(Company, self.company.pk, 'number_of_employees', 5))
+                raise RuntimeError
+            counters.record(counters.delta(Company, self.company.pk, 'number_of_employees', 1))
+        self.assertCounters(company + 2, department)
+
+    @override_settings(COUNTER_FLUSH_INTERVAL=60)
+    def test_deltas_are_coalesced_per_row(self):
+        company, department = self.company.number_of_employees, self.department.number_of_employees
+        counters.mark_flush_worker(60)
+        counters.record(
+            *(counters.delta(Company, self.company.pk, 'number_of_employees', 1) for _ in range(3)),
+            counters.delta(Department, self.department.pk, 'number_of_employees', 2),
+            counters.delta(Department, self.department.pk, 'number_of_employees', -1),
+        )
+        # Savepoint, locking read, one UPDATE per touched row, DELETE, release.
+        with self.assertNumQueries(6):
+            self.assertEqual(counters.flush_counter_deltas(), 5)
+        self.assertCounters(company + 3, department + 1)
+
+    def test_rolled_back_writes_leave_no_delta(self):
+        company, department = self.company.number_of_employees, self.department.number_of_employees
+        with self.captureOnCommitCallbacks() as callbacks:
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                self.hire('rolled-back@example.com')
+                raise RuntimeError
+        self.assertEqual(callbacks, [])
+        self.assertFalse(CounterDelta.objects.exists())
+        self.assertCounters(company, department)
+
+    @override_settings(COUNTER_FLUSH_INTERVAL=60)
+    def test_command_flushes_leftover_deltas(self):
+        company, department = self.company.number_of_employees, self.department.number_of_employees
+        counters.mark_flush_worker(60)
+        # The on-commit flushes are not run, as if the process died after committing.
+        self.hire('first@example.com')
+        self.hire('second@example.com')
+        self.assertEqual(CounterDelta.objects.count(), 4)
+        out = StringIO()
+        call_command('flush_counters', batch_size=3, stdout=out)
+        self.assertIn('Flushed', out.getvalue())
+        self.assertFalse(CounterDelta.objects.exists())
+        self.assertCounters(company + 2, department + 2)
+
+    @override_settings(COUNTER_FLUSH_INTERVAL=60)
+    def test_flush_interval_needs_a_flush_loop(self):
+        company, department = self.company.number_of_employees, self.department.number_of_employees
+        # Without a `flush_counters --interval` loop, every commit still flushes.
+        for email in ('first@example.com', 'second@example.com'):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.hire(email)
+        self.assertCounters(company + 2, department + 2)
+
+        counters.mark_flush_worker(60)
+        for email in ('third@example.com', 'fourth@example.com'):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.hire(email)
+        # The first commit in the interval flushed; the second is left for the loop.
+        self.assertCounters(company + 3, department + 3)
+        call_command('flush_counters', stdout=StringIO())
+        self.assertCounters(company + 4, department + 4)
+
+
+class CounterReconcilerTests(QueryBudgetTestCase):
+    def setUp(self):
+        self.company = self.org['company']
+        self.departments = self.org['departments']
+        # Plain UPDATEs bypass the signals, as lost deltas or manual edits would.
+        Company.objects.filter(pk=self.company.pk).update(number_of_employees=999)
+        Department.objects.filter(pk=self.departments[1].pk).update(number_of_projects=0)
+        self.expected_drift = [
+            {'model': 'company', 'id': self.company.pk, 'field': 'number_of_employees',
+             'stored': 999, 'expected': 2 * ROWS_PER_PAGE + 1},
+            {'model': 'department', 'id': self.departments[1].pk, 'field': 'number_of_projects',
+             'stored': 0, 'expected': ROWS_PER_PAGE},
+        ]
+
+    def test_dry_run_reports_without_fixing(self):
+        self.assertEqual(list(CounterReconciler(dry_run=True).run()), self.expected_drift)
+        self.assertEqual(Company.objects.get(pk=self.company.pk).number_of_employees, 999)
+
+    @override_settings(COUNTER_FLUSH_INTERVAL=60)
+    def test_pending_deltas_are_not_drift(self):
+        counters.mark_flush_worker(60)
+        Company.objects.filter(pk=self.company.pk).update(number_of_employees=2 * ROWS_PER_PAGE + 1)
+        Department.objects.filter(pk=self.departments[1].pk).update(number_of_projects=ROWS_PER_PAGE)
+        # Without its on-commit flush the new employee is counted in the table but not yet in
+        # the counters; its pending deltas make up the difference.
+        Employee.objects.create(
+            user=User.objects.create(email='pending@example.com'), company=self.company,
+            department=self.departments[0], designation='x',
+        )
+        self.assertTrue(CounterDelta.objects.exists())
+        self.assertEqual(list(CounterReconciler(dry_run=True).run()), [])
+
+    def test_fixes_drift_with_one_update_per_model(self):
+        reconciler = CounterReconciler()
+        # Company lock, then per model a row lock, an annotated read and one bulk UPDATE, then the
+        # empty next chunk; each chunk in a savepoint.
+        with self.assertNumQueries(12):
+            self.assertEqual(list(reconciler.run()), self.expected_drift)
+        self.assertEqual(reconciler.companies_checked, 1)
+        self.assertEqual(Company.objects.get(pk=self.company.pk).number_of_employees, 2 * ROWS_PER_PAGE + 1)
+        self.assertEqual(Department.objects.get(pk=self.departments[1].pk).number_of_projects, ROWS_PER_PAGE)
+        self.assertEqual(list(CounterReconciler().run()), [])
+
+    def test_only_the_given_companies_are_checked(self):
+        other = Company.objects.create(name='Globex')
+        reconciler = CounterReconciler(company_ids=[other.pk])
+        self.assertEqual(list(reconciler.run()), [])
+        self.assertEqual(reconciler.companies_checked, 1)
+
+    def test_drift_report(self):
+        out = StringIO()
+        self.assertEqual(write_drift_report(CounterReconciler(dry_run=True).run(), out), 2)
+        rows = list(csv.DictReader(StringIO(out.getvalue())))
+        self.assertEqual(rows, [{field: str(value) for field, value in entry.items()} for entry in self.expected_drift])
+
+    def test_command(self):
+        out, err = StringIO(), StringIO()
+        call_command('reconcile_counters', '--dry-run', stdout=out, stderr=err)
+        self.assertEqual(len(list(csv.DictReader(StringIO(out.getvalue())))), 2)
+        self.assertIn('Checked 1 companies, found 2 drifted counters.', err.getvalue())
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'drift.csv')
+            call_command('reconcile_counters', '--report', path, '--company', str(self.company.pk), stderr=err)
+            with open(path, newline='') as report:
+                self.assertEqual(len(list(csv.DictReader(report))), 2)
+        self.assertIn('fixed 2 drifted counters.', err.getvalue())
+        self.assertEqual(list(CounterReconciler(dry_run=True).run()), [])
+
+    def test_admin_action(self):
+        self.client.force_login(User.objects.create(email='root@example.com', is_staff=True, is_superuser=True))
+        response = self.client.post(reverse('admin:organizations_company_changelist'), {
+            'action': 'reconcile_counters', '_selected_action': [self.company.pk],
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.DictReader(StringIO(response.content.decode())))
+        self.assertEqual([row['field'] for row in rows], ['number_of_employees', 'number_of_projects'])
+        self.assertEqual(list(CounterReconciler(dry_run=True).run()), [])
+
+
+class CompanyTreeTests(QueryBudgetTestCase):
+    def setUp(self):
+        cache.clear()
+        self.authenticate(self.admin)
+        self.url = reverse('company-tree', args=[self.org['company'].pk])
+
+    def test_tree(self):
+        response = self.assertWithinQueryBudget(CompanyViewSet, 'tree', 'get', self.url)
+        self.assertEqual(response.status_code, 200)
+        departments = response.data['departments']
+        self.assertEqual([d['id'] for d in departments], [d.pk for d in self.org['departments']])
+        # The manager is employed in the first department.
+        self.assertEqual([len(d['employees']) for d in departments], [13, 12])
+        first = self.org['employees'][0]
+        self.assertEqual(
+            departments[0]['employees'][0],
+            {'id': first.pk, 'full_name': first.user.get_full_name(), 'designation': first.designation},
+        )
+
+    def test_tree_as_member(self):
+        self.authenticate(self.manager)
+        response = self.assertWithinQueryBudget(CompanyViewSet, 'tree', 'get', self.url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_tree_of_other_company(self):
+        self.authenticate(self.manager)
+        other = Company.objects.create(name='Other')
+        response = self.client.get(reverse('company-tree', args=[other.pk]))
+        self.assertEqual(response.status_code, 403)
+
+    def test_depth(self):
+        response = self.client.get(self.url, {'depth': 1})
+        self.assertNotIn('employees', response.data['departments'][0])
+        response = self.client.get(self.url, {'depth': 0})
+        self.assertNotIn('departments', response.data)
+        response = self.client.get(self.url, {'depth': 3})
+        self.assertEqual(response.status_code, 400)
+
+    def test_stream(self):
+        for depth in (0, 1, 2):
+            response = self.client.get(self.url, {'depth': depth, 'stream': 'true'})
+            streamed = json.loads(b''.join(response.streaming_content))
+            self.assertEqual(streamed, self.client.get(self.url, {'depth': depth}).json())
+
+    def test_not_modified_until_changed(self):
+        etag = self.client.get(self.url)['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        user = self.org['employees'][0].user
+        with self.captureOnCommitCallbacks(execute=True):
+            user.username = 'Renamed'
+            user.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['departments'][0]['employees'][0]['full_name'], 'Renamed')
+
+
+class CompanyStatsTests(QueryBudgetTestCase):
+    def setUp(self):
+        self.authenticate(self.admin)
+        self.company = self.org['company']
+        self.url = reverse('company-stats', args=[self.company.pk])
+
+    def test_stats(self):
+        response = self.assertWithinQueryBudget(CompanyViewSet, 'stats', 'get', self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['headcount'], 25)
+        self.assertEqual(response.data['designations'], {'Engineer': 24, 'Staff': 1})
+        # Seeded hires date from 2020; the manager has no hire date.
+        self.assertEqual(response.data['tenure']['over_5_years'], 24)
+        self.assertEqual(response.data['tenure']['unknown'], 1)
+        self.assertEqual(response.data['projects'], {'active': 0, 'ended': 24})
+        self.assertEqual(response.data['reviews']['PENDING'], 24)
+
+    def test_stats_of_department(self):
+        self.authenticate(self.manager)
+        department = self.org['departments'][1]
+        response = self.assertWithinQueryBudget(CompanyViewSet, 'stats', 'get', self.url, {'department': department.pk})
+        self.assertEqual(response.data['headcount'], 12)
+        self.assertEqual(response.data['projects']['ended'], 12)
+
+    def test_stats_of_other_company(self):
+        self.authenticate(self.manager)
+        other = Company.objects.create(name='Other')
+        self.assertEqual(self.client.get(reverse('company-stats', args=[other.pk])).status_code, 403)
+
+    def test_incremental_updates_match_rebuild(self):
+        first, second = self.org['departments']
+        with self.captureOnCommitCallbacks(execute=True):
+            moved = self.org['employees'][0]
+            moved.department = second
+            moved.designation = 'Lead'
+            moved.save()
+            self.org['employees'][1].delete()
+            project = self.org['projects'][0]
+            project.end_date = date.today() + timedelta(days=30)
+            project.save()
+            self.org['projects'][1].delete()
+            review = self.org['reviews'][2]
+            review.schedule_review(review_date=None)
+            review.save()
+
+        incremental = [stats.company_stats(self.company, department.pk) for department in (first, second)]
+        stats.rebuild_stats(self.company.pk)
+        rebuilt = [stats.company_stats(self.company, department.pk) for department in (first, second)]
+        self.assertEqual(incremental, rebuilt)
+        self.assertEqual(incremental[0]['headcount'], 11)
+        self.assertEqual(incremental[1]['designations'], {'Engineer': 12, 'Lead': 1})
+        self.assertEqual(incremental[0]['projects'], {'active': 1, 'ended': 10})
+        self.assertEqual(incremental[0]['reviews']['SCHEDULED'], 1)
+
+
+class EmployeeImportTests(QueryBudgetTestCase):
+    def setUp(self):
+        self.authenticate(self.admin)
+        self.url = reverse('employee-bulk-import')
+        self.company, self.department = self.org['company'].pk, self.org['departments'][0].pk
+
+    def post_csv(self, body):
+        return self.client.post(self.url, body, content_type='text/csv')
+
+    def csv_rows(self, *rows):
+        header = 'email,company,department,designation,username\n'
+        return header + ''.join(f'{email},{company},{department},Engineer,\n' for email, company, department in rows)
+
+    def test_csv(self):
+        body = self.csv_rows(*((f'csv{i}@example.com', self.company, self.department) for i in range(3)))
+        response = self.post_csv(body)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data, {'created': 3, 'failed': 0, 'errors': []})
+        employee = Employee.objects.select_related('user').get(user__email='csv0@example.com')
+        self.assertEqual((employee.department_id, employee.designation), (self.department, 'Engineer'))
+        self.assertIsNone(employee.user.username)
+
+    def test_imports_without_rows_are_a_bad_request(self):
+        for body in ('', 'email,company,department,designation,username\n'):
+            response = self.post_csv(body)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.data['detail'], 'Request body contains no rows.')
+
+    def test_undecodable_csv_is_a_bad_request(self):
+        body = self.csv_rows(('ok@example.com', self.company, self.department)).encode() + b'caf\xe9@example.com,1,1,x,\n'
+        response = self.post_csv(body)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('line 3', response.data['detail'])
+        # The import is a single transaction, so the valid row before the bad line is not kept.
+        self.assertFalse(Employee.objects.filter(user__email='ok@example.com').exists())
+
+    def test_malformed_csv_is_a_bad_request(self):
+        # A field over the csv module's size limit makes the reader raise `csv.Error`.
+        body = self.csv_rows(('ok@example.com', self.company, self.department)) + 'x' * 200_000 + ',1,1,x,\n'
+        response = self.post_csv(body)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('line 3', response.data['detail'])
+
+    def test_undecodable_ndjson_is_a_bad_request(self):
+        body = b'{"email": "caf\xe9@example.com"}\n'
+        response = self.client.post(self.url, body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('line 1', response.data['detail'])
+
+    def test_row_errors_are_reported(self):
+        other = Company.objects.create(name='Globex')
+        other_department = Department.objects.create(name='Sales', company=other)
+        body = self.csv_rows(
+            ('good@example.com', self.company, self.department),
+            ('not-an-email', self.company, self.department),
+            (self.employee.email, self.company, self.department),
+            ('twice@example.com', self.company, self.department),
+            ('twice@example.com', self.company, self.department),
+            ('nocompany@example.com', 999999, self.department),
+            ('nodepartment@example.com', self.company, 999999),
+            ('elsewhere@example.com', self.company, other_department.pk),
+        )
+        response = self.post_csv(body)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['created'], response.data['failed']), (2, 6))
+        errors = {error['row']: error['errors'] for error in response.data['errors']}
+        self.assertEqual(sorted(errors), [2, 3, 5, 6, 7, 8])
+        self.assertIn('email', errors[2])
+        self.assertEqual(errors[3], {'email': ['User with this email already exists.']})
+        self.assertEqual(errors[5], {'email': ['User with this email already exists.']})
+        self.assertEqual(errors[6], {
+            'company': ['Company 999999 does not exist.'],
+            'department': [f'Department {self.department} does not belong to company 999999.'],
+        })
+        self.assertEqual(errors[7], {'department': ['Department 999999 does not exist.']})
+        self.assertEqual(errors[8], {'department': [
+            f'Department {other_department.pk} does not belong to company {self.company}.'
+        ]})
+
+    def test_nothing_imported_is_a_bad_request(self):
+        response = self.post_csv(self.csv_rows(('nocompany@example.com', 999999, self.department)))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['failed'], 1)
+
+    def test_conflicting_rows_are_retried_one_by_one(self):
+        class RacingImporter(EmployeeImporter):
+            # Misses existing emails, as if another request created the users after the lookup.
+            def _check_references(self, data, company_ids, department_companies, existing_emails):
+                return super()._check_references(data, company_ids, department_companies, set())
+
+        department = Department.objects.get(pk=self.department)
+        before = department.number_of_employees
+        rows = [
+            {'email': email, 'company': str(self.company), 'department': str(self.department), 'designation': 'x'}
+            for email in ('first@example.com', self.employee.email, 'second@example.com')
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            report = RacingImporter().run(rows)
+        self.assertEqual(report['created'], 2)
+        self.assertEqual(report['errors'], [{'row': 2, 'errors': {'email': ['User with this email already exists.']}}])
+        self.assertEqual(Employee.objects.filter(user__email__in=['first@example.com', 'second@example.com']).count(), 2)
+        department.refresh_from_db()
+        self.assertEqual(department.number_of_employees, before + 2)
+
+
+class EmployeeTenureTests(QueryBudgetTestCase):
+    def setUp(self):
+        self.authenticate(self.admin)
+        self.url = reverse('employee-list')
+        self.today = timezone.now().date()
+
+    def test_days_employed_comes_from_the_database(self):
+        employee = self.org['employees'][0]
+        annotated = Employee.objects.with_tenure().get(pk=employee.pk)
+        self.assertEqual(annotated.tenure_days, (self.today - employee.hired_on).days)
+        self.assertEqual(annotated.days_employed, employee.days_employed)
+
+    def test_tenure_bounds(self):
+        hired_on = self.org['employees'][5].hired_on
+        days = (self.today - hired_on).days
+        response = self.assertWithinQueryBudget(
+            EmployeeViewSet, 'list', 'get', self.url, {'min_tenure_days': days, 'max_tenure_days': days},
+        )
+        # Each seeded hire date is shared by one employee per department.
+        self.assertEqual({row['hired_on'] for row in response.data['results']}, {hired_on.isoformat()})
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertEqual(response.data['results'][0]['days_employed'], days)
+
+    def test_bounds_count_missing_hire_dates_as_no_tenure(self):
+        manager = self.manager.employee.pk
+        for params, included in (
+            ({'max_tenure_days': 0}, True), ({'min_tenure_days': 0}, True), ({'min_tenure_days': 1}, False),
+        ):
+            response = self.client.get(self.url, {**params, 'page_size': 100})
+            rows = {row['id']: row['days_employed'] for row in response.data['results']}
+            self.assertEqual(manager in rows, included, params)
+            if included:
+                self.assertEqual(rows[manager], 0)
+
+    def test_ordering_by_tenure(self):
+        response = self.assertWithinQueryBudget(EmployeeViewSet, 'list', 'get', self.url, {'ordering': '-tenure'})
+        tenures = [row['days_employed'] for row in response.data['results']]
+        self.assertEqual(tenures, sorted(tenures, reverse=True))
+        next_page = self.client.get(response.data['next'])
+        self.assertLessEqual(next_page.data['results'][0]['days_employed'], tenures[-1])
+
+        response = self.client.get(self.url, {'ordering': 'tenure'})
+        tenures = [row['days_employed'] for row in response.data['results']]
+        self.assertEqual(tenures, sorted(tenures))
+        # The manager has no hire date, so has no tenure to sort by.
+        self.assertNotIn(self.manager.employee.pk, [row['id'] for row in response.data['results']])
+
+    def test_anniversaries(self):
+        # Seeded employees were hired in January 2020.
+        response = self.client.get(self.url, {'anniversary_years': 5, 'anniversary_month': '2025-01'})
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertTrue(all(row['hired_on'].startswith('2020-01') for row in response.data['results']))
+        response = self.client.get(self.url, {'anniversary_years': 5, 'anniversary_month': '2025-02'})
+        self.assertEqual(response.data['results'], [])
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get(self.url, {'min_tenure_days': -1}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'ordering': 'name'}).status_code, 400)
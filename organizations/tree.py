@@ -0,0 +1,115 @@
+"""
+The company → departments → employees tree served by `/companies/{id}/tree/`.
+
+The tree is assembled in memory from flat queries (the company, its departments, their
+employees) instead of walking relations per row. Built trees are cached under a per-company
+version token; the signals in `organizations.signals` drop the token whenever something the
+tree shows changes, so a cached tree is served until the next change to that company.
+"""
+import json
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import CharField, F, Value
+from django.db.models.functions import Coalesce, NullIf, Trim
+
+from .models import Department, Employee
+
+# Levels below the company: 1 adds the departments, 2 their employees.
+TREE_DEPTH = 2
+TREE_CACHE_TIMEOUT = 60 * 60 * 24
+
+DEPARTMENT_FIELDS = ('id', 'name')
+EMPLOYEE_FIELDS = ('id', 'full_name', 'designation')
+
+
+def _version_key(company_id):
+    return f'organizations:tree:{company_id}:version'
+
+
+def tree_version(company_id):
+    """Returns the token identifying the current state of a company's tree."""
+    return cache.get_or_set(_version_key(company_id), lambda: uuid4().hex, None)
+
+
+def invalidate_tree(*company_ids):
+    """
+    Drops the cached trees of the given companies once the current transaction commits,
+    so a concurrent request cannot cache the pre-commit state under the new token.
+    """
+    keys = [_version_key(company_id) for company_id in set(company_ids) if company_id is not None]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys), robust=True)
+
+
+def tree_etag(company_id, depth):
+    return f'"tree-{company_id}-{depth}-{tree_version(company_id)}"'
+
+
+def _departments(company):
+    return Department.objects.filter(company=company).order_by('id').values(*DEPARTMENT_FIELDS)
+
+
+def _employees(company):
+    # Mirrors `User.get_full_name`: the username, or the email when it is blank.
+    full_name = Coalesce(NullIf(Trim('user__username'), Value('')), F('user__email'), output_field=CharField())
+    return (
+        Employee.objects.filter(department__company=company)
+        .annotate(full_name=full_name)
+        .order_by('department_id', 'id')
+        .values_list('department_id', *EMPLOYEE_FIELDS)
+    )
+
+
+def build_tree(company, depth=TREE_DEPTH):
+    """Returns the tree of `company` as a dict, down to `depth` levels below the company."""
+    tree = {'id': company.pk, 'name': company.name}
+    if depth < 1:
+        return tree
+
+    departments = {row['id']: row for row in _departments(company)}
+    if depth >= 2:
+        for department in departments.values():
+            department['employees'] = []
+        for department_id, *values in _employees(company):
+            departments[department_id]['employees'].append(dict(zip(EMPLOYEE_FIELDS, values)))
+    tree['departments'] = list(departments.values())
+    return tree
+
+
+def get_tree(company, depth=TREE_DEPTH):
+    """Returns the tree of `company` from the cache, building and caching it on a miss."""
+    key = f'organizations:tree:{company.pk}:{tree_version(company.pk)}:{depth}'
+    return cache.get_or_set(key, lambda: build_tree(company, depth), TREE_CACHE_TIMEOUT)
+
+
+def iter_tree_json(company, depth=TREE_DEPTH, chunk_size=2000):
+    """
+    Yields the JSON encoding of the tree piece by piece. Employees are read with a
+    server-side cursor, so memory use does not grow with the size of the company.
+    """
+    head = json.dumps({'id': company.pk, 'name': company.name})
+    if depth < 1:
+        yield head
+        return
+
+    yield head[:-1] + ', "departments": ['
+    departments = list(_departments(company))
+    employees = _employees(company).iterator(chunk_size=chunk_size) if depth >= 2 else iter(())
+    pending = next(employees, None)
+    for index, department in enumerate(departments):
+        department_json = json.dumps(department)
+        if depth < 2:
+            yield (', ' if index else '') + department_json
+            continue
+
+        yield (', ' if index else '') + department_json[:-1] + ', "employees": ['
+        first = True
+        # Both querysets are ordered by department, so the employees arrive grouped.
+        while pending is not None and pending[0] == department['id']:
+            yield ('' if first else ', ') + json.dumps(dict(zip(EMPLOYEE_FIELDS, pending[1:])))
+            first = False
+            pending = next(employees, None)
+        yield ']}'
+    yield ']}'
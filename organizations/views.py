@@ -1,46 +1,168 @@
-from rest_framework import viewsets
+import itertools
+
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 
+from companyManagementSystem.cache import CachedResponseMixin
+from companyManagementSystem.conditional import ConditionalMixin
+from companyManagementSystem.exports import ExportMixin
+from companyManagementSystem.fieldsets import SparseQuerysetMixin
+from companyManagementSystem.mixins import ActionQuerysetMixin
 from users.models import User
+from users.scope import get_scope
 from .models import Company, Department, Employee
-from .serializers import CompanySerializer, DepartmentSerializer, EmployeeSerializer
-from users.permissions import IsAdmin, IsReadOnly, IsManager
+from .filters import TenureFilter
+from .importers import EmployeeImporter
+from .parsers import CSVStreamParser, NDJSONStreamParser
+from .serializers import (
+    CompanySerializer, CompanyStatsQuerySerializer, CompanyTreeQuerySerializer, DepartmentSerializer, EmployeeSerializer,
+)
+from .stats import company_stats
+from .tree import get_tree, iter_tree_json, tree_etag
+from users.permissions import IsAdmin, IsCompanyMember, IsReadOnly, IsManager
 
-class CompanyViewSet(viewsets.ModelViewSet):
+class CompanyViewSet(CachedResponseMixin, ConditionalMixin, SparseQuerysetMixin, ActionQuerysetMixin,
+                     viewsets.ModelViewSet):
     """
     API endpoint that allows companies to be viewed or edited.
     Only Admins can create, update, or delete companies.
     """
     queryset = Company.objects.all()
+    action_querysets = {
+        **dict.fromkeys(['list', 'retrieve'], Company.objects.only('created_at', *CompanySerializer.Meta.fields)),
+        'tree': Company.objects.only('id', 'name'),
+        'stats': Company.objects.only('id'),
+    }
     serializer_class = CompanySerializer
     permission_classes = [IsAdmin | IsReadOnly]
+    query_budgets = {
+        # Lists run one aggregate for their ETag before the page itself.
+        # Deletions also cascade to the archived rows and the review cycles.
+        'list': 2, 'retrieve': 1, 'create': 2, 'update': 3, 'partial_update': 3, 'destroy': 8,
+        'tree': 4, 'stats': 3,
+    }
+
+    def get_permissions(self):
+        """
+        The tree and stats describe the company's workforce, so they are limited to Admins and
+        the company's own members.
+        """
+        if self.action in ('tree', 'stats'):
+            self.permission_classes = [IsAdmin | IsCompanyMember]
+        return super().get_permissions()
+
+    @action(detail=True, methods=['get'])
+    def tree(self, request, pk=None):
+        """
+        Returns the company with its departments and their employees in a single response.
+        `?depth=` limits the levels below the company (1: departments, 2: employees) and
+        `?stream=true` streams the JSON for very large companies. Responses carry an ETag
+        that stays valid until the next change to the company.
+        """
+        params = CompanyTreeQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        depth = params.validated_data['depth']
+        company = self.get_object()
 
-class DepartmentViewSet(viewsets.ModelViewSet):
+        etag = tree_etag(company.pk, depth)
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        elif params.validated_data['stream']:
+            response = StreamingHttpResponse(iter_tree_json(company, depth), content_type='application/json')
+        else:
+            response = Response(get_tree(company, depth))
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    @action(detail=True, methods=['get'])
+    def stats(self, request, pk=None):
+        """
+        Returns the company's dashboard: headcount by designation, tenure buckets, projects
+        by status and reviews by state. `?department=` narrows it to one department.
+        Served from the incrementally maintained rollups in a single query.
+        """
+        params = CompanyStatsQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        company = self.get_object()
+        return Response(company_stats(company, params.validated_data.get('department')))
+
+class DepartmentViewSet(CachedResponseMixin, ConditionalMixin, SparseQuerysetMixin, ActionQuerysetMixin,
+                        viewsets.ModelViewSet):
     """
     API endpoint that allows departments to be viewed or edited.
     Only Admins can create, update, or delete departments.
     Managers can view departments.
     """
     queryset = Department.objects.all()
+    action_querysets = dict.fromkeys(['list', 'retrieve'], Department.objects.only('created_at', *DepartmentSerializer.Meta.fields))
     serializer_class = DepartmentSerializer
     permission_classes = [IsAdmin | IsReadOnly]
+    # Lists run one aggregate for their ETag before the page itself.
+    # Deletions also cascade to the archived rows and the review cycles.
+    query_budgets = {'list': 2, 'retrieve': 1, 'create': 7, 'update': 6, 'partial_update': 5, 'destroy': 10}
 
-class EmployeeViewSet(viewsets.ModelViewSet):
+class EmployeeViewSet(ConditionalMixin, ExportMixin, SparseQuerysetMixin, ActionQuerysetMixin,
+                      viewsets.ModelViewSet):
     """
     API endpoint that allows employees to be viewed or edited.
     Admins and Managers can create employees.
     """
     queryset = Employee.objects.all()
+    action_querysets = {
+        **dict.fromkeys(['list', 'retrieve'], Employee.objects.select_related('user').only(
+            'id', 'created_at', 'company', 'department', 'mobile_number', 'address', 'designation', 'hired_on',
+            'user', 'user__email', 'user__username', 'user__role',
+        )),
+        # Updates write through to the nested user, so they load both rows in full.
+        **dict.fromkeys(['update', 'partial_update'], Employee.objects.select_related('user')),
+    }
     serializer_class = EmployeeSerializer
     permission_classes = [IsAuthenticated]
+    filter_backends = [TenureFilter]
+    conditional_sources = ('updated_at', 'user__updated_at')
+    export_fields = {
+        'id': 'id', 'user': 'user_id', 'username': 'user__username', 'email': 'user__email',
+        'company': 'company_id', 'department': 'department_id', 'designation': 'designation',
+        'mobile_number': 'mobile_number', 'address': 'address', 'hired_on': 'hired_on',
+        'created_at': 'created_at', 'updated_at': 'updated_at',
+    }
+    query_budgets = {
+        # Writes include the after-commit update of the counters and rollups, in a savepoint:
+        # one UPDATE per counter row, and a lock and one UPDATE for the rollup cells. Cells seen
+        # for the first time take a department check, an INSERT and another UPDATE.
+        # Lists run one aggregate for their ETag before the page itself.
+        'list': 3, 'retrieve': 1, 'update': 8,
+        # Moving an employee counts their reviews by state, and moves them out of one
+        # department and into another.
+        'partial_update': 10,
+        # The user and the employee are inserted and the search vector is set, after checking
+        # the email, company and department: 6 queries, and 6 for the company, department and
+        # rollups.
+        'create': 12,
+        # The cascade loads the reviews and archived reviews and deletes them with the
+        # assignments, in 7 queries; the counters and rollups take 6 more.
+        'destroy': 13,
+        # Constant however many rows are imported: 10 queries for the lookups and inserts, and 9
+        # for the counters and rollups, which include creating the cells of a new designation.
+        'bulk_import': 19,
+        # Exported rows are streamed after the view returns; this covers the scoping queries.
+        'export': 1,
+    }
 
     def get_permissions(self):
         """
         Instantiates and returns the list of permissions that this view requires.
-        - POST (create) is restricted to Admins and Managers.
+        - POST (create, bulk import) is restricted to Admins and Managers.
         - Other actions (list, retrieve, update, delete) use default IsAuthenticated.
         """
-        if self.action == 'create':
+        if self.action in ('create', 'bulk_import'):
             self.permission_classes = [IsManager | IsAdmin]
         return super().get_permissions()
 
@@ -49,15 +171,34 @@ class EmployeeViewSet(viewsets.ModelViewSet):
         Optionally restricts the returned employees, returning only employees
         in the same department for a manager.
         """
-        user = self.request.user
-        if user.role == User.Role.MANAGER:
-            try:
-                manager_department = user.employee.department
-                return Employee.objects.filter(department=manager_department)
-            except Employee.DoesNotExist:
+        queryset = super().get_queryset()
+        if self.action in ('list', 'retrieve'):
+            # Writes render the saved instance, whose tenure may have changed since loading.
+            queryset = queryset.with_tenure()
+        scope = get_scope(self.request)
+        if scope.role == User.Role.MANAGER:
+            if scope.department_id is None:
                 # If the manager is not linked to an employee profile, return none.
-                return Employee.objects.none()
-        elif user.role == User.Role.EMPLOYEE:
-            return Employee.objects.filter(user=user)
+                return queryset.none()
+            return queryset.filter(department_id=scope.department_id)
+        elif scope.role == User.Role.EMPLOYEE:
+            return queryset.filter(user_id=scope.user_id)
+
+        return queryset
+
+    @action(detail=False, methods=['post'], url_path='bulk',
+            parser_classes=[CSVStreamParser, NDJSONStreamParser])
+    def bulk_import(self, request):
+        """
+        Imports employees from a streamed `text/csv` or `application/x-ndjson` body.
+        Valid rows are created, invalid ones are skipped and listed in the returned report.
+        """
+        # The parsers stream rows lazily, so the first one is read to tell an empty import apart.
+        rows = iter(request.data)
+        first = next(rows, None)
+        if first is None:
+            raise ValidationError({'detail': 'Request body contains no rows.'})
 
-        return super().get_queryset()
+        report = EmployeeImporter().run(itertools.chain([first], rows))
+        response_status = status.HTTP_201_CREATED if report['created'] else status.HTTP_400_BAD_REQUEST
+        return Response(report, status=response_status)
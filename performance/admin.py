@@ -1,4 +1,17 @@
-from django.contrib import admin
-from .models import PerformanceReview
+from django.contrib import admin, messages
+
+from .cycles import generate_reviews
+from .models import PerformanceReview, ReviewCycle
 
 admin.site.register(PerformanceReview)
+
+
+@admin.register(ReviewCycle)
+class ReviewCycleAdmin(admin.ModelAdmin):
+    list_display = ('name', 'company', 'department', 'schedule_from', 'created_at')
+    actions = ['generate']
+
+    @admin.action(description="Generate the missing reviews")
+    def generate(self, request, queryset):
+        created = sum(sum(generate_reviews(cycle)) for cycle in queryset)
+        self.message_user(request, f"Created {created} reviews in {len(queryset)} cycles.", messages.SUCCESS)
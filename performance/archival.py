@@ -0,0 +1,39 @@
+"""
+Moves reviews approved long ago to `ArchivedPerformanceReview`.
+See `companyManagementSystem.archive`.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import DateTimeField, Value
+from django.utils import timezone
+
+from companyManagementSystem.archive import ARCHIVE_BATCH_SIZE, copy_rows, delete_rows
+from .models import ArchivedPerformanceReview, PerformanceReview
+
+# Approved reviews stay in the hot table this long after their last change.
+ARCHIVE_AFTER_DAYS = 90
+
+REVIEW_FIELDS = ('id', 'employee', 'state', 'feedback', 'review_date', 'cycle', 'created_at', 'updated_at')
+
+
+def archive_reviews(before=None, batch_size=ARCHIVE_BATCH_SIZE):
+    """
+    Moves the reviews approved before `before` (`ARCHIVE_AFTER_DAYS` ago by default) to the
+    archive, `batch_size` per transaction. Yields the number of reviews moved by each batch.
+    Approval is final, so only approved reviews are archived.
+    """
+    before = before or timezone.now() - timedelta(days=ARCHIVE_AFTER_DAYS)
+    while True:
+        with transaction.atomic():
+            ids = list(
+                PerformanceReview.objects.filter(state=PerformanceReview.Stages.APPROVED, updated_at__lt=before)
+                .order_by('pk').select_for_update(skip_locked=True).values_list('pk', flat=True)[:batch_size]
+            )
+            if not ids:
+                return
+            reviews = PerformanceReview.objects.filter(pk__in=ids) \
+                .annotate(archived_at=Value(timezone.now(), DateTimeField()))
+            copy_rows(reviews, ArchivedPerformanceReview, (*REVIEW_FIELDS, 'archived_at'))
+            delete_rows(PerformanceReview, ids)
+        yield len(ids)
@@ -0,0 +1,71 @@
+"""
+Review cycle generation: a PENDING review for every active employee of a cycle, in one pass.
+
+Employees are walked in primary-key order, a keyset chunk at a time, each chunk read with one
+query and inserted with one `bulk_create`. Employees already holding a review of the cycle,
+current or archived, are left out, so a cycle can be generated again (after hiring, or an
+interrupted run) without duplicates. The cycle row is locked for each chunk, so concurrent
+runs take turns. `bulk_create` bypasses the save signal, so the review-state rollup deltas
+are recorded here, from the rows inserted. Conflicts are not ignored: a review added to the
+cycle some other way (say in the admin) while a chunk is being generated trips the
+`(cycle, employee)` unique constraint and rolls that chunk back, rather than being counted as
+created; running the generation again picks the chunk up.
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.db import transaction
+
+from organizations import counters, stats
+from organizations.models import Employee
+from .models import ArchivedPerformanceReview, PerformanceReview, ReviewCycle
+
+GENERATE_BATCH_SIZE = 5000
+
+
+def _review_date(cycle, position):
+    if cycle.schedule_from is None:
+        return None
+    return cycle.schedule_from + timedelta(days=position // cycle.reviews_per_day if cycle.reviews_per_day else 0)
+
+
+def generate_reviews(cycle, batch_size=GENERATE_BATCH_SIZE):
+    """
+    Creates the missing reviews of `cycle`, `batch_size` employees per transaction, scheduled
+    when the cycle has a `schedule_from`. Yields the number of reviews created by each batch.
+    """
+    employees = Employee.objects.filter(company_id=cycle.company_id, user__is_active=True)
+    if cycle.department_id is not None:
+        employees = employees.filter(department_id=cycle.department_id)
+    employees = employees.exclude(
+        pk__in=PerformanceReview.objects.filter(cycle=cycle).values('employee_id'),
+    ).exclude(
+        pk__in=ArchivedPerformanceReview.objects.filter(cycle=cycle).values('employee_id'),
+    )
+    state = PerformanceReview.Stages.SCHEDULED if cycle.schedule_from else PerformanceReview.Stages.PENDING
+
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            list(ReviewCycle.objects.select_for_update().filter(pk=cycle.pk).values_list('pk', flat=True))
+            rows = list(
+                employees.filter(pk__gt=last_pk).order_by('pk')
+                .values_list('pk', 'company_id', 'department_id')[:batch_size]
+            )
+            if not rows:
+                return
+            # Reviews are scheduled in employee order, after those the cycle already has.
+            scheduled = cycle.reviews.count() + cycle.archived_reviews.count() if cycle.schedule_from else 0
+            PerformanceReview.objects.bulk_create([
+                PerformanceReview(cycle=cycle, employee_id=employee_id, state=state,
+                                  review_date=_review_date(cycle, scheduled + position))
+                for position, (employee_id, _, _) in enumerate(rows)
+            ])
+            departments = Counter((company_id, department_id) for _, company_id, department_id in rows)
+            counters.record(*(
+                delta
+                for (company_id, department_id), created in departments.items()
+                for delta in stats.review_deltas(company_id, department_id, state, created)
+            ))
+        last_pk = rows[-1][0]
+        yield len(rows)
@@ -0,0 +1,29 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from companyManagementSystem.archive import ARCHIVE_BATCH_SIZE
+from performance.archival import ARCHIVE_AFTER_DAYS, archive_reviews
+
+
+class Command(BaseCommand):
+    help = "Moves reviews approved long ago to the archive table, in short batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=ARCHIVE_AFTER_DAYS,
+                            help='Archive reviews approved more than this many days ago.')
+        parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE,
+                            help='Number of reviews moved per transaction.')
+        parser.add_argument('--pause', type=float, default=0,
+                            help='Seconds to sleep between batches, to leave room for other writers.')
+
+    def handle(self, *args, **options):
+        before = timezone.now() - timedelta(days=options['days'])
+        total = 0
+        for moved in archive_reviews(before, options['batch_size']):
+            total += moved
+            if options['pause']:
+                time.sleep(options['pause'])
+        self.stdout.write(f'Archived {total} reviews approved before {before:%Y-%m-%d %H:%M}.')
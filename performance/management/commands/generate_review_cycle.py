@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from organizations.models import Company, Department
+from performance.cycles import GENERATE_BATCH_SIZE, generate_reviews
+from performance.models import ReviewCycle
+
+
+class Command(BaseCommand):
+    help = (
+        "Creates a review for every active employee of a company or department in the named cycle. "
+        "Running it again for the same cycle only adds the missing reviews."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', help='Name of the cycle, unique within the company.')
+        parser.add_argument('--company', type=int, help='Company whose employees are reviewed.')
+        parser.add_argument('--department', type=int, help='Only review the employees of this department.')
+        parser.add_argument('--schedule-from', help='Schedule the reviews from this ISO date and time.')
+        parser.add_argument('--per-day', type=int, help='Reviews scheduled per day; all on the first day by default.')
+        parser.add_argument('--batch-size', type=int, default=GENERATE_BATCH_SIZE,
+                            help='Number of employees handled per transaction.')
+
+    def handle(self, *args, **options):
+        department = None
+        if options['department']:
+            department = Department.objects.filter(pk=options['department']).first()
+            if department is None:
+                raise CommandError(f"Department {options['department']} does not exist.")
+            if options['company'] is not None and department.company_id != options['company']:
+                raise CommandError(f"Department {department.pk} does not belong to company {options['company']}.")
+        company_id = department.company_id if department else options['company']
+        if company_id is None:
+            raise CommandError('Give --company or --department.')
+        if not Company.objects.filter(pk=company_id).exists():
+            raise CommandError(f'Company {company_id} does not exist.')
+        schedule_from = None
+        if options['schedule_from']:
+            schedule_from = parse_datetime(options['schedule_from'])
+            if schedule_from is None:
+                raise CommandError(f"Invalid --schedule-from: {options['schedule_from']}")
+
+        cycle, created = ReviewCycle.objects.get_or_create(
+            company_id=company_id, name=options['name'],
+            defaults={'department': department, 'schedule_from': schedule_from, 'reviews_per_day': options['per_day']},
+        )
+        if not created and cycle.department_id != (department.pk if department else None):
+            raise CommandError(f"Cycle {cycle.name!r} already exists for another scope.")
+
+        started, total = time.perf_counter(), 0
+        for batch in generate_reviews(cycle, options['batch_size']):
+            total += batch
+        self.stdout.write(f'Created {total} reviews in cycle {cycle.name!r} in {time.perf_counter() - started:.1f}s.')
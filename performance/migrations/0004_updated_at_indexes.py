@@ -0,0 +1,21 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:27
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Build the indexes without locking the tables against writes.
+    atomic = False
+
+    dependencies = [
+        ('organizations', '0010_updated_at_indexes'),
+        ('performance', '0003_created_at_indexes'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='performancereview',
+            index=models.Index(fields=['updated_at'], name='review_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0010_updated_at_indexes'),
+        ('performance', '0004_updated_at_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedPerformanceReview',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('state', models.CharField(choices=[('PENDING', 'Pending Review'), ('SCHEDULED', 'Review Scheduled'), ('FEEDBACK', 'Feedback Provided'), ('APPROVAL', 'Under Approval'), ('APPROVED', 'Review Approved'), ('REJECTED', 'Review Rejected')], max_length=50)),
+                ('feedback', models.TextField(blank=True)),
+                ('review_date', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField()),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_performance_reviews', to='organizations.employee')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['created_at', 'id'], name='archived_review_created_idx')],
+            },
+        ),
+    ]
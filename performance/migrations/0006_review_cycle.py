@@ -0,0 +1,46 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0010_updated_at_indexes'),
+        ('performance', '0005_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewCycle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('name', models.CharField(max_length=255)),
+                ('schedule_from', models.DateTimeField(blank=True, null=True)),
+                ('reviews_per_day', models.PositiveIntegerField(blank=True, null=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='review_cycles', to='organizations.company')),
+                ('department', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='review_cycles', to='organizations.department')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='archivedperformancereview',
+            name='cycle',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_reviews', to='performance.reviewcycle'),
+        ),
+        migrations.AddField(
+            model_name='performancereview',
+            name='cycle',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reviews', to='performance.reviewcycle'),
+        ),
+        migrations.AddConstraint(
+            model_name='performancereview',
+            constraint=models.UniqueConstraint(fields=('cycle', 'employee'), name='review_cycle_employee_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='reviewcycle',
+            constraint=models.UniqueConstraint(fields=('company', 'name'), name='review_cycle_company_name_unique'),
+        ),
+    ]
@@ -1,9 +1,31 @@
 from django.db import models
 from django_fsm import FSMField, transition
-from organizations.models import Employee
+from organizations.models import Company, Department, Employee
 from companyManagementSystem.models import TimeBaseModel
 from django.utils.translation import gettext_lazy as _
 
+class ReviewCycle(TimeBaseModel, models.Model):
+    """
+    A round of reviews for every active employee of a company, or of one of its departments,
+    generated by `performance.cycles`. With `schedule_from`, the reviews are created already
+    scheduled, `reviews_per_day` of them a day (all on the first day without it).
+    """
+    name = models.CharField(max_length=255)
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='review_cycles')
+    department = models.ForeignKey(Department, on_delete=models.CASCADE, related_name='review_cycles',
+                                   null=True, blank=True)
+    schedule_from = models.DateTimeField(null=True, blank=True)
+    reviews_per_day = models.PositiveIntegerField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['company', 'name'], name='review_cycle_company_name_unique'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
 class PerformanceReview(TimeBaseModel, models.Model):
     class Stages(models.TextChoices):
         PENDING = 'PENDING', _('Pending Review')
@@ -17,6 +39,17 @@ class PerformanceReview(TimeBaseModel, models.Model):
     state = FSMField(default=Stages.PENDING, choices=Stages.choices, protected=True)
     feedback = models.TextField(blank=True)
     review_date = models.DateTimeField(null=True, blank=True)
+    cycle = models.ForeignKey(ReviewCycle, on_delete=models.SET_NULL, related_name='reviews', null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='review_created_idx'),
+            models.Index(fields=['updated_at'], name='review_updated_idx'),
+        ]
+        constraints = [
+            # One review per employee and cycle, so generating a cycle again creates no duplicates.
+            models.UniqueConstraint(fields=['cycle', 'employee'], name='review_cycle_employee_unique'),
+        ]
 
     def __str__(self):
         return f"Review for {self.employee} - {self.get_state_display()}"
@@ -46,3 +79,29 @@ class PerformanceReview(TimeBaseModel, models.Model):
     @transition(field=state, source=Stages.REJECTED, target=Stages.FEEDBACK)
     def rework_feedback(self, updated_feedback):
         self.feedback = updated_feedback
+
+
+class ArchivedPerformanceReview(models.Model):
+    """
+    An approved review moved out of the `PerformanceReview` table by `performance.archival`.
+    Keeps the review's id and fields; its state is final, so it is a plain column.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='archived_performance_reviews')
+    state = models.CharField(max_length=50, choices=PerformanceReview.Stages.choices)
+    feedback = models.TextField(blank=True)
+    review_date = models.DateTimeField(null=True, blank=True)
+    cycle = models.ForeignKey(ReviewCycle, on_delete=models.SET_NULL, related_name='archived_reviews',
+                              null=True, blank=True)
+
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='archived_review_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived review for {self.employee} - {self.get_state_display()}"
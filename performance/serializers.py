@@ -1,7 +1,9 @@
 from rest_framework import serializers
+
+from companyManagementSystem.fieldsets import SparseFieldsetsMixin
 from .models import PerformanceReview
 
-class PerformanceReviewSerializer(serializers.ModelSerializer):
+class PerformanceReviewSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     """
     Main serializer for the PerformanceReview model.
     """
@@ -14,6 +16,10 @@ class PerformanceReviewSerializer(serializers.ModelSerializer):
         fields = ('id', 'employee', 'employee_name', 'state', 'state_display', 'feedback', 'review_date')
         # The state is read-only because it should only be changed via the defined FSM transitions.
         read_only_fields = ('state',)
+        field_sources = {
+            'employee_name': ('employee__user__username', 'employee__user__email'),
+            'state_display': ('state',),
+        }
 
 # --- Action-Specific Serializers ---
 # These small serializers are used to validate the input for custom viewset actions.
@@ -29,3 +35,14 @@ class ReviewFeedbackSerializer(serializers.Serializer):
 class ReviewRejectSerializer(serializers.Serializer):
     """Serializer for rejecting a review."""
     feedback_text = serializers.CharField(required=True, style={'base_template': 'textarea.html'})
+
+# --- Batch Transitions ---
+
+TRANSITION_NAMES = ('schedule', 'provide_feedback', 'submit_for_approval', 'approve', 'reject')
+MAX_BATCH_TRANSITIONS = 500
+
+class ReviewTransitionSerializer(serializers.Serializer):
+    """One item of a batch: the review, the transition to apply and its input (as for the single actions)."""
+    id = serializers.IntegerField()
+    transition = serializers.ChoiceField(choices=TRANSITION_NAMES)
+    payload = serializers.DictField(required=False, default=dict)
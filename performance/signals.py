@@ -0,0 +1,54 @@
+import threading
+
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+from organizations import counters, stats
+from organizations.models import Employee
+from .models import ArchivedPerformanceReview, PerformanceReview
+
+# Company and department ids of the employees whose reviews are being deleted, by employee id.
+_deleting = threading.local()
+
+@receiver(post_save, sender=PerformanceReview)
+def handle_review_save(sender, instance, created, **kwargs):
+    """
+    Keeps the review-state rollups of the employee's department in step with FSM transitions.
+    """
+    if created:
+        employee = instance.employee
+        counters.record(*stats.review_deltas(employee.company_id, employee.department_id, instance.state, 1))
+    elif instance.has_changed('state') and instance.previous_value('state') is not None:
+        employee = instance.employee
+        counters.record(
+            *stats.review_deltas(employee.company_id, employee.department_id, instance.previous_value('state'), -1),
+            *stats.review_deltas(employee.company_id, employee.department_id, instance.state, 1),
+        )
+
+# Archived reviews are counted in the rollups too.
+@receiver(pre_delete, sender=PerformanceReview)
+@receiver(pre_delete, sender=ArchivedPerformanceReview)
+def collect_review_employee(sender, instance, origin=None, **kwargs):
+    """Notes the employee of a review about to be deleted, so its scope can be loaded in bulk."""
+    if not hasattr(_deleting, 'scopes'):
+        _deleting.scopes, _deleting.pending = {}, set()
+    # Deleting an employee cascades to their reviews, so the employee is usually at hand already.
+    employee = instance.employee if sender.employee.is_cached(instance) else origin
+    if isinstance(employee, Employee) and employee.pk == instance.employee_id:
+        _deleting.scopes[instance.employee_id] = (employee.company_id, employee.department_id)
+    else:
+        _deleting.pending.add(instance.employee_id)
+
+
+@receiver(post_delete, sender=PerformanceReview)
+@receiver(post_delete, sender=ArchivedPerformanceReview)
+def handle_review_delete(sender, instance, **kwargs):
+    # Every pre_delete of a deletion is sent before its first post_delete, and reviews are
+    # deleted before the employees they cascade from, so a single query covers a whole cascade.
+    if instance.employee_id in _deleting.pending:
+        _deleting.scopes.update(
+            (pk, (company_id, department_id)) for pk, company_id, department_id in
+            Employee.objects.filter(pk__in=_deleting.pending).values_list('pk', 'company_id', 'department_id')
+        )
+        _deleting.pending.clear()
+    company_id, department_id = _deleting.scopes[instance.employee_id]
+    counters.record(*stats.review_deltas(company_id, department_id, instance.state, -1))
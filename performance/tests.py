@@ -1,3 +1,316 @@
-from django.test import TestCase
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
 
-# Create your tests here.
+from django.db import connection
+from django.core.management import CommandError, call_command
+from django.test.utils import CaptureQueriesContext
+
+from django.urls import reverse
+from django.utils import timezone
+
+from companyManagementSystem.testing import QueryBudgetTestCase
+from organizations.models import Company
+from organizations.stats import company_stats, rebuild_stats
+from .archival import archive_reviews
+from .cycles import generate_reviews
+from .models import ArchivedPerformanceReview, PerformanceReview, ReviewCycle
+from .views import PerformanceReviewViewSet
+
+
+class PerformanceReviewQueryBudgetTests(QueryBudgetTestCase):
+    def setUp(self):
+        self.authenticate(self.admin)
+        self.review = self.org['reviews'][0]
+
+    def review_in_state(self, state):
+        # The state field is protected, so the stage is set without going through the model.
+        PerformanceReview.objects.filter(pk=self.review.pk).update(state=state)
+
+    def reloaded(self):
+        # The protected state field cannot be refreshed in place.
+        return PerformanceReview.objects.get(pk=self.review.pk)
+
+    def test_list(self):
+        response = self.assertWithinQueryBudget(PerformanceReviewViewSet, 'list', 'get', reverse('performancereview-list'))
+        self.assertEqual(len(response.data['results']), 10)
+
+    def test_list_as_manager(self):
+        self.authenticate(self.manager)
+        response = self.assertWithinQueryBudget(PerformanceReviewViewSet, 'list', 'get', reverse('performancereview-list'))
+        self.assertEqual(len(response.data['results']), 10)
+
+    def test_list_as_employee(self):
+        self.authenticate(self.employee)
+        response = self.assertWithinQueryBudget(PerformanceReviewViewSet, 'list', 'get', reverse('performancereview-list'))
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_retrieve(self):
+        url = reverse('performancereview-detail', args=[self.review.pk])
+        response = self.assertWithinQueryBudget(PerformanceReviewViewSet, 'retrieve', 'get', url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_create(self):
+        data = {'employee': self.org['employees'][2].pk, 'feedback': ''}
+        url = reverse('performancereview-list')
+        response = self.assertWithinQueryBudget(PerformanceReviewViewSet, 'create', 'post', url, data)
+        self.assertEqual(response.status_code, 201)
+
+    def test_update(self):
+        url = reverse('performancereview-detail', args=[self.review.pk])
+        data = {'employee': self.review.employee_id, 'feedback': 'Solid year'}
+        response = self.assertWithinQueryBudget(PerformanceReviewViewSet, 'update', 'put', url, data)
+        self.assertEqual(response.status_code, 200)
+
+    def test_partial_update(self):
+        url = reverse('performancereview-detail', args=[self.review.pk])
+        response = self.assertWithinQueryBudget(PerformanceReviewViewSet, 'partial_update', 'patch', url, {'feedback': 'Ok'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_destroy(self):
+        url = reverse('performancereview-detail', args=[self.review.pk])
+        response = self.assertWithinQueryBudget(PerformanceReviewViewSet, 'destroy', 'delete', url)
+        self.assertEqual(response.status_code, 204)
+
+    def test_schedule(self):
+        url = reverse('performancereview-schedule', args=[self.review.pk])
+        data = {'review_date': '2025-01-01T10:00:00Z'}
+        response = self.assertWithinQueryBudget(PerformanceReviewViewSet, 'schedule', 'post', url, data)
+        self.assertEqual(response.status_code, 200)
+        review = self.reloaded()
+        self.assertEqual((review.state, review.review_date.year), (PerformanceReview.Stages.SCHEDULED, 2025))
+
+    def test_provide_feedback(self):
+        self.review_in_state(PerformanceReview.Stages.SCHEDULED)
+        url = reverse('performancereview-provide-feedback', args=[self.review.pk])
+        response = self.assertWithinQueryBudget(
+            PerformanceReviewViewSet, 'provide_feedback', 'post', url, {'feedback_text': 'Great'},
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_submit_for_approval(self):
+        self.review_in_state(PerformanceReview.Stages.FEEDBACK)
+        url = reverse('performancereview-submit-for-approval', args=[self.review.pk])
+        response = self.assertWithinQueryBudget(PerformanceReviewViewSet, 'submit_for_approval', 'post', url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_approve(self):
+        self.review_in_state(PerformanceReview.Stages.APPROVAL)
+        url = reverse('performancereview-approve', args=[self.review.pk])
+        response = self.assertWithinQueryBudget(PerformanceReviewViewSet, 'approve', 'post', url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.reloaded().state, PerformanceReview.Stages.APPROVED)
+
+    def test_reject(self):
+        self.review_in_state(PerformanceReview.Stages.APPROVAL)
+        url = reverse('performancereview-reject', args=[self.review.pk])
+        response = self.assertWithinQueryBudget(PerformanceReviewViewSet, 'reject', 'post', url, {'feedback_text': 'Redo'})
+        self.assertEqual(response.status_code, 200)
+        review = self.reloaded()
+        self.assertEqual(review.state, PerformanceReview.Stages.REJECTED)
+        self.assertTrue(review.feedback.endswith('--- REJECTION ---\nRedo'))
+
+    def test_transition_from_the_wrong_state(self):
+        url = reverse('performancereview-approve', args=[self.review.pk])
+        self.assertEqual(self.client.post(url).status_code, 400)
+        self.assertEqual(self.reloaded().state, PerformanceReview.Stages.PENDING)
+
+
+class ReviewArchiveTests(QueryBudgetTestCase):
+    def setUp(self):
+        self.authenticate(self.admin)
+        # The first three reviews were approved long ago, the fourth recently.
+        reviews = self.org['reviews']
+        self.approved = [review.pk for review in reviews[:3]]
+        old = timezone.now() - timedelta(days=365)
+        PerformanceReview.objects.filter(pk__in=self.approved).update(state='APPROVED', updated_at=old)
+        PerformanceReview.objects.filter(pk=reviews[3].pk).update(state='APPROVED')
+        rebuild_stats(self.org['company'].pk)
+
+    def test_moves_reviews_approved_long_ago(self):
+        self.assertEqual(list(archive_reviews(batch_size=2)), [2, 1])
+        self.assertEqual(sorted(ArchivedPerformanceReview.objects.values_list('pk', flat=True)), self.approved)
+        self.assertFalse(PerformanceReview.objects.filter(pk__in=self.approved).exists())
+        self.assertTrue(PerformanceReview.objects.filter(pk=self.org['reviews'][3].pk).exists())
+
+    def test_rollups_keep_counting_archived_reviews(self):
+        before = company_stats(self.org['company'])['reviews']
+        list(archive_reviews())
+        self.assertEqual(company_stats(self.org['company'])['reviews'], before)
+        rebuild_stats(self.org['company'].pk)
+        self.assertEqual(company_stats(self.org['company'])['reviews'], before)
+
+    def test_cascades_load_the_review_employees_once(self):
+        list(archive_reviews())
+        with self.captureOnCommitCallbacks(execute=True), CaptureQueriesContext(connection) as queries:
+            self.org['departments'][0].delete()
+        lookups = [query for query in queries if query['sql'].startswith(
+            'SELECT "organizations_employee"."id" AS "pk", "organizations_employee"."company_id"',
+        )]
+        self.assertEqual(len(lookups), 1)
+        incremental = company_stats(self.org['company'])['reviews']
+        rebuild_stats(self.org['company'].pk)
+        self.assertEqual(company_stats(self.org['company'])['reviews'], incremental)
+
+    def test_owner_reads_the_archived_review(self):
+        list(archive_reviews())
+        self.authenticate(self.employee)
+        url = reverse('performancereview-list')
+        self.assertEqual(self.client.get(url).data['results'], [])
+        response = self.assertWithinQueryBudget(PerformanceReviewViewSet, 'list', 'get', url, {'include_archived': 'true'})
+        self.assertEqual([review['id'] for review in response.data['results']], [self.approved[0]])
+        self.assertEqual(response.data['results'][0]['state_display'], 'Review Approved')
+
+        detail = reverse('performancereview-detail', args=[self.approved[0]])
+        response = self.assertWithinQueryBudget(PerformanceReviewViewSet, 'retrieve', 'get', detail,
+                                                {'include_archived': 'true'})
+        self.assertEqual(response.status_code, 200)
+
+
+class ReviewBatchTransitionTests(QueryBudgetTestCase):
+    def setUp(self):
+        self.authenticate(self.admin)
+        self.reviews = [review.pk for review in self.org['reviews']]
+        self.url = reverse('performancereview-transitions')
+
+    def in_state(self, state, reviews):
+        PerformanceReview.objects.filter(pk__in=reviews).update(state=state)
+        rebuild_stats(self.org['company'].pk)
+
+    def apply(self, items):
+        response = self.assertWithinQueryBudget(PerformanceReviewViewSet, 'transitions', 'post', self.url, items)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def states(self, reviews):
+        return list(PerformanceReview.objects.filter(pk__in=reviews).order_by('pk').values_list('state', flat=True))
+
+    def test_approves_in_bulk(self):
+        batch = self.reviews[:10]
+        self.in_state(PerformanceReview.Stages.APPROVAL, batch)
+        results = self.apply([{'id': pk, 'transition': 'approve'} for pk in batch])
+        self.assertEqual([result['state'] for result in results], ['APPROVED'] * 10)
+        self.assertEqual(self.states(batch), ['APPROVED'] * 10)
+        reviews = company_stats(self.org['company'])['reviews']
+        self.assertEqual((reviews['APPROVED'], reviews['APPROVAL']), (10, 0))
+
+    def test_queries_do_not_grow_with_the_batch(self):
+        self.in_state(PerformanceReview.Stages.APPROVAL, self.reviews)
+
+        def queries(reviews):
+            with CaptureQueriesContext(connection) as captured:
+                self.apply([{'id': pk, 'transition': 'approve'} for pk in reviews])
+            return len(captured)
+
+        queries(self.reviews[:2])  # Creates the department's rollup cell for approved reviews.
+        self.assertEqual(queries(self.reviews[2:4]), queries(self.reviews[4:12]))
+
+    def test_items_fail_on_their_own(self):
+        results = self.apply([
+            {'id': self.reviews[0], 'transition': 'approve'},
+            {'id': 0, 'transition': 'approve'},
+            {'id': self.reviews[1], 'transition': 'schedule', 'payload': {}},
+            {'id': self.reviews[2], 'transition': 'schedule', 'payload': {'review_date': '2025-01-01T10:00:00Z'}},
+        ])
+        self.assertIn('Cannot approve', results[0]['error'])
+        self.assertEqual(results[1]['error'], 'Not found.')
+        self.assertIn('review_date', results[2]['error'])
+        self.assertEqual(results[3]['state'], 'SCHEDULED')
+        self.assertEqual(self.states(self.reviews[:3]), ['PENDING', 'PENDING', 'SCHEDULED'])
+
+    def test_items_for_one_review_apply_in_turn(self):
+        results = self.apply([
+            {'id': self.reviews[0], 'transition': 'schedule', 'payload': {'review_date': '2025-01-01T10:00:00Z'}},
+            {'id': self.reviews[0], 'transition': 'provide_feedback', 'payload': {'feedback_text': 'Great'}},
+            {'id': self.reviews[0], 'transition': 'submit_for_approval'},
+            {'id': self.reviews[0], 'transition': 'reject', 'payload': {'feedback_text': 'Needs examples'}},
+        ])
+        self.assertEqual([result['state'] for result in results], ['SCHEDULED', 'FEEDBACK', 'APPROVAL', 'REJECTED'])
+        review = PerformanceReview.objects.get(pk=self.reviews[0])
+        self.assertEqual(review.state, 'REJECTED')
+        self.assertIn('Needs examples', review.feedback)
+        self.assertEqual(company_stats(self.org['company'])['reviews']['REJECTED'], 1)
+
+    def test_managers_reach_their_department_only(self):
+        self.authenticate(self.manager)
+        other_department = self.reviews[12]
+        results = self.apply([{'id': other_department, 'transition': 'schedule',
+                               'payload': {'review_date': '2025-01-01T10:00:00Z'}}])
+        self.assertEqual(results[0]['error'], 'Not found.')
+
+    def test_managers_and_admins_only(self):
+        self.authenticate(self.employee)
+        response = self.client.post(self.url, [{'id': self.reviews[0], 'transition': 'approve'}], format='json')
+        self.assertEqual(response.status_code, 403)
+
+
+
+class ReviewCycleTests(QueryBudgetTestCase):
+    def setUp(self):
+        self.company = self.org['company']
+        self.department = self.org['departments'][0]
+        # The manager is an employee of the first department too.
+        self.employees = set(self.department.employees.values_list('pk', flat=True))
+
+    def cycle_reviews(self, cycle):
+        return PerformanceReview.objects.filter(cycle=cycle)
+
+    def test_generates_a_review_per_active_employee(self):
+        inactive = self.org['employees'][0].user
+        inactive.is_active = False
+        inactive.save()
+        cycle = ReviewCycle.objects.create(name='2026', company=self.company)
+        self.assertEqual(sum(generate_reviews(cycle, batch_size=5)), len(self.org['employees']))
+        reviews = self.cycle_reviews(cycle)
+        self.assertNotIn(self.org['employees'][0].pk, reviews.values_list('employee_id', flat=True))
+        self.assertEqual(set(reviews.values_list('state', flat=True)), {PerformanceReview.Stages.PENDING})
+
+    def test_generating_again_only_adds_missing_reviews(self):
+        cycle = ReviewCycle.objects.create(name='2026', company=self.company, department=self.department)
+        self.assertEqual(sum(generate_reviews(cycle)), len(self.employees))
+        archived = self.cycle_reviews(cycle).first()
+        PerformanceReview.objects.filter(pk=archived.pk).update(
+            state=PerformanceReview.Stages.APPROVED, updated_at=timezone.now() - timedelta(days=365),
+        )
+        list(archive_reviews())
+        self.assertEqual(sum(generate_reviews(cycle)), 0)
+        self.assertEqual(set(self.cycle_reviews(cycle).values_list('employee_id', flat=True)) | {archived.employee_id},
+                         self.employees)
+
+    def test_schedules_reviews_per_day(self):
+        start = datetime(2026, 11, 2, 9, tzinfo=dt_timezone.utc)
+        cycle = ReviewCycle.objects.create(name='2026', company=self.company, department=self.department,
+                                           schedule_from=start, reviews_per_day=5)
+        list(generate_reviews(cycle, batch_size=4))
+        dates = list(self.cycle_reviews(cycle).order_by('employee_id').values_list('review_date', flat=True))
+        self.assertEqual(dates, [start + timedelta(days=position // 5) for position in range(len(self.employees))])
+        self.assertEqual(set(self.cycle_reviews(cycle).values_list('state', flat=True)),
+                         {PerformanceReview.Stages.SCHEDULED})
+
+    def test_rollups_count_the_generated_reviews(self):
+        before = company_stats(self.company)['reviews']['PENDING']
+        with self.captureOnCommitCallbacks(execute=True):
+            list(generate_reviews(ReviewCycle.objects.create(name='2026', company=self.company)))
+        self.assertEqual(company_stats(self.company)['reviews']['PENDING'], before + len(self.org['employees']) + 1)
+
+    def test_queries_do_not_grow_with_the_batch(self):
+        def queries(department):
+            cycle = ReviewCycle.objects.create(name=f'Cycle {department.pk}', company=self.company, department=department)
+            with CaptureQueriesContext(connection) as captured:
+                list(generate_reviews(cycle))
+            return len(captured)
+
+        self.assertEqual(queries(self.org['departments'][0]), queries(self.org['departments'][1]))
+
+    def test_command(self):
+        out = StringIO()
+        call_command('generate_review_cycle', '2026', department=self.department.pk, stdout=out)
+        call_command('generate_review_cycle', '2026', department=self.department.pk, stdout=out)
+        self.assertIn(f'Created {len(self.employees)} reviews', out.getvalue())
+        self.assertIn('Created 0 reviews', out.getvalue())
+        self.assertEqual(ReviewCycle.objects.get(name='2026').reviews.count(), len(self.employees))
+
+    def test_command_rejects_a_department_of_another_company(self):
+        other = Company.objects.create(name='Other')
+        with self.assertRaisesMessage(CommandError, 'does not belong to company'):
+            call_command('generate_review_cycle', '2027', company=other.pk, department=self.department.pk)
+        self.assertFalse(ReviewCycle.objects.filter(name='2027').exists())
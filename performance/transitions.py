@@ -0,0 +1,82 @@
+"""
+Batch FSM transitions: moving many reviews through their workflow in one request.
+
+The reviews are locked with one `SELECT ... FOR UPDATE` and every transition is checked and
+applied in memory by django-fsm, in the order given, so an item not allowed from its review's
+current state fails on its own and leaves the others to apply. The changed reviews are written
+with one `bulk_update`. That bypasses `save()` and the signal keeping the review-state rollups
+in step, so their deltas are recorded here instead.
+"""
+from django.db import transaction
+from django.utils import timezone
+from django_fsm import can_proceed
+
+from organizations import counters, stats
+from .models import PerformanceReview
+from .serializers import ReviewFeedbackSerializer, ReviewRejectSerializer, ReviewScheduleSerializer
+
+# Transition name: the model method, the serializer validating its payload, and the method's
+# arguments mapped to the payload fields they are taken from.
+TRANSITIONS = {
+    'schedule': ('schedule_review', ReviewScheduleSerializer, {'review_date': 'review_date'}),
+    'provide_feedback': ('provide_feedback', ReviewFeedbackSerializer, {'feedback_text': 'feedback_text'}),
+    'submit_for_approval': ('submit_for_approval', None, {}),
+    'approve': ('approve', None, {}),
+    'reject': ('reject', ReviewRejectSerializer, {'rejection_feedback': 'feedback_text'}),
+}
+
+UPDATE_FIELDS = ('state', 'feedback', 'review_date', 'updated_at')
+
+
+def _apply(review, transition, payload):
+    """Applies one transition to `review` in memory. Returns the reason it cannot, if any."""
+    method_name, serializer_class, arguments = TRANSITIONS[transition]
+    method = getattr(review, method_name)
+    if not can_proceed(method):
+        return f'Cannot {transition.replace("_", " ")} a review in state {review.state}.'
+    kwargs = {}
+    if serializer_class is not None:
+        serializer = serializer_class(data=payload)
+        if not serializer.is_valid():
+            return serializer.errors
+        kwargs = {argument: serializer.validated_data[field] for argument, field in arguments.items()}
+    method(**kwargs)
+    return None
+
+
+def apply_transitions(reviews, items):
+    """
+    Applies `items` (dicts with `id`, `transition` and `payload`) to the reviews of the queryset
+    `reviews`, in one transaction. A review may appear in several items, which apply in turn.
+    Returns one result per item: its id and transition, and the review's new `state` or the `error`.
+    """
+    results, changed = [], {}
+    with transaction.atomic():
+        locked = reviews.select_related('employee').select_for_update(of=('self',)) \
+            .in_bulk({item['id'] for item in items})
+        initial_states = {pk: review.state for pk, review in locked.items()}
+        for item in items:
+            result = {'id': item['id'], 'transition': item['transition']}
+            review = locked.get(item['id'])
+            error = 'Not found.' if review is None else _apply(review, item['transition'], item['payload'])
+            if error is None:
+                changed[review.pk] = review
+                result['state'] = review.state
+            else:
+                result['error'] = error
+            results.append(result)
+
+        if changed:
+            # `bulk_update` does not apply `auto_now`, and exports and ETags rely on `updated_at`.
+            now = timezone.now()
+            for review in changed.values():
+                review.updated_at = now
+            PerformanceReview.objects.bulk_update(changed.values(), UPDATE_FIELDS)
+            counters.record(*(
+                delta
+                for review in changed.values() if review.state != initial_states[review.pk]
+                for state, amount in ((initial_states[review.pk], -1), (review.state, 1))
+                for delta in stats.review_deltas(review.employee.company_id, review.employee.department_id,
+                                                 state, amount)
+            ))
+    return results
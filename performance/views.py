@@ -4,23 +4,70 @@ from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
+from companyManagementSystem.archive import ArchiveMixin
+from companyManagementSystem.conditional import ConditionalMixin
+from companyManagementSystem.exports import ExportMixin
+from companyManagementSystem.fieldsets import SparseQuerysetMixin
+from companyManagementSystem.mixins import ActionQuerysetMixin
 from users.models import User
-from .models import PerformanceReview
+from users.scope import get_scope
+from .models import ArchivedPerformanceReview, PerformanceReview
 from .serializers import (
     PerformanceReviewSerializer, ReviewScheduleSerializer,
-    ReviewFeedbackSerializer, ReviewRejectSerializer
+    ReviewFeedbackSerializer, ReviewRejectSerializer,
+    ReviewTransitionSerializer, MAX_BATCH_TRANSITIONS,
 )
+from .transitions import apply_transitions
 from users.permissions import IsManager, IsAdmin, IsOwnerOrManagerOrAdmin
 
 logger = logging.getLogger(__name__)
 
-class PerformanceReviewViewSet(viewsets.ModelViewSet):
+class PerformanceReviewViewSet(ConditionalMixin, ExportMixin, SparseQuerysetMixin, ArchiveMixin, ActionQuerysetMixin,
+                               viewsets.ModelViewSet):
     """
     API endpoint for managing the Employee Performance Review Cycle.
+    `?include_archived=true` also lists and retrieves archived (approved) reviews.
     """
     queryset = PerformanceReview.objects.all()
+    action_querysets = {
+        **dict.fromkeys(['list', 'retrieve'], PerformanceReview.objects.select_related('employee__user').only(
+            'id', 'created_at', 'employee', 'state', 'feedback', 'review_date',
+            'employee__user', 'employee__user__username', 'employee__user__email',
+        )),
+        # Writes check the manager's department through `employee` and render the employee's name.
+        **dict.fromkeys(['update', 'partial_update'], PerformanceReview.objects.select_related('employee__user')),
+        'destroy': PerformanceReview.objects.select_related('employee'),
+        # Transitions record the review in its department's rollups, which needs the employee.
+        **dict.fromkeys(
+            ['schedule', 'provide_feedback', 'submit_for_approval', 'approve', 'reject'],
+            PerformanceReview.objects.select_related('employee'),
+        ),
+    }
+    archive_queryset = ArchivedPerformanceReview.objects.select_related('employee__user').only(
+        'id', 'created_at', 'employee', 'state', 'feedback', 'review_date',
+        'employee__user', 'employee__user__username', 'employee__user__email',
+    )
     serializer_class = PerformanceReviewSerializer
     permission_classes = [permissions.IsAuthenticated, IsOwnerOrManagerOrAdmin]
+    conditional_sources = ('updated_at', 'employee__user__updated_at')
+    export_fields = {
+        'id': 'id', 'employee': 'employee_id', 'state': 'state', 'feedback': 'feedback',
+        'review_date': 'review_date', 'created_at': 'created_at', 'updated_at': 'updated_at',
+    }
+    query_budgets = {
+        # Creations, deletions and transitions include the after-commit update of the rollups.
+        # Lists run one aggregate for their ETag before the page itself.
+        # `?include_archived=true` reads the archive too: a second page, or a detail lookup.
+        'list': 4, 'retrieve': 2, 'create': 7, 'update': 4, 'partial_update': 2, 'destroy': 6,
+        # The review is loaded and saved; the rollups take a lock and one UPDATE in a savepoint,
+        # and three more queries when the new state opens a cell for the department.
+        'schedule': 9, 'provide_feedback': 9, 'submit_for_approval': 9, 'approve': 9, 'reject': 9,
+        # Constant however many reviews the batch moves; the rollup update does not grow with
+        # the departments and states it touches either.
+        'transitions': 11,
+        # Exported rows are streamed after the view returns; this covers the scoping queries.
+        'export': 1,
+    }
 
     def get_queryset(self):
         """
@@ -29,20 +76,19 @@ class PerformanceReviewViewSet(viewsets.ModelViewSet):
         - Managers see reviews for their department's employees.
         - Employees see their own review.
         """
-        user = self.request.user
-        if user.role == User.Role.ADMIN:
-            return PerformanceReview.objects.all()
-        elif user.role == User.Role.MANAGER:
-            try:
-                return PerformanceReview.objects.filter(employee__department=user.employee.department)
-            except:
-                return PerformanceReview.objects.none()
-        elif user.role == User.Role.EMPLOYEE:
-            try:
-                return PerformanceReview.objects.filter(employee=user.employee)
-            except:
-                return PerformanceReview.objects.none()
-        return PerformanceReview.objects.none()
+        queryset = super().get_queryset()
+        scope = get_scope(self.request)
+        if scope.role == User.Role.ADMIN:
+            return queryset
+        elif scope.role == User.Role.MANAGER:
+            if scope.department_id is None:
+                return queryset.none()
+            return queryset.filter(employee__department_id=scope.department_id)
+        elif scope.role == User.Role.EMPLOYEE:
+            if scope.employee_id is None:
+                return queryset.none()
+            return queryset.filter(employee_id=scope.employee_id)
+        return queryset.none()
 
     # --- Custom Actions for FSM Transitions ---
 
@@ -53,8 +99,7 @@ class PerformanceReviewViewSet(viewsets.ModelViewSet):
         serializer = ReviewScheduleSerializer(data=request.data)
         if serializer.is_valid():
             try:
-                review.review_date = serializer.validated_data['review_date']
-                review.schedule_review()
+                review.schedule_review(review_date=serializer.validated_data['review_date'])
                 review.save()
                 logger.info(f'Review {review.id} scheduled for employee {review.employee.id} by user {request.user.id}.')
                 return Response({'status': 'Review scheduled'}, status=status.HTTP_200_OK)
@@ -99,18 +144,18 @@ class PerformanceReviewViewSet(viewsets.ModelViewSet):
         """Transition: Under Approval -> Review Approved"""
         review = self.get_object()
         try:
-            review.approve_review()
+            review.approve()
             review.save()
             logger.info(
                 f"Performance review {review.id} for employee {review.employee.id} "
                 f"was APPROVED by user {request.user.id}."
             )
+            return Response({'status': 'Review approved'}, status=status.HTTP_200_OK)
+        except Exception as e:
             logger.error(
                 f"Failed to approve review {review.id} for user {request.user.id}. Error: {e}",
                 exc_info=True # Adds stack trace to the log
             )
-            return Response({'status': 'Review approved'}, status=status.HTTP_200_OK)
-        except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
     @action(detail=True, methods=['post'], permission_classes=[IsManager | IsAdmin])
@@ -120,9 +165,8 @@ class PerformanceReviewViewSet(viewsets.ModelViewSet):
         serializer = ReviewRejectSerializer(data=request.data)
         if serializer.is_valid():
             try:
-                # Add the rejection reason to the existing feedback for context.
-                rejection_note = f"\n\n--- REJECTED ---\n{serializer.validated_data['rejection_feedback']}"
-                review.reject_review(rejection_note=rejection_note)
+                # The transition appends the rejection reason to the existing feedback for context.
+                review.reject(rejection_feedback=serializer.validated_data['feedback_text'])
                 review.save()
                 logger.warning(
                     f"Performance review {review.id} for employee {review.employee.id} "
@@ -136,3 +180,18 @@ class PerformanceReviewViewSet(viewsets.ModelViewSet):
                 )
                 return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    @action(detail=False, methods=['post'], permission_classes=[IsManager | IsAdmin])
+    def transitions(self, request):
+        """
+        Applies a batch of transitions, `[{"id": ..., "transition": "approve", "payload": {...}}]`,
+        in one transaction. Payloads take the same fields as the single actions. Each item
+        succeeds or fails on its own; the response lists their results in order.
+        """
+        serializer = ReviewTransitionSerializer(data=request.data, many=True, allow_empty=False,
+                                                max_length=MAX_BATCH_TRANSITIONS)
+        serializer.is_valid(raise_exception=True)
+        results = apply_transitions(self.get_queryset(), serializer.validated_data)
+        applied = sum('state' in result for result in results)
+        logger.info(f'Batch of {len(results)} review transitions by user {request.user.id}: {applied} applied.')
+        return Response(results, status=status.HTTP_200_OK)
@@ -0,0 +1,169 @@
+"""
+Employee allocation over a date range: how many projects each employee runs concurrently, day by day.
+
+`load_assignments` reads every employee of a scope with the projects overlapping the range in
+one query (employees without any come back with empty dates), archived projects included, so
+ranges the archival job has reached are reported in full. `allocate` then turns each
+employee's project date ranges into a timeline of concurrent-project counts:
+
+- small inputs are swept interval by interval, sorting the start/end events of each employee;
+- large ones fill an employees x days array from per-employee difference arrays and take a
+  cumulative sum along the days, so the work runs in NumPy rather than per interval in Python.
+
+Both produce the same result; `VECTORIZE_MIN_CELLS` picks between them.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from itertools import groupby
+
+import numpy as np
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.contrib.postgres.expressions import ArraySubquery
+from django.db.models import OuterRef, Q, Value
+
+from .models import ArchivedProjectAssignment
+
+# Above this many row-days, the day-bucket arrays beat the sweep.
+VECTORIZE_MIN_CELLS = 20_000
+
+MAX_RANGE_DAYS = 366
+
+
+def load_assignments(employees, start, end):
+    """
+    Returns `(employee_id, project_start, project_end)` rows for the projects overlapping
+    `start`..`end` of each employee in `employees`, with None dates for those without any.
+    """
+    overlapping = Q(projects__start_date__lte=end, projects__end_date__gte=start)
+    archived = ArchivedProjectAssignment.objects.filter(
+        employee=OuterRef('pk'), project__start_date__lte=end, project__end_date__gte=start,
+    ).order_by('project_id')
+    # One row per employee, its overlapping projects aggregated in matching order, so the
+    # assignments outside the range never leave the database. Archived projects come from
+    # correlated subqueries, as a second join would multiply the aggregated rows.
+    employees = employees.annotate(
+        project_starts=ArrayAgg('projects__start_date', filter=overlapping, ordering='projects__id', default=Value([])),
+        project_ends=ArrayAgg('projects__end_date', filter=overlapping, ordering='projects__id', default=Value([])),
+        archived_starts=ArraySubquery(archived.values('project__start_date')),
+        archived_ends=ArraySubquery(archived.values('project__end_date')),
+    ).order_by('pk').values_list('pk', 'project_starts', 'project_ends', 'archived_starts', 'archived_ends')
+    for employee_id, project_starts, project_ends, archived_starts, archived_ends in employees:
+        if not project_starts and not archived_starts:
+            yield employee_id, None, None
+        for project_start, project_end in zip(project_starts + archived_starts, project_ends + archived_ends):
+            yield employee_id, project_start, project_end
+
+
+def _intervals(rows, start, days):
+    """Groups rows into `{employee_id: [(first_day, last_day), ...]}`, as offsets clipped to the range."""
+    intervals = defaultdict(list)
+    for employee_id, project_start, project_end in rows:
+        employee_intervals = intervals[employee_id]
+        if project_start is None:
+            continue
+        first, last = max((project_start - start).days, 0), min((project_end - start).days, days - 1)
+        if first <= last:
+            employee_intervals.append((first, last))
+    return intervals
+
+
+def _sweep(intervals, days):
+    """Returns the `(first_day, last_day, projects)` segments of one employee, covering every day."""
+    events = sorted([(first, 1) for first, _ in intervals] + [(last + 1, -1) for _, last in intervals])
+    segments, load, segment_first = [], 0, 0
+    for day, changes in groupby(events, key=lambda event: event[0]):
+        if day >= days:
+            break
+        new_load = load + sum(change for _, change in changes)
+        # Projects ending the day before others start leave the load, and so the segment, unchanged.
+        if new_load != load:
+            if day > segment_first:
+                segments.append((segment_first, day - 1, load))
+            segment_first, load = day, new_load
+    segments.append((segment_first, days - 1, load))
+    return segments
+
+
+def _allocation(employee_id, peak, overallocated, free, segments, start, timeline):
+    allocation = {'employee': employee_id, 'peak_projects': peak, 'overallocated_days': overallocated, 'free_days': free}
+    if timeline:
+        allocation['timeline'] = [
+            {'start': start + timedelta(days=first), 'end': start + timedelta(days=last), 'projects': projects}
+            for first, last, projects in segments if projects
+        ]
+    return allocation
+
+
+def _sweep_all(intervals, start, days, capacity, timeline):
+    allocations = []
+    for employee_id, employee_intervals in intervals.items():
+        segments = _sweep(employee_intervals, days)
+        allocations.append(_allocation(
+            employee_id,
+            max(projects for _, _, projects in segments),
+            sum(last - first + 1 for first, last, projects in segments if projects > capacity),
+            sum(last - first + 1 for first, last, projects in segments if not projects),
+            segments, start, timeline,
+        ))
+    return allocations
+
+
+def _segments(load, days):
+    """Returns the `(row, first_day, last_day, projects)` segments of every row of `load`."""
+    # A segment starts on the first day of every row and wherever the load changes.
+    rows, firsts = np.diff(load, axis=1, prepend=load[:, :1] - 1).nonzero()
+    following_rows = np.append(rows[1:], -1)
+    lasts = np.where(following_rows == rows, np.append(firsts[1:], days) - 1, days - 1)
+    return zip(rows.tolist(), firsts.tolist(), lasts.tolist(), load[rows, firsts].tolist())
+
+
+def _vectorized_all(rows, start, days, capacity, timeline):
+    employee_ids, project_starts, project_ends = (list(column) for column in zip(*rows)) if rows else ([], [], [])
+    employee_ids, employee_rows = np.unique(np.array(employee_ids, dtype=np.int64), return_inverse=True)
+    # Ordinals convert far faster than dates to datetime64; employees without projects have None dates.
+    dated = np.array([project_start is not None for project_start in project_starts], dtype=bool)
+    origin = start.toordinal()
+    firsts = np.array([day.toordinal() - origin for day in project_starts if day is not None], dtype=np.intp)
+    lasts = np.array([day.toordinal() - origin for day in project_ends if day is not None], dtype=np.intp)
+    firsts, lasts = np.maximum(firsts, 0), np.minimum(lasts, days - 1)
+    overlapping = firsts <= lasts
+    employee_rows, firsts, lasts = employee_rows[dated][overlapping], firsts[overlapping], lasts[overlapping]
+
+    # Each project adds one from its first day and removes it after its last; summing along
+    # the days turns these differences into the number of concurrent projects per day.
+    # `bincount` over the flattened cells is the unbuffered `np.add.at`, only much faster.
+    width = days + 1
+    cells = len(employee_ids) * width
+    difference = (
+        np.bincount(employee_rows * width + firsts, minlength=cells)
+        - np.bincount(employee_rows * width + lasts + 1, minlength=cells)
+    ).reshape(len(employee_ids), width)
+    load = np.cumsum(difference[:, :days], axis=1, dtype=np.int32)
+
+    segments = defaultdict(list)
+    if timeline:
+        for row, first, last, projects in _segments(load, days):
+            segments[row].append((first, last, projects))
+    peaks = load.max(axis=1).tolist()
+    overallocated = (load > capacity).sum(axis=1).tolist()
+    free = (load == 0).sum(axis=1).tolist()
+    return [
+        _allocation(employee_id, peaks[row], overallocated[row], free[row], segments[row], start, timeline)
+        for row, employee_id in enumerate(employee_ids.tolist())
+    ]
+
+
+def allocate(rows, start, end, capacity=1, timeline=False, engine=None):
+    """
+    Summarises the allocation of each employee in `rows` (as returned by `load_assignments`)
+    from `start` to `end`: the peak number of concurrent projects, the days spent on more than
+    `capacity` projects and the days free of any. `timeline` adds the busy periods.
+    `engine` forces 'sweep' or 'numpy'; by default it depends on the size of the input.
+    """
+    days = (end - start).days + 1
+    rows = list(rows)
+    if engine is None:
+        engine = 'numpy' if len(rows) * days >= VECTORIZE_MIN_CELLS else 'sweep'
+    if engine == 'numpy':
+        return _vectorized_all(rows, start, days, capacity, timeline)
+    return _sweep_all(_intervals(rows, start, days), start, days, capacity, timeline)
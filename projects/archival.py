@@ -0,0 +1,43 @@
+"""
+Moves projects that ended long ago, with their assignments, to `ArchivedProject`.
+See `companyManagementSystem.archive`.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import DateTimeField, Value
+from django.utils import timezone
+
+from companyManagementSystem.archive import ARCHIVE_BATCH_SIZE, copy_rows, delete_rows
+from .models import ArchivedProject, ArchivedProjectAssignment, Project
+
+# Projects stay in the hot table this long after their end date.
+ARCHIVE_AFTER_DAYS = 90
+
+PROJECT_FIELDS = (
+    'id', 'name', 'description', 'start_date', 'end_date', 'company', 'department', 'created_at', 'updated_at',
+)
+
+
+def archive_projects(before=None, batch_size=ARCHIVE_BATCH_SIZE):
+    """
+    Moves the projects that ended before `before` (`ARCHIVE_AFTER_DAYS` ago by default) to the
+    archive, `batch_size` per transaction. Yields the number of projects moved by each batch.
+    """
+    before = before or timezone.localdate() - timedelta(days=ARCHIVE_AFTER_DAYS)
+    through = Project.assigned_employees.through
+    while True:
+        with transaction.atomic():
+            # Projects being edited are skipped and picked up by a later run.
+            ids = list(
+                Project.objects.ended_before(before).order_by('pk').select_for_update(skip_locked=True)
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if not ids:
+                return
+            projects = Project.objects.filter(pk__in=ids).annotate(archived_at=Value(timezone.now(), DateTimeField()))
+            copy_rows(projects, ArchivedProject, (*PROJECT_FIELDS, 'archived_at'))
+            copy_rows(through.objects.filter(project_id__in=ids), ArchivedProjectAssignment, ('project', 'employee'))
+            through.objects.filter(project_id__in=ids).delete()
+            delete_rows(Project, ids)
+        yield len(ids)
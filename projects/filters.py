@@ -0,0 +1,44 @@
+from rest_framework.filters import BaseFilterBackend
+
+from .serializers import ProjectActivityQuerySerializer
+
+
+class ProjectActivityFilter(BaseFilterBackend):
+    """
+    Filters projects by the days they run:
+
+    - `?active_on=` keeps the projects running on that day.
+    - `?overlaps=start,end` keeps those running on at least one day of the range.
+
+    Both compare the project's period with the `daterange` GiST index, and apply on top of
+    the role scoping of `get_queryset`.
+    """
+
+    @staticmethod
+    def earliest_day(request):
+        """The earliest day the date filters ask about, or None without (valid) date filters."""
+        params = ProjectActivityQuerySerializer(data=request.query_params)
+        if not params.is_valid():
+            return None
+        days = [params.validated_data[name] for name in ('active_on',) if name in params.validated_data]
+        if 'overlaps' in params.validated_data:
+            days.append(params.validated_data['overlaps'][0])
+        return min(days, default=None)
+
+    def filter_queryset(self, request, queryset, view):
+        params = ProjectActivityQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        if 'active_on' in params.validated_data:
+            queryset = queryset.active_on(params.validated_data['active_on'])
+        if 'overlaps' in params.validated_data:
+            queryset = queryset.overlapping(*params.validated_data['overlaps'])
+        return queryset
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {'name': name, 'required': False, 'in': 'query', 'description': description, 'schema': {'type': 'string'}}
+            for name, description in (
+                ('active_on', 'Only projects running on this date (YYYY-MM-DD).'),
+                ('overlaps', 'Only projects running on at least one day of `start,end` (two YYYY-MM-DD dates).'),
+            )
+        ]
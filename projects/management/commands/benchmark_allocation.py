@@ -0,0 +1,103 @@
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from organizations.models import Company, Department, Employee
+from projects.allocation import allocate, load_assignments
+from projects.models import Project
+from users.models import User
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures the allocation report of one department: loading its assignments, then "
+        "computing the timelines with the interval sweep and with the NumPy day buckets. "
+        "Inserts the employees, projects and assignments in a few statements and rolls them back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employees', type=int, default=10_000)
+        parser.add_argument('--projects', type=int, default=5_000)
+        parser.add_argument('--assignees', type=int, default=20, help='Employees assigned to each project.')
+        parser.add_argument('--days', type=int, default=92, help='Length of the reported range.')
+        parser.add_argument('--repeat', type=int, default=3,
+                            help='Runs per measurement; the fastest one is reported.')
+
+    def handle(self, *args, **options):
+        start = date(2026, 1, 1)
+        end = start + timedelta(days=options['days'] - 1)
+        try:
+            with transaction.atomic():
+                self.stderr.write(f"Inserting {options['employees']} employees and {options['projects']} projects...")
+                company = Company.objects.create(name='Benchmark')
+                department = Department.objects.create(name='Benchmark', company=company)
+                self._insert(company, department, start, options)
+
+                employees = Employee.objects.filter(department=department)
+                load = self._measure(options['repeat'], lambda: list(load_assignments(employees, start, end)))
+                rows = list(load_assignments(employees, start, end))
+                self.stdout.write(f'{len(rows)} rows loaded in {load:.1f} ms')
+                for timeline in (False, True):
+                    for engine in ('sweep', 'numpy'):
+                        elapsed = self._measure(options['repeat'],
+                                                lambda: allocate(rows, start, end, timeline=timeline, engine=engine))
+                        self.stdout.write(f"{engine:<8}{'with timelines' if timeline else 'summary':<16}{elapsed:>10.1f} ms")
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _insert(self, company, department, start, options):
+        employees, projects = options['employees'], options['projects']
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {User._meta.db_table} (password, is_superuser, first_name, last_name, is_staff, '
+                'is_active, date_joined, username, email, role, created_at, updated_at) '
+                "SELECT '', false, '', '', false, true, now(), 'benchmark-' || n, "
+                "'benchmark-' || n || '@example.com', %s, now(), now() FROM generate_series(1, %s) AS n",
+                [User.Role.EMPLOYEE, employees],
+            )
+            cursor.execute(
+                f'INSERT INTO {Employee._meta.db_table} '
+                '(designation, company_id, department_id, user_id, created_at, updated_at) '
+                f"SELECT 'Engineer', %s, %s, id, now(), now() FROM {User._meta.db_table} "
+                "WHERE email LIKE 'benchmark-%%@example.com'",
+                [company.pk, department.pk],
+            )
+            # Projects start anywhere in the year around the range and last up to four months.
+            cursor.execute(
+                f'INSERT INTO {Project._meta.db_table} '
+                '(name, description, start_date, end_date, company_id, department_id, created_at, updated_at) '
+                "SELECT 'Project ' || n, '', first_day, first_day + (random() * 120)::int, %s, %s, now(), now() "
+                'FROM (SELECT n, %s::date + ((random() * 365)::int - 120) AS first_day '
+                '      FROM generate_series(1, %s) AS n) AS dates',
+                [company.pk, department.pk, start, projects],
+            )
+            # Spread each project's assignees over the department with a stride coprime to its size.
+            cursor.execute(
+                f'INSERT INTO {Project.assigned_employees.through._meta.db_table} (project_id, employee_id) '
+                'SELECT p.id, e.id FROM '
+                f'(SELECT id, row_number() OVER (ORDER BY id) AS n FROM {Project._meta.db_table} '
+                ' WHERE department_id = %s) AS p '
+                'CROSS JOIN generate_series(1, %s) AS g '
+                f'JOIN (SELECT id, row_number() OVER (ORDER BY id) - 1 AS n FROM {Employee._meta.db_table} '
+                ' WHERE department_id = %s) AS e ON e.n = (p.n * 7919 + g * 104729) %% %s '
+                'ON CONFLICT DO NOTHING',
+                [department.pk, options['assignees'], department.pk, employees],
+            )
+            for model in (User, Employee, Project, Project.assigned_employees.through):
+                cursor.execute(f'ANALYZE {model._meta.db_table}')
+
+    def _measure(self, repeat, run):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            run()
+            elapsed = (time.perf_counter() - started) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        return best
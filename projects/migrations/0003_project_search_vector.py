@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:19
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # Build the GIN indexes without locking the tables against writes.
+    atomic = False
+
+    dependencies = [
+        ('organizations', '0008_search_vectors'),
+        ('projects', '0002_project_created_at_project_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        AddIndexConcurrently(
+            model_name='project',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='project_search_idx'),
+        ),
+    ]
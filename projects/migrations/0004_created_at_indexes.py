@@ -0,0 +1,25 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:24
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Build the indexes without locking the tables against writes.
+    atomic = False
+
+    dependencies = [
+        ('organizations', '0009_created_at_indexes'),
+        ('projects', '0003_project_search_vector'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='project',
+            index=models.Index(fields=['department', 'created_at', 'id'], name='project_dept_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='project',
+            index=models.Index(fields=['created_at', 'id'], name='project_created_idx'),
+        ),
+    ]
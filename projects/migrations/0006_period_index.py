@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:52
+
+import django.contrib.postgres.fields.ranges
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Build the index without locking the table against writes.
+    atomic = False
+
+    dependencies = [
+        ('organizations', '0010_updated_at_indexes'),
+        ('projects', '0005_updated_at_indexes'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='project',
+            index=django.contrib.postgres.indexes.GistIndex(models.Func(models.F('start_date'), models.F('end_date'), models.Value('[]'), function='daterange', output_field=django.contrib.postgres.fields.ranges.DateRangeField()), name='project_period_idx'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:54
+
+import django.contrib.postgres.fields.ranges
+import django.contrib.postgres.indexes
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0010_updated_at_indexes'),
+        ('projects', '0006_period_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedProject',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=255)),
+                ('description', models.TextField(blank=True)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField()),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_projects', to='organizations.company')),
+                ('department', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_projects', to='organizations.department')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedProjectAssignment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='organizations.employee')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='projects.archivedproject')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='archivedproject',
+            name='assigned_employees',
+            field=models.ManyToManyField(blank=True, related_name='archived_projects', through='projects.ArchivedProjectAssignment', to='organizations.employee'),
+        ),
+        migrations.AddConstraint(
+            model_name='archivedprojectassignment',
+            constraint=models.UniqueConstraint(fields=('project', 'employee'), name='archived_assignment_unique'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedproject',
+            index=models.Index(fields=['department', 'created_at', 'id'], name='archived_project_dept_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedproject',
+            index=models.Index(fields=['created_at', 'id'], name='archived_project_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedproject',
+            index=django.contrib.postgres.indexes.GistIndex(models.Func(models.F('start_date'), models.F('end_date'), models.Value('[]'), function='daterange', output_field=django.contrib.postgres.fields.ranges.DateRangeField()), name='archived_project_period_idx'),
+        ),
+    ]
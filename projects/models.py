@@ -1,7 +1,38 @@
+from django.contrib.postgres.fields import DateRangeField
+from django.contrib.postgres.indexes import GinIndex, GistIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.backends.postgresql.psycopg_any import DateRange
+from django.db.models import F, Func, Value
 from organizations.models import Employee, Department, Company
 from companyManagementSystem.models import TimeBaseModel
 
+def project_period():
+    """The days a project runs, `start_date` to `end_date` inclusive, as a `daterange`."""
+    return Func(F('start_date'), F('end_date'), Value('[]'), function='daterange', output_field=DateRangeField())
+
+
+class ProjectQuerySet(models.QuerySet):
+    """
+    Date-range helpers. Both compare the project's `project_period()` with the given days, the
+    expression `project_period_idx` indexes, so they are answered from it instead of a scan.
+    They answer for the table they are called on: `ArchivedProject.objects` has them too, and
+    the project list and allocation report read both tables for days in the past.
+    """
+
+    def active_on(self, day):
+        """Projects running on `day`."""
+        return self.alias(period=project_period()).filter(period__contains=day)
+
+    def overlapping(self, start, end):
+        """Projects running on at least one day from `start` to `end`, inclusive."""
+        return self.alias(period=project_period()).filter(period__overlap=DateRange(start, end, '[]'))
+
+    def ended_before(self, day):
+        """Projects whose last day is before `day`."""
+        return self.alias(period=project_period()).filter(period__fully_lt=DateRange(day, None, '[)'))
+
+
 class Project(TimeBaseModel, models.Model):
     name = models.CharField(max_length=255)
     description = models.TextField(blank=True)
@@ -13,5 +44,65 @@ class Project(TimeBaseModel, models.Model):
 
     assigned_employees = models.ManyToManyField(Employee, related_name='projects', blank=True)
 
+    # Maintained by the `search` app.
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = ProjectQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['department', 'created_at', 'id'], name='project_dept_created_idx'),
+            models.Index(fields=['created_at', 'id'], name='project_created_idx'),
+            models.Index(fields=['updated_at'], name='project_updated_idx'),
+            GinIndex(fields=['search_vector'], name='project_search_idx'),
+            GistIndex(project_period(), name='project_period_idx'),
+        ]
+
     def __str__(self):
         return self.name
+
+
+class ArchivedProject(models.Model):
+    """
+    A project that ended long ago, moved out of the `Project` table by `projects.archival`.
+    Keeps the project's id and fields, so the same scoping, filters and serializer apply.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    name = models.CharField(max_length=255)
+    description = models.TextField(blank=True)
+    start_date = models.DateField()
+    end_date = models.DateField()
+
+    company = models.ForeignKey(Company, related_name='archived_projects', on_delete=models.CASCADE)
+    department = models.ForeignKey(Department, related_name='archived_projects', on_delete=models.CASCADE)
+
+    assigned_employees = models.ManyToManyField(
+        Employee, related_name='archived_projects', blank=True, through='ArchivedProjectAssignment',
+    )
+
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField()
+
+    objects = ProjectQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['department', 'created_at', 'id'], name='archived_project_dept_idx'),
+            models.Index(fields=['created_at', 'id'], name='archived_project_created_idx'),
+            GistIndex(project_period(), name='archived_project_period_idx'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class ArchivedProjectAssignment(models.Model):
+    """An assignment of an archived project, with the columns of `Project.assigned_employees.through`."""
+    project = models.ForeignKey(ArchivedProject, on_delete=models.CASCADE)
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['project', 'employee'], name='archived_assignment_unique'),
+        ]
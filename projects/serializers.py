@@ -1,11 +1,17 @@
 from rest_framework import serializers
+
+from companyManagementSystem.fieldsets import SparseFieldsetsMixin
+from companyManagementSystem.relations import BulkPrimaryKeyRelatedField
+from .allocation import MAX_RANGE_DAYS
 from .models import Project
 from organizations.models import Employee
 
-class ProjectSerializer(serializers.ModelSerializer):
+class ProjectSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     """Serializer for the Project model."""
+    # Submitted assignees are resolved with one query, however many there are.
+    serializer_related_field = BulkPrimaryKeyRelatedField
 
-    class EmployeeBriefSerializer(serializers.ModelSerializer):
+    class EmployeeBriefSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
         full_name = serializers.CharField(source='user.get_full_name', read_only=True)
         class Meta:
             model = Employee
@@ -23,3 +29,40 @@ class ProjectSerializer(serializers.ModelSerializer):
         extra_kwargs = {
             'assigned_employees': {'write_only': True, 'queryset': Employee.objects.all()}
         }
+
+
+class AssignmentSerializer(serializers.Serializer):
+    """The employees to add to, remove from or assign to a project."""
+    employees = BulkPrimaryKeyRelatedField(queryset=Employee.objects.only('pk'), many=True, allow_empty=True)
+
+
+class ProjectActivityQuerySerializer(serializers.Serializer):
+    """Validates the date query parameters of the project list."""
+    active_on = serializers.DateField(required=False)
+    overlaps = serializers.CharField(required=False)
+
+    def validate_overlaps(self, value):
+        days = value.split(',')
+        if len(days) != 2:
+            raise serializers.ValidationError("Expected two dates: `start,end`.")
+        start, end = (serializers.DateField().to_internal_value(day.strip()) for day in days)
+        if end < start:
+            raise serializers.ValidationError("`end` must not be before `start`.")
+        return start, end
+
+
+class AllocationQuerySerializer(serializers.Serializer):
+    start = serializers.DateField()
+    end = serializers.DateField()
+    department = serializers.IntegerField(required=False)
+    # Concurrent projects an employee can take before counting as over-allocated.
+    capacity = serializers.IntegerField(min_value=1, default=1)
+    status = serializers.ChoiceField(choices=['all', 'overallocated', 'free'], default='all')
+    timeline = serializers.BooleanField(default=False)
+
+    def validate(self, data):
+        if data['end'] < data['start']:
+            raise serializers.ValidationError("`end` must not be before `start`.")
+        if (data['end'] - data['start']).days >= MAX_RANGE_DAYS:
+            raise serializers.ValidationError(f"The range may span at most {MAX_RANGE_DAYS} days.")
+        return data
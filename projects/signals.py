@@ -1,7 +1,8 @@
-from django.db.models import F
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from .models import Project
+from organizations import counters, stats
+from organizations.models import Company, Department
+from .models import ArchivedProject, Project
 
 @receiver(post_save, sender=Project)
 def increment_project_count(sender, instance, created, **kwargs):
@@ -10,18 +11,31 @@ def increment_project_count(sender, instance, created, **kwargs):
     related Company and Department.
     """
     if created:
-        instance.company.number_of_projects = F('number_of_projects') + 1
-        instance.department.number_of_projects = F('number_of_projects') + 1
-        instance.company.save(update_fields=['number_of_projects'])
-        instance.department.save(update_fields=['number_of_projects'])
+        counters.record(
+            counters.delta(Company, instance.company_id, 'number_of_projects', 1),
+            counters.delta(Department, instance.department_id, 'number_of_projects', 1),
+            *stats.project_deltas(instance.company_id, instance.department_id, instance.end_date, 1),
+        )
+    elif instance.previous_value('department') is not None and any(
+        instance.has_changed(field) for field in ('company', 'department', 'end_date')
+    ):
+        # Moves the project's cell in the analytics rollups; the counters follow the
+        # original behaviour of only counting creations and deletions.
+        counters.record(
+            *stats.project_deltas(instance.previous_value('company'), instance.previous_value('department'),
+                                  instance.previous_value('end_date'), -1),
+            *stats.project_deltas(instance.company_id, instance.department_id, instance.end_date, 1),
+        )
 
 @receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=ArchivedProject)
 def decrement_project_count(sender, instance, **kwargs):
     """
     When a Project is deleted, decrement the project counters on the
-    related Company and Department.
+    related Company and Department. Archived projects are counted too.
     """
-    instance.company.number_of_projects = F('number_of_projects') - 1
-    instance.department.number_of_projects = F('number_of_projects') - 1
-    instance.company.save(update_fields=['number_of_projects'])
-    instance.department.save(update_fields=['number_of_projects'])
+    counters.record(
+        counters.delta(Company, instance.company_id, 'number_of_projects', -1),
+        counters.delta(Department, instance.department_id, 'number_of_projects', -1),
+        *stats.project_deltas(instance.company_id, instance.department_id, instance.end_date, -1),
+    )
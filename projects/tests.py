@@ -1,3 +1,301 @@
-from django.test import TestCase
+from datetime import date
 
-# Create your tests here.
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from companyManagementSystem.testing import ROWS_PER_PAGE, QueryBudgetTestCase
+from organizations.reconcile import CounterReconciler
+from .allocation import allocate
+from .archival import archive_projects
+from .models import ArchivedProject, ArchivedProjectAssignment, Project
+from .views import ProjectViewSet
+
+
+class ProjectQueryBudgetTests(QueryBudgetTestCase):
+    def setUp(self):
+        self.authenticate(self.admin)
+        self.project = self.org['projects'][0]
+
+    def project_payload(self, name):
+        return {
+            'name': name,
+            'description': 'Description',
+            'start_date': '2025-01-01',
+            'end_date': '2025-06-30',
+            'company': self.org['company'].pk,
+            'department': self.org['departments'][0].pk,
+            'assigned_employees': [employee.pk for employee in self.org['employees'][:5]],
+        }
+
+    def test_list(self):
+        response = self.assertWithinQueryBudget(ProjectViewSet, 'list', 'get', reverse('project-list'))
+        self.assertEqual(len(response.data['results']), 10)
+
+    def test_list_as_manager(self):
+        self.authenticate(self.manager)
+        response = self.assertWithinQueryBudget(ProjectViewSet, 'list', 'get', reverse('project-list'))
+        self.assertEqual(len(response.data['results']), 10)
+
+    def test_list_as_employee(self):
+        self.authenticate(self.employee)
+        response = self.assertWithinQueryBudget(ProjectViewSet, 'list', 'get', reverse('project-list'))
+        self.assertEqual(len(response.data['results']), 10)
+
+    def test_retrieve(self):
+        url = reverse('project-detail', args=[self.project.pk])
+        response = self.assertWithinQueryBudget(ProjectViewSet, 'retrieve', 'get', url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_create(self):
+        url = reverse('project-list')
+        response = self.assertWithinQueryBudget(ProjectViewSet, 'create', 'post', url, self.project_payload('New'))
+        self.assertEqual(response.status_code, 201)
+
+    def test_update(self):
+        url = reverse('project-detail', args=[self.project.pk])
+        response = self.assertWithinQueryBudget(ProjectViewSet, 'update', 'put', url, self.project_payload('Renamed'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_partial_update(self):
+        url = reverse('project-detail', args=[self.project.pk])
+        response = self.assertWithinQueryBudget(ProjectViewSet, 'partial_update', 'patch', url, {'name': 'Renamed'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_destroy(self):
+        url = reverse('project-detail', args=[self.project.pk])
+        response = self.assertWithinQueryBudget(ProjectViewSet, 'destroy', 'delete', url)
+        self.assertEqual(response.status_code, 204)
+
+
+class ProjectActivityFilterTests(QueryBudgetTestCase):
+    # The seeded projects run through 2024; these two start before and after it.
+    def setUp(self):
+        self.authenticate(self.admin)
+        department = self.org['departments'][0]
+        self.earlier, self.later = (
+            Project.objects.create(
+                name=name, company=self.org['company'], department=department, start_date=start, end_date=end,
+            )
+            for name, start, end in (('Earlier', date(2023, 6, 1), date(2023, 12, 31)),
+                                     ('Later', date(2025, 1, 1), date(2025, 3, 31)))
+        )
+
+    def listed(self, **params):
+        response = self.assertWithinQueryBudget(ProjectViewSet, 'list', 'get', reverse('project-list'),
+                                                {'page_size': 100, **params})
+        self.assertEqual(response.status_code, 200)
+        return {project['id'] for project in response.data['results']}
+
+    def test_active_on(self):
+        self.assertEqual(self.listed(active_on='2023-12-31'), {self.earlier.pk})
+        # Both ends of a project are days it runs on.
+        self.assertEqual(self.listed(active_on='2025-03-31'), {self.later.pk})
+        self.assertEqual(len(self.listed(active_on='2024-06-01')), len(self.org['projects']))
+
+    def test_overlaps(self):
+        self.assertEqual(self.listed(overlaps='2023-01-01,2023-06-01'), {self.earlier.pk})
+        self.assertEqual(self.listed(overlaps='2024-12-31,2025-01-01'),
+                         {project.pk for project in self.org['projects']} | {self.later.pk})
+
+    def test_combines_with_scoping(self):
+        self.authenticate(self.manager)
+        self.assertEqual(self.listed(active_on='2024-06-01'),
+                         {project.pk for project in self.org['projects'] if project.department == self.manager.employee.department})
+        self.authenticate(self.employee)
+        self.assertEqual(self.listed(overlaps='2023-01-01,2023-12-31'), set())
+
+    def test_invalid_dates(self):
+        for params in ({'active_on': 'soon'}, {'overlaps': '2024-01-01'}, {'overlaps': '2024-02-01,2024-01-01'}):
+            self.assertEqual(self.client.get(reverse('project-list'), params).status_code, 400)
+
+class AssignmentTests(QueryBudgetTestCase):
+    def setUp(self):
+        self.authenticate(self.admin)
+        self.project = self.org['projects'][0]
+        self.url = reverse('project-assignments', args=[self.project.pk])
+        self.assigned = list(self.project.assigned_employees.values_list('pk', flat=True))
+        self.others = [employee.pk for employee in self.org['employees'] if employee.pk not in self.assigned]
+
+    def change(self, method, employees):
+        return self.assertWithinQueryBudget(ProjectViewSet, 'assignments', method, self.url, {'employees': employees})
+
+    def assertAssigned(self, employees):
+        self.assertEqual(sorted(self.project.assigned_employees.values_list('pk', flat=True)), sorted(employees))
+
+    def test_add(self):
+        response = self.change('post', [self.assigned[0], *self.others[:2]])
+        self.assertEqual(response.data['added'], sorted(self.others[:2]))
+        self.assertAssigned(self.assigned + self.others[:2])
+
+    def test_remove(self):
+        response = self.change('delete', [self.assigned[0], self.others[0]])
+        self.assertEqual(response.data['removed'], [self.assigned[0]])
+        self.assertAssigned(self.assigned[1:])
+
+    def test_replace(self):
+        response = self.change('put', [self.assigned[0], self.others[0]])
+        self.assertEqual((response.data['added'], response.data['removed']), ([self.others[0]], sorted(self.assigned[1:])))
+        self.assertAssigned([self.assigned[0], self.others[0]])
+
+    def test_queries_do_not_grow_with_the_batch(self):
+        def queries(employees):
+            with CaptureQueriesContext(connection) as captured:
+                self.change('put', employees)
+            return len(captured)
+
+        self.assertEqual(queries(self.others[:2]), queries(self.others[2:]))
+
+    def test_missing_employees_are_reported_together(self):
+        response = self.change('post', [self.others[0], 0, -1])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('0, -1', str(response.data['employees']))
+        self.assertAssigned(self.assigned)
+
+    def test_managers_and_admins_only(self):
+        self.authenticate(self.employee)
+        self.assertEqual(self.client.post(self.url, {'employees': []}, format='json').status_code, 403)
+
+
+class AllocationTests(QueryBudgetTestCase):
+    # Every seeded project runs through 2024 with the first three employees of its department.
+    def setUp(self):
+        self.authenticate(self.admin)
+        # The report below covers the first department.
+        self.busy = {employee.pk for employee in self.org['employees'][:3]}
+
+    def report(self, **params):
+        params = {'start': '2024-03-01', 'end': '2024-03-31', 'department': self.org['departments'][0].pk, **params}
+        params = {name: value for name, value in params.items() if value is not None}
+        return self.assertWithinQueryBudget(ProjectViewSet, 'allocation', 'get', reverse('project-allocation'), params)
+
+    def test_summary(self):
+        response = self.report()
+        self.assertEqual(response.status_code, 200)
+        allocations = {allocation['employee']: allocation for allocation in response.data['employees']}
+        self.assertEqual(len(allocations), ROWS_PER_PAGE + 1)  # And the manager.
+        busy = allocations[self.org['employees'][0].pk]
+        self.assertEqual((busy['peak_projects'], busy['overallocated_days'], busy['free_days']), (12, 31, 0))
+        free = allocations[self.org['employees'][3].pk]
+        self.assertEqual((free['peak_projects'], free['overallocated_days'], free['free_days']), (0, 0, 31))
+
+    def test_status_filters(self):
+        overallocated = self.report(status='overallocated', capacity=11).data['employees']
+        self.assertEqual({allocation['employee'] for allocation in overallocated}, self.busy)
+        self.assertEqual(self.report(status='overallocated', capacity=12).data['employees'], [])
+        free = self.report(status='free').data['employees']
+        self.assertNotIn(self.org['employees'][0].pk, {allocation['employee'] for allocation in free})
+
+    def test_timeline_is_clipped_to_the_range(self):
+        allocation = self.report(timeline='true', department=self.org['departments'][1].pk).data['employees'][0]
+        self.assertEqual(allocation['timeline'], [{'start': date(2024, 3, 1), 'end': date(2024, 3, 31), 'projects': 12}])
+
+    def test_admins_must_pick_a_department(self):
+        response = self.report(department=None)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('department', response.data)
+
+    def test_managers_see_their_department(self):
+        self.authenticate(self.manager)
+        employees = {allocation['employee'] for allocation in self.report(department=None).data['employees']}
+        department = self.org['departments'][0]
+        self.assertTrue(employees)
+        self.assertEqual(employees, set(department.employees.values_list('pk', flat=True)))
+
+    def test_invalid_range(self):
+        self.assertEqual(self.report(start='2024-03-31', end='2024-03-01').status_code, 400)
+        self.assertEqual(self.report(end='2025-12-31').status_code, 400)
+
+    def test_engines_agree(self):
+        start, end = date(2024, 1, 1), date(2024, 1, 20)
+        rows = [
+            (1, date(2023, 12, 1), date(2024, 1, 5)), (1, date(2024, 1, 3), date(2024, 1, 10)),
+            (1, date(2024, 1, 11), date(2024, 2, 1)), (2, None, None), (3, date(2024, 2, 1), date(2024, 3, 1)),
+        ]
+        for timeline in (False, True):
+            self.assertEqual(allocate(rows, start, end, timeline=timeline, engine='sweep'),
+                             allocate(rows, start, end, timeline=timeline, engine='numpy'))
+
+
+class ArchiveTests(QueryBudgetTestCase):
+    # The seeded projects ended in 2024; the first six are extended so they stay in the hot table.
+    def setUp(self):
+        self.authenticate(self.admin)
+        self.current = [project.pk for project in self.org['projects'][:6]]
+        Project.objects.filter(pk__in=self.current).update(end_date=date(2030, 1, 1))
+        self.archived = [project.pk for project in self.org['projects'][6:]]
+
+    def archive(self):
+        return list(archive_projects(batch_size=5))
+
+    def listed(self, **params):
+        ids, url, params = [], reverse('project-list'), {'include_archived': 'true', **params}
+        while url:
+            response = self.assertWithinQueryBudget(ProjectViewSet, 'list', 'get', url, params)
+            ids += [project['id'] for project in response.data['results']]
+            url, params = response.data['next'], None
+        return ids
+
+    def test_moves_projects_with_their_assignments(self):
+        self.assertEqual(self.archive(), [5, 5, 5, 3])
+        self.assertEqual(sorted(Project.objects.values_list('pk', flat=True)), sorted(self.current))
+        self.assertEqual(sorted(ArchivedProject.objects.values_list('pk', flat=True)), sorted(self.archived))
+        self.assertEqual(ArchivedProjectAssignment.objects.count(), 3 * len(self.archived))
+        self.assertFalse(Project.assigned_employees.through.objects.filter(project_id__in=self.archived).exists())
+        self.assertEqual(self.archive(), [])
+
+    def test_counters_keep_counting_archived_projects(self):
+        self.archive()
+        self.org['company'].refresh_from_db()
+        self.assertEqual(self.org['company'].number_of_projects, len(self.org['projects']))
+        self.assertEqual(list(CounterReconciler(dry_run=True).run()), [])
+
+    def test_list_merges_the_archive(self):
+        self.archive()
+        listed = self.listed(page_size=5)
+        self.assertEqual(len(listed), len(set(listed)))
+        self.assertEqual(set(listed), set(self.current + self.archived))
+        self.assertEqual(len(self.client.get(reverse('project-list'), {'page_size': 100}).data['results']), 6)
+
+    def test_date_filters_in_the_past_read_the_archive(self):
+        self.archive()
+        url = reverse('project-list')
+        response = self.assertWithinQueryBudget(ProjectViewSet, 'list', 'get', url, {'active_on': '2024-06-01', 'page_size': 100})
+        self.assertEqual({project['id'] for project in response.data['results']}, set(self.current + self.archived))
+        response = self.client.get(url, {'overlaps': '2024-12-01,2030-01-01', 'page_size': 100})
+        self.assertEqual({project['id'] for project in response.data['results']}, set(self.current + self.archived))
+        # Archived projects have all ended, so a range from today on only reads the hot table.
+        with self.assertNumQueries(2):
+            response = self.client.get(url, {'overlaps': f'{timezone.localdate()},2030-01-01', 'page_size': 100})
+        self.assertEqual({project['id'] for project in response.data['results']}, set(self.current))
+
+    def test_allocation_counts_archived_projects(self):
+        department = self.org['departments'][0]
+        params = {'start': '2024-03-01', 'end': '2024-03-31', 'department': department.pk}
+        before = self.client.get(reverse('project-allocation'), params).data['employees']
+        self.archive()
+        response = self.assertWithinQueryBudget(ProjectViewSet, 'allocation', 'get', reverse('project-allocation'), params)
+        self.assertEqual(response.data['employees'], before)
+        busy = response.data['employees'][0]
+        self.assertEqual((busy['employee'], busy['peak_projects']), (self.org['employees'][0].pk, 12))
+
+    def test_list_scopes_the_archive(self):
+        self.archive()
+        self.authenticate(self.manager)
+        department = self.manager.employee.department_id
+        expected = {project.pk for project in self.org['projects'] if project.department_id == department}
+        self.assertEqual(set(self.listed(page_size=100)), expected)
+
+    def test_retrieve_falls_back_to_the_archive(self):
+        self.archive()
+        url = reverse('project-detail', args=[self.archived[0]])
+        self.assertEqual(self.client.get(url).status_code, 404)
+        response = self.assertWithinQueryBudget(ProjectViewSet, 'retrieve', 'get', url, {'include_archived': 'true'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['assigned_employees_details']), 3)
+
+    def test_archived_projects_are_read_only(self):
+        self.archive()
+        url = reverse('project-detail', args=[self.archived[0]]) + '?include_archived=true'
+        self.assertEqual(self.client.patch(url, {'name': 'Revived'}, format='json').status_code, 404)
\ No newline at end of file
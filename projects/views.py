@@ -1,25 +1,88 @@
-
+from django.contrib.postgres.expressions import ArraySubquery
+from django.db import transaction
+from django.db.models import OuterRef, Prefetch, prefetch_related_objects
+from django.utils import timezone
 from rest_framework import viewsets, permissions
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
 
+from companyManagementSystem.archive import ArchiveMixin
+from companyManagementSystem.exports import ExportMixin
+from companyManagementSystem.fieldsets import SparseQuerysetMixin
+from companyManagementSystem.mixins import ActionQuerysetMixin
+from organizations.models import Employee
 from users.models import User
-from .models import Project
-from .serializers import ProjectSerializer
+from users.scope import get_scope
+from .allocation import allocate, load_assignments
+from .filters import ProjectActivityFilter
+from .models import ArchivedProject, Project
+from .serializers import AllocationQuerySerializer, AssignmentSerializer, ProjectSerializer
 from users.permissions import IsManager, IsAdmin
 
-class ProjectViewSet(viewsets.ModelViewSet):
+def assigned_employees_prefetch():
+    """Prefetches assignees with exactly the columns `EmployeeBriefSerializer` renders."""
+    return Prefetch('assigned_employees', queryset=Employee.objects.select_related('user').only(
+        'id', 'designation', 'user', 'user__username', 'user__email',
+    ))
+
+
+class ProjectViewSet(ExportMixin, SparseQuerysetMixin, ArchiveMixin, ActionQuerysetMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows projects to be viewed or edited.
     Creation, update, and deletion are restricted to Managers and Admins.
+    `?include_archived=true` also lists and retrieves archived projects. Lists filtered by a
+    day before today read the archive anyway: archived projects all ended in the past, and
+    leaving them out would silently drop the answer for any range the archival job has reached.
     """
     queryset = Project.objects.all()
+    action_querysets = {
+        **dict.fromkeys(['list', 'retrieve'], Project.objects.only(
+            'id', 'created_at', 'name', 'description', 'start_date', 'end_date', 'company', 'department',
+        ).prefetch_related(assigned_employees_prefetch())),
+        # Locked, so concurrent changes to the assignments are applied one after the other.
+        'assignments': Project.objects.select_for_update(of=('self',)).only('id'),
+    }
+    archive_queryset = ArchivedProject.objects.only(
+        'id', 'created_at', 'name', 'description', 'start_date', 'end_date', 'company', 'department',
+    ).prefetch_related(assigned_employees_prefetch())
     serializer_class = ProjectSerializer
     permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [ProjectActivityFilter]
+    export_fields = {
+        'id': 'id', 'name': 'name', 'description': 'description', 'start_date': 'start_date',
+        'end_date': 'end_date', 'company': 'company_id', 'department': 'department_id',
+        # A correlated subquery per row keeps the export streaming, unlike a grouped join.
+        'assigned_employees': ArraySubquery(
+            Project.assigned_employees.through.objects.filter(project_id=OuterRef('pk'))
+            .order_by('employee_id').values('employee_id')
+        ),
+        'created_at': 'created_at', 'updated_at': 'updated_at',
+    }
+    query_budgets = {
+        # `?include_archived=true` reads the archive too: a second page and its assignees, or a detail lookup.
+        'list': 5, 'retrieve': 3, 'destroy': 9, 'partial_update': 4,
+        # Submitted assignees are resolved with one query, so these do not grow with them either.
+        # Loading the company, department and assignees, saving the project and its search
+        # vector, writing the assignments and rendering the assignees take 8 queries, plus the
+        # project itself on update. The after-commit update of the counters and rollups takes up
+        # to 8 more, in a savepoint, when the end date opens a new rollup cell.
+        'create': 16, 'update': 16, 'assignments': 8,
+        # Every employee in scope is read together with their overlapping projects.
+        'allocation': 1,
+        # Exported rows are streamed after the view returns; this covers the scoping queries.
+        'export': 1,
+    }
+
+    def archive_needed(self):
+        earliest = ProjectActivityFilter.earliest_day(self.request) if self.action == 'list' else None
+        return earliest is not None and earliest < timezone.localdate()
 
     def get_permissions(self):
         """
         Allow any authenticated user to view, but only managers or admins to modify.
         """
-        if self.action in ['create', 'update', 'partial_update', 'destroy']:
+        if self.action in ['create', 'update', 'partial_update', 'destroy', 'assignments', 'allocation']:
             self.permission_classes = [IsManager | IsAdmin]
         return super().get_permissions()
 
@@ -29,18 +92,104 @@ class ProjectViewSet(viewsets.ModelViewSet):
         - Managers see projects in their department.
         - Employees see projects they are assigned to.
         """
-        user = self.request.user
-        if user.role == User.Role.MANAGER:
-            try:
-                manager_department = user.employee.department
-                return Project.objects.filter(department=manager_department)
-            except:
-                return Project.objects.none()
-        elif user.role == User.Role.EMPLOYEE:
-            try:
-                return user.employee.projects.all()
-            except:
-                return Project.objects.none()
+        queryset = super().get_queryset()
+        scope = get_scope(self.request)
+        if scope.role == User.Role.MANAGER:
+            if scope.department_id is None:
+                return queryset.none()
+            return queryset.filter(department_id=scope.department_id)
+        elif scope.role == User.Role.EMPLOYEE:
+            if scope.employee_id is None:
+                return queryset.none()
+            # Filtering on the assignment table alone, without joining the employees.
+            return queryset.filter(assigned_employees=scope.employee_id)
 
         # Admins can see all projects.
-        return super().get_queryset()
+        return queryset
+
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        # Saving the assignments drops any prefetched assignees; load them again in one query.
+        prefetch_related_objects([serializer.instance], assigned_employees_prefetch())
+
+    def update(self, request, *args, **kwargs):
+        # As `UpdateModelMixin.update`, which drops the prefetched assignees after saving and
+        # would then render them with a query per assignee; they are loaded again in one query.
+        partial = kwargs.pop('partial', False)
+        instance = self.get_object()
+        serializer = self.get_serializer(instance, data=request.data, partial=partial)
+        serializer.is_valid(raise_exception=True)
+        self.perform_update(serializer)
+        instance._prefetched_objects_cache = {}
+        prefetch_related_objects([instance], assigned_employees_prefetch())
+        return Response(serializer.data)
+
+    @action(detail=True, methods=['post', 'put', 'delete'])
+    def assignments(self, request, pk=None):
+        """
+        Changes the employees assigned to the project: POST adds `employees`, DELETE removes
+        them and PUT makes them the only assignees. Only the difference with the current
+        assignments is written, with one insert and one delete.
+        """
+        params = AssignmentSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        requested = {employee.pk for employee in params.validated_data['employees']}
+
+        through = Project.assigned_employees.through
+        with transaction.atomic():
+            project = self.get_object()
+            current = set(through.objects.filter(project_id=project.pk).values_list('employee_id', flat=True))
+            if request.method == 'POST':
+                added, removed = requested - current, set()
+            elif request.method == 'DELETE':
+                added, removed = set(), requested & current
+            else:
+                added, removed = requested - current, current - requested
+
+            if added:
+                through.objects.bulk_create([
+                    through(project_id=project.pk, employee_id=employee_id) for employee_id in sorted(added)
+                ])
+            if removed:
+                through.objects.filter(project_id=project.pk, employee_id__in=removed).delete()
+            if added or removed:
+                # Exports sync projects by `updated_at`, which covers their assignees.
+                Project.objects.filter(pk=project.pk).update(updated_at=timezone.now())
+
+        return Response({
+            'added': sorted(added), 'removed': sorted(removed),
+            'assigned_employees': sorted((current | added) - removed),
+        })
+
+    @action(detail=False, methods=['get'])
+    def allocation(self, request):
+        """
+        Reports how many projects each employee runs concurrently between `start` and `end`:
+        the peak, the days over `capacity` and the free days. Managers see their department and
+        admins must pick one with `?department=`; `?status=overallocated` or `free` keeps those
+        over capacity at some point or without any project, and `?timeline=true` adds the busy periods.
+        """
+        params = AllocationQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        start, end = params.validated_data['start'], params.validated_data['end']
+        capacity = params.validated_data['capacity']
+
+        employees = Employee.objects.all()
+        scope = get_scope(request)
+        if scope.role == User.Role.MANAGER:
+            employees = employees.filter(department_id=scope.department_id) if scope.department_id else employees.none()
+        elif 'department' not in params.validated_data:
+            # The report is not paginated, and across every company its day arrays would run to
+            # hundreds of megabytes, so admins report one department at a time.
+            raise ValidationError({'department': ['This field is required for admins.']})
+        if 'department' in params.validated_data:
+            employees = employees.filter(department_id=params.validated_data['department'])
+
+        allocations = allocate(load_assignments(employees, start, end), start, end, capacity,
+                               timeline=params.validated_data['timeline'])
+        status = params.validated_data['status']
+        if status == 'overallocated':
+            allocations = [allocation for allocation in allocations if allocation['peak_projects'] > capacity]
+        elif status == 'free':
+            allocations = [allocation for allocation in allocations if not allocation['peak_projects']]
+        return Response({'start': start, 'end': end, 'capacity': capacity, 'employees': allocations})
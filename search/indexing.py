@@ -0,0 +1,96 @@
+"""
+Maintenance of the `search_vector` columns and the ranked queries over them.
+
+Vectors are computed by the database in a single UPDATE per batch of rows, so a saved row,
+a chunk of imported rows or a whole table is (re)indexed the same way. On databases
+without full-text search the vectors are left empty and `search()` falls back to
+case-insensitive matching over the same fields, ranked by the weights of the fields matched.
+"""
+import re
+from functools import reduce
+from operator import add, and_, or_
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import Case, ExpressionWrapper, F, FloatField, OuterRef, Q, Subquery, Value, When
+
+# The 'simple' configuration does not stem, so names and emails are indexed as written.
+SEARCH_CONFIG = 'simple'
+
+# Indexed fields per model label, with their full-text weights.
+SEARCH_FIELDS = {
+    'organizations.Employee': (('user__username', 'A'), ('user__email', 'A'), ('designation', 'B')),
+    'organizations.Department': (('name', 'A'),),
+    'projects.Project': (('name', 'A'), ('description', 'B')),
+}
+
+# Rank contributed by a match in a field of each weight when falling back to `icontains`.
+FALLBACK_WEIGHTS = {'A': 1.0, 'B': 0.4, 'C': 0.2, 'D': 0.1}
+
+REINDEX_CHUNK_SIZE = 5000
+
+
+def has_full_text_search():
+    return connection.vendor == 'postgresql'
+
+
+def _fields(model):
+    return SEARCH_FIELDS[model._meta.label]
+
+
+def search_vector(model):
+    return reduce(add, (SearchVector(field, weight=weight, config=SEARCH_CONFIG) for field, weight in _fields(model)))
+
+
+def update_search_vectors(queryset):
+    """Recomputes the vectors of the rows in `queryset` with one UPDATE. Returns the number of rows."""
+    if not has_full_text_search():
+        return 0
+    model = queryset.model
+    vector = search_vector(model)
+    if any('__' in field for field, _ in _fields(model)):
+        # An UPDATE cannot join to related tables, so related columns are read through a subquery.
+        vector = Subquery(model._base_manager.filter(pk=OuterRef('pk')).annotate(vector=vector).values('vector'))
+    return queryset.order_by().update(search_vector=vector)
+
+
+def reindex(model, chunk_size=REINDEX_CHUNK_SIZE):
+    """Recomputes every vector of `model`, one primary-key range per statement. Returns the number of rows."""
+    total, last_pk = 0, None
+    rows = model._base_manager.order_by('pk')
+    while True:
+        chunk = rows.filter(pk__gt=last_pk) if last_pk is not None else rows
+        pks = list(chunk.values_list('pk', flat=True)[:chunk_size])
+        if not pks:
+            return total
+        total += update_search_vectors(model._base_manager.filter(pk__gte=pks[0], pk__lte=pks[-1]))
+        last_pk = pks[-1]
+
+
+def _terms(text):
+    # Whitespace-separated words without tsquery operators; each is parsed by the database
+    # like the indexed text, so "john@example.com" stays one term as it does in the vector.
+    return [term for term in (re.sub(r"[&|!():*<>'\\]", '', word) for word in text.lower().split()) if term]
+
+
+def search(queryset, text):
+    """
+    Filters `queryset` to the rows matching every word of `text`, each word also matching
+    as a prefix, and orders them by relevance. The rank is annotated as `rank`.
+    """
+    terms = _terms(text)
+    if not terms:
+        return queryset.none()
+
+    if has_full_text_search():
+        query = SearchQuery(' & '.join(f"'{term}':*" for term in terms), search_type='raw', config=SEARCH_CONFIG)
+        return queryset.filter(search_vector=query) \
+            .annotate(rank=SearchRank(F('search_vector'), query)).order_by('-rank', 'pk')
+
+    fields = _fields(queryset.model)
+    matches = reduce(and_, (reduce(or_, (Q(**{f'{field}__icontains': term}) for field, _ in fields)) for term in terms))
+    rank = ExpressionWrapper(reduce(add, (
+        Case(When(**{f'{field}__icontains': term}, then=Value(FALLBACK_WEIGHTS[weight])), default=Value(0.0))
+        for field, weight in fields for term in terms
+    )), output_field=FloatField())
+    return queryset.filter(matches).annotate(rank=rank).order_by('-rank', 'pk')
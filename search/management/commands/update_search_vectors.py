@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from organizations.models import Department, Employee
+from projects.models import Project
+from search.indexing import REINDEX_CHUNK_SIZE, has_full_text_search, reindex
+
+
+class Command(BaseCommand):
+    help = "Recomputes the full-text search vectors of employees, departments and projects."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=REINDEX_CHUNK_SIZE,
+                            help='Number of rows updated per statement.')
+
+    def handle(self, *args, **options):
+        if not has_full_text_search():
+            self.stdout.write('This database has no full-text search; search falls back to matching the fields.')
+            return
+        for model in (Employee, Department, Project):
+            updated = reindex(model, options['chunk_size'])
+            self.stdout.write(f'Updated {updated} {model._meta.verbose_name_plural}.')
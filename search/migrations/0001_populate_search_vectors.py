@@ -0,0 +1,20 @@
+from django.db import migrations
+
+
+def populate(apps, schema_editor):
+    from search.indexing import reindex
+
+    for label in ('organizations.Employee', 'organizations.Department', 'projects.Project'):
+        reindex(apps.get_model(label))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0008_search_vectors'),
+        ('projects', '0003_project_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+from rest_framework import serializers
+
+SEARCH_TYPES = ('employees', 'projects', 'departments')
+
+
+class SearchQuerySerializer(serializers.Serializer):
+    """Validates the query parameters of the search endpoint."""
+    q = serializers.CharField(max_length=200)
+    type = serializers.CharField(required=False, help_text='Comma-separated result types; all by default.')
+    limit = serializers.IntegerField(min_value=1, max_value=50, default=10)
+
+    def validate_type(self, value):
+        types = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = set(types) - set(SEARCH_TYPES)
+        if unknown:
+            raise serializers.ValidationError(f"Unknown types: {', '.join(sorted(unknown))}.")
+        return types
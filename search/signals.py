@@ -0,0 +1,29 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from organizations.models import Department, Employee
+from projects.models import Project
+from users.models import User
+from .indexing import update_search_vectors
+
+# Fields feeding each model's vector; saves that change none of them keep the old vector.
+INDEXED_FIELDS = {
+    Department: ('name',),
+    Employee: ('designation', 'user'),
+    Project: ('name', 'description'),
+}
+
+
+@receiver(post_save, sender=Department)
+@receiver(post_save, sender=Employee)
+@receiver(post_save, sender=Project)
+def update_search_vector(sender, instance, created, **kwargs):
+    if created or any(instance.has_changed(field) for field in INDEXED_FIELDS[sender]):
+        update_search_vectors(sender.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=User)
+def update_employee_search_vector(sender, instance, created, **kwargs):
+    # Employees are found by their user's name and email.
+    if not created and (instance.has_changed('username') or instance.has_changed('email')):
+        update_search_vectors(Employee.objects.filter(user=instance))
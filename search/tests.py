@@ -0,0 +1,60 @@
+from unittest import mock
+
+from django.urls import reverse
+
+from companyManagementSystem.testing import QueryBudgetTestCase
+from projects.models import Project
+from .views import SearchView
+
+
+class SearchTests(QueryBudgetTestCase):
+    def setUp(self):
+        self.authenticate(self.admin)
+        self.url = reverse('search')
+
+    def search(self, q, **params):
+        response = self.assertWithinQueryBudget(SearchView, 'get', 'get', self.url, {'q': q, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_ranked_results_of_every_type(self):
+        data = self.search('acme')
+        self.assertEqual(set(data), {'employees', 'projects', 'departments'})
+        self.assertEqual(len(data['employees']), 10)
+        self.assertEqual(len(data['departments']), 2)
+
+    def test_prefix_and_email_terms(self):
+        employee = self.org['employees'][3]
+        data = self.search(employee.user.email, type='employees')
+        self.assertEqual([row['id'] for row in data['employees']], [employee.pk])
+        data = self.search('acme-0-1', type='employees', limit=50)
+        self.assertIn(self.org['employees'][1].pk, [row['id'] for row in data['employees']])
+
+    def test_vectors_follow_changes(self):
+        user = self.org['employees'][5].user
+        user.username = 'Zephyrine'
+        user.save()
+        project = self.org['projects'][0]
+        project.description = 'Migrating the ledger'
+        project.save()
+
+        data = self.search('zeph ledger')
+        self.assertEqual(data['employees'], [])
+        self.assertEqual([row['id'] for row in self.search('zeph')['employees']], [self.org['employees'][5].pk])
+        self.assertEqual([row['id'] for row in self.search('ledger')['projects']], [project.pk])
+
+    def test_results_respect_role_scoping(self):
+        self.authenticate(self.employee)
+        data = self.search('acme', type='employees,projects', limit=50)
+        self.assertEqual([row['id'] for row in data['employees']], [self.employee.employee.pk])
+        assigned = set(Project.objects.filter(assigned_employees__user=self.employee).values_list('pk', flat=True))
+        self.assertEqual({row['id'] for row in data['projects']}, assigned)
+
+    def test_fallback_without_full_text_search(self):
+        with mock.patch('search.indexing.has_full_text_search', return_value=False):
+            data = self.search('engineer acme-1', type='employees', limit=50)
+        self.assertEqual(len(data['employees']), 12)
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get(self.url, {'q': 'x', 'type': 'companies'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url).status_code, 400)
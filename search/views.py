@@ -0,0 +1,35 @@
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from organizations.views import DepartmentViewSet, EmployeeViewSet
+from projects.views import ProjectViewSet
+from .indexing import search
+from .serializers import SEARCH_TYPES, SearchQuerySerializer
+
+
+class SearchView(APIView):
+    """
+    Ranked full-text search over employees (by user name, email and designation), projects
+    (by name and description) and departments (by name).
+
+    Each result type is searched within the queryset its viewset lists for the current user,
+    so role-based scoping applies, and is rendered with that viewset's serializer.
+    """
+    permission_classes = [IsAuthenticated]
+    viewsets = {'employees': EmployeeViewSet, 'projects': ProjectViewSet, 'departments': DepartmentViewSet}
+    query_budgets = {'get': 5}
+
+    def get(self, request):
+        params = SearchQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        text, limit = params.validated_data['q'], params.validated_data['limit']
+
+        results = {}
+        for name in params.validated_data.get('type') or SEARCH_TYPES:
+            view = self.viewsets[name](request=request, action='list', format_kwarg=None, args=(), kwargs={})
+            if not all(permission.has_permission(request, view) for permission in view.get_permissions()):
+                continue
+            matches = search(view.get_queryset(), text)[:limit]
+            results[name] = view.get_serializer(matches, many=True).data
+        return Response(results)
@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTAuthentication, JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from .tokens import ROLE_CLAIM, is_revoked
+
+
+class ScopedTokenUser(TokenUser):
+    """
+    The user of a request, read from the claims of its access token rather than the database.
+    Views needing the `User` row itself load it by `pk`.
+    """
+
+    @cached_property
+    def id(self):
+        return int(self.token[api_settings.USER_ID_CLAIM])
+
+    @cached_property
+    def role(self):
+        return self.token[ROLE_CLAIM]
+
+    @cached_property
+    def employee_id(self):
+        return self.token.get('employee_id')
+
+    @cached_property
+    def department_id(self):
+        return self.token.get('department_id')
+
+    @cached_property
+    def company_id(self):
+        return self.token.get('company_id')
+
+
+class ScopedJWTAuthentication(JWTStatelessUserAuthentication):
+    """
+    Authenticates requests from the claims of their access token, without a query.
+    Revoked tokens are rejected; tokens issued without scope claims fall back to loading the user.
+
+    Revocation markers only reach other processes through a shared cache, so without one
+    (`SHARED_CACHE`) the claims cannot be trusted to be current and the user is loaded instead.
+    """
+
+    def get_user(self, validated_token):
+        if is_revoked(validated_token):
+            raise InvalidToken('Token has been revoked.')
+        if ROLE_CLAIM not in validated_token or not settings.SHARED_CACHE:
+            return JWTAuthentication.get_user(self, validated_token)
+        return super().get_user(validated_token)
@@ -0,0 +1,146 @@
+"""
+Refresh token blacklist lookups that stay off the database, and purging of expired tokens.
+
+`BlacklistedToken` remains the source of truth. Each process keeps a Bloom filter of the
+blacklisted JTIs: a JTI the filter has never seen is not blacklisted, and only the rare
+"maybe" is confirmed with a query. Blacklisting bumps a version token in the shared cache;
+a process seeing a new version loads the rows added since its last sync, so every check costs
+one cache lookup however large the tables grow.
+
+Blacklisting transactions commit out of id order, so "added since the last sync" cannot be
+read off the highest id seen. Each sync instead moves a committed watermark up to the newest
+row blacklisted more than `SYNC_OVERLAP` ago, by which time its transaction (and that of every
+lower id) has committed, and the next sync re-reads everything above it.
+
+The version token only reaches other processes through a shared cache (`SHARED_CACHE`).
+Without one, a filter would never learn of tokens blacklisted by another process, so every
+check queries the table instead.
+"""
+import hashlib
+import math
+import threading
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from companyManagementSystem.cache import invalidate, namespace_version
+
+BLACKLIST_NAMESPACE = 'users.token-blacklist'
+FILTER_CAPACITY = 100_000
+FILTER_ERROR_RATE = 0.01
+# Longer than any blacklisting transaction runs, plus the clock skew between app servers.
+SYNC_OVERLAP = timedelta(minutes=5)
+PURGE_BATCH_SIZE = 5000
+
+
+class BloomFilter:
+    """Set membership with false positives at about `error_rate` up to `capacity` items, and no false negatives."""
+
+    def __init__(self, capacity, error_rate=FILTER_ERROR_RATE):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'big'), int.from_bytes(digest[8:], 'big') | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, item):
+        added = False
+        for position in self._positions(item):
+            mask = 1 << (position & 7)
+            added |= not self.bits[position >> 3] & mask
+            self.bits[position >> 3] |= mask
+        # Items already present (or colliding entirely with others) do not count twice.
+        self.count += added
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class _BlacklistFilter:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.filter = None
+        self.version = None
+        # Every row with an id up to this one is committed and in the filter.
+        self.watermark = 0
+
+    def _load(self, queryset):
+        # Rows blacklisted before the cutoff have committed by now, as have all rows with lower ids.
+        cutoff = timezone.now() - SYNC_OVERLAP
+        rows = queryset.values_list('pk', 'token__jti', 'blacklisted_at').iterator()
+        for row_id, jti, blacklisted_at in rows:
+            self.filter.add(jti)
+            if blacklisted_at < cutoff:
+                self.watermark = max(self.watermark, row_id)
+
+    def _rebuild(self):
+        live = BlacklistedToken.objects.filter(token__expires_at__gt=timezone.now())
+        self.filter = BloomFilter(max(FILTER_CAPACITY, 2 * live.count()))
+        self.watermark = 0
+        self._load(live)
+
+    def sync(self):
+        version = namespace_version(BLACKLIST_NAMESPACE)
+        if version == self.version:
+            return
+        with self.lock:
+            if version == self.version:
+                return
+            if self.filter is None:
+                self._rebuild()
+            else:
+                self._load(BlacklistedToken.objects.filter(pk__gt=self.watermark))
+                if self.filter.count > self.filter.capacity:
+                    # Past capacity the error rate climbs; start over from the live rows.
+                    self._rebuild()
+            self.version = version
+
+    def might_contain(self, jti):
+        self.sync()
+        return jti in self.filter
+
+
+_blacklist = _BlacklistFilter()
+
+
+def is_blacklisted(jti):
+    """Whether the refresh token `jti` is blacklisted, querying only when the filter cannot rule it out."""
+    if settings.SHARED_CACHE and not _blacklist.might_contain(jti):
+        return False
+    return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+
+def blacklist_changed():
+    """Makes every process load the blacklist rows added since its last sync."""
+    invalidate(BLACKLIST_NAMESPACE)
+
+
+def purge_expired_tokens(batch_size=PURGE_BATCH_SIZE, before=None):
+    """
+    Deletes outstanding tokens (and their blacklist entries) that expired before `before`,
+    `batch_size` rows per transaction, so neither table stays locked for long.
+    Yields the number of tokens deleted by each batch.
+    """
+    before = before or timezone.now()
+    while True:
+        with transaction.atomic():
+            # Tokens expire in about the order they were issued, so walking the primary key
+            # finds the expired ones without an index on `expires_at`.
+            ids = list(
+                OutstandingToken.objects.filter(expires_at__lt=before).order_by('pk')
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if not ids:
+                return
+            BlacklistedToken.objects.filter(token_id__in=ids).delete()
+            OutstandingToken.objects.filter(pk__in=ids).delete()
+        yield len(ids)
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from users.blacklist import PURGE_BATCH_SIZE, purge_expired_tokens
+
+
+class Command(BaseCommand):
+    help = "Deletes expired outstanding refresh tokens and their blacklist entries, in short batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=PURGE_BATCH_SIZE,
+                            help='Number of tokens deleted per transaction.')
+        parser.add_argument('--pause', type=float, default=0,
+                            help='Seconds to sleep between batches, to leave room for other writers.')
+
+    def handle(self, *args, **options):
+        total = 0
+        for deleted in purge_expired_tokens(options['batch_size']):
+            total += deleted
+            if options['pause']:
+                time.sleep(options['pause'])
+        self.stdout.write(f'Purged {total} expired tokens.')
@@ -0,0 +1,64 @@
+"""
+Bulk offboarding: deactivating users by the thousand in a constant number of queries.
+
+Users are matched by id or email, deactivated with one `UPDATE`, and their live refresh tokens
+blacklisted with one `INSERT`; their access tokens are revoked through the cache. Optionally
+their project assignments are dropped with one `DELETE` on the through table. Everything runs
+in one transaction. None of these writes go through `save()`, so this module does the work
+the signals would otherwise have done.
+"""
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from projects.models import Project
+from .blacklist import blacklist_changed
+from .models import User
+from .tokens import revoke_user_tokens
+
+
+def offboard_users(user_ids=(), emails=(), remove_from_projects=False):
+    """
+    Deactivates the users with the given ids or emails. Returns a summary: the ids deactivated,
+    those that were already inactive, the ids and emails matching no user, the number of
+    refresh tokens blacklisted and of project assignments removed.
+    """
+    user_ids, emails = set(user_ids), set(emails)
+    now = timezone.now()
+    with transaction.atomic():
+        users = list(
+            User.objects.filter(Q(pk__in=user_ids) | Q(email__in=emails))
+            .select_for_update().values_list('pk', 'email', 'is_active')
+        )
+        matched = {pk for pk, _, _ in users}
+        deactivated = sorted(pk for pk, _, is_active in users if is_active)
+        if deactivated:
+            User.objects.filter(pk__in=deactivated).update(is_active=False, updated_at=now)
+
+        live_tokens = OutstandingToken.objects.filter(
+            user_id__in=matched, expires_at__gt=now, blacklistedtoken__isnull=True,
+        ).values_list('pk', flat=True) if matched else []
+        blacklisted = BlacklistedToken.objects.bulk_create(
+            [BlacklistedToken(token_id=token_id) for token_id in live_tokens], ignore_conflicts=True,
+        )
+
+        assignments_removed = 0
+        if remove_from_projects and matched:
+            assignments = Project.assigned_employees.through.objects.filter(employee__user_id__in=matched)
+            # Exports sync projects by `updated_at`, and their assignee lists are about to change.
+            Project.objects.filter(pk__in=assignments.values('project_id')).update(updated_at=now)
+            assignments_removed, _ = assignments.delete()
+
+        revoke_user_tokens(*matched)
+        if blacklisted:
+            blacklist_changed()
+
+    return {
+        'deactivated': deactivated,
+        'already_inactive': sorted(pk for pk, _, is_active in users if not is_active),
+        'unknown_ids': sorted(user_ids - matched),
+        'unknown_emails': sorted(emails - {email for _, email, _ in users}),
+        'tokens_blacklisted': len(blacklisted),
+        'assignments_removed': assignments_removed,
+    }
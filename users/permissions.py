@@ -1,17 +1,18 @@
 from rest_framework.permissions import BasePermission, SAFE_METHODS
 from .models import User
+from .scope import get_scope
 
 class IsAdmin(BasePermission):
     def has_permission(self, request, view):
-        return bool(request.user and request.user.is_authenticated and request.user.role == User.Role.ADMIN)
+        return get_scope(request).role == User.Role.ADMIN
 
 class IsManager(BasePermission):
     def has_permission(self, request, view):
-        return bool(request.user and request.user.is_authenticated and request.user.role ==User.Role.MANAGER)
+        return get_scope(request).role == User.Role.MANAGER
 
 class IsEmployee(BasePermission):
     def has_permission(self, request, view):
-        return bool(request.user and request.user.is_authenticated and request.user.role == User.Role.EMPLOYEE)
+        return get_scope(request).role == User.Role.EMPLOYEE
 
 class IsReadOnly(BasePermission):
     def has_permission(self, request, view):
@@ -29,8 +30,25 @@ class IsOwnerOrManagerOrAdmin(BasePermission):
             return True
 
         # Write permissions are only allowed to the employee themselves, their manager, or an admin.
-        is_admin = request.user.role == User.Role.ADMIN
-        is_manager = request.user.role == User.Role.MANAGER and obj.employee.department == request.user.employee.department
-        is_owner = obj.employee.user == request.user
+        # Compared by id, so only the object's own employee row is read, never its user.
+        scope = get_scope(request)
+        if scope.role == User.Role.ADMIN:
+            return True
+        if scope.employee_id is None:
+            return False
+        is_manager = scope.role == User.Role.MANAGER and obj.employee.department_id == scope.department_id
+        is_owner = obj.employee_id == scope.employee_id
+
+        return is_manager or is_owner
 
-        return is_admin or is_manager or is_owner
+class IsCompanyMember(BasePermission):
+    """
+    Object-level permission to only allow users employed by a company to access it.
+    Assumes the model instance is a Company.
+    """
+    def has_permission(self, request, view):
+        return bool(request.user and request.user.is_authenticated)
+
+    def has_object_permission(self, request, view, obj):
+        company_id = get_scope(request).company_id
+        return company_id is not None and company_id == obj.pk
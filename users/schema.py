@@ -0,0 +1,5 @@
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+
+
+class ScopedJWTScheme(SimpleJWTScheme):
+    target_class = 'users.authentication.ScopedJWTAuthentication'
@@ -0,0 +1,50 @@
+"""
+The caller's authorization scope: role, employee, department and company, as IDs.
+
+Permission classes and queryset scoping read it through `get_scope(request)`, which resolves
+it once per request and memoizes it on the request. Requests authenticated with a scoped
+token read every id from its claims, without a query. Otherwise the role comes from the user
+and the employee's ids are loaded on first use from the cached employee-by-user lookup.
+"""
+from django.utils.functional import cached_property
+
+from organizations.caching import employee_for_user
+from .authentication import ScopedTokenUser
+
+
+class Scope:
+    def __init__(self, user):
+        authenticated = bool(user and user.is_authenticated)
+        self.user = user if authenticated else None
+        self.role = user.role if authenticated else None
+        self.user_id = user.pk if authenticated else None
+        if isinstance(user, ScopedTokenUser):
+            self.employee_id, self.department_id, self.company_id = \
+                user.employee_id, user.department_id, user.company_id
+
+    @cached_property
+    def _employee(self):
+        return employee_for_user(self.user)
+
+    @cached_property
+    def employee_id(self):
+        return self._employee.pk if self._employee else None
+
+    @cached_property
+    def department_id(self):
+        return self._employee.department_id if self._employee else None
+
+    @cached_property
+    def company_id(self):
+        return self._employee.company_id if self._employee else None
+
+
+def get_scope(request):
+    """Returns the scope of the user making `request`, resolving it on first use."""
+    # Memoized on the underlying HttpRequest, which every DRF Request wrapping it shares.
+    holder = getattr(request, '_request', request)
+    user = request.user
+    scope = getattr(holder, '_scope', None)
+    if scope is None or scope.user_id != getattr(user, 'pk', None):
+        scope = holder._scope = Scope(user)
+    return scope
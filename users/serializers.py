@@ -1,9 +1,14 @@
 from users.models import User
 from rest_framework import serializers
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
 from django.contrib.auth.password_validation import validate_password as django_validate_password
 from django.core.exceptions import ValidationError
 
+from companyManagementSystem.fieldsets import SparseFieldsetsMixin
+from .tokens import ScopedAccessToken, ScopedRefreshToken, revoke_token, scope_claims
+
 
 class RegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
@@ -32,12 +37,35 @@ class RegisterSerializer(serializers.ModelSerializer):
 
 
 
+class ScopedTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = ScopedRefreshToken
+
+
+class ScopedTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Issues access tokens whose scope claims are read afresh, not copied from the refresh token.
+    Rotation and blacklisting after rotation are left to simplejwt.
+    """
+    token_class = ScopedRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        user = User.objects.filter(pk=refresh[api_settings.USER_ID_CLAIM]).first()
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+        data = super().validate(attrs)
+        access = ScopedAccessToken(data['access'])
+        access.payload.update(scope_claims(user))
+        data['access'] = str(access)
+        return data
+
+
 class LogoutSerializer(serializers.Serializer):
     refresh = serializers.CharField(write_only=True)
 
     def validate_refresh(self, value):
         try:
-            token = RefreshToken(value)
+            token = ScopedRefreshToken(value)
             token.blacklist()  # Blacklist the refresh token
         except Exception as e:
             raise serializers.ValidationError("Invalid or expired refresh token.")
@@ -45,14 +73,18 @@ class LogoutSerializer(serializers.Serializer):
         return value
 
     def create(self, validated_data):
+        # The access token of the request stops working as well, not only the refresh token.
+        request = self.context['request']
+        if request.auth is not None:
+            revoke_token(request.auth)
         return validated_data
 
-class RetrieveProfileSerializer(serializers.ModelSerializer):
+class RetrieveProfileSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = [ 'id' ,'email','username','role']
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = [ 'id' ,'email','username','role']
@@ -80,3 +112,14 @@ class RemoveUserSerializer(serializers.ModelSerializer):
         user.save()
         return user
 
+
+
+class OffboardSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, default=list, max_length=10000)
+    emails = serializers.ListField(child=serializers.EmailField(), required=False, default=list, max_length=10000)
+    remove_from_projects = serializers.BooleanField(default=False)
+
+    def validate(self, data):
+        if not data['ids'] and not data['emails']:
+            raise serializers.ValidationError("Provide the ids or emails of the users to offboard.")
+        return data
@@ -0,0 +1,26 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from .blacklist import blacklist_changed
+from .models import User
+from .tokens import revoke_user_tokens
+
+
+@receiver(post_save, sender=User)
+def revoke_tokens_on_user_save(sender, instance, created, **kwargs):
+    # Tokens carry the role, and a deactivated user must lose access before they expire.
+    if not created and (instance.has_changed('role') or instance.has_changed('is_active')):
+        revoke_user_tokens(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def revoke_tokens_on_user_delete(sender, instance, **kwargs):
+    revoke_user_tokens(instance.pk)
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def sync_blacklist_filters(sender, instance, created, **kwargs):
+    # Covers logouts and tokens blacklisted through the admin alike.
+    if created:
+        blacklist_changed()
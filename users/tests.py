@@ -1,3 +1,305 @@
-from django.test import TestCase
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.db import connection
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from django.urls import reverse
+from rest_framework_simplejwt import serializers as jwt_serializers
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from companyManagementSystem.testing import ROWS_PER_PAGE, QueryBudgetTestCase
+from projects.models import Project
+from .models import User
+from .blacklist import SYNC_OVERLAP, BloomFilter, _BlacklistFilter, blacklist_changed, purge_expired_tokens
+from .permissions import IsAdmin, IsCompanyMember, IsOwnerOrManagerOrAdmin
+from .scope import get_scope
+from .tokens import ScopedRefreshToken
+from .views import LoginView, LogoutView, OffboardView, ProfileView, RefreshView, RegisterView
+
+
+class AuthQueryBudgetTests(QueryBudgetTestCase):
+    def test_register(self):
+        data = {'email': 'someone@example.com', 'username': 'someone', 'password': 'a-Long-passw0rd'}
+        response = self.assertWithinQueryBudget(RegisterView, 'post', 'post', reverse('register'), data)
+        self.assertEqual(response.status_code, 201)
+
+    def test_login(self):
+        user = User.objects.create(email='login@example.com', username='login', role=User.Role.EMPLOYEE)
+        user.set_password('a-Long-passw0rd')
+        user.save()
+        data = {'email': 'login@example.com', 'password': 'a-Long-passw0rd'}
+        response = self.assertWithinQueryBudget(LoginView, 'post', 'post', reverse('login'), data)
+        self.assertEqual(response.status_code, 200)
+
+    def test_refresh(self):
+        data = {'refresh': str(RefreshToken.for_user(self.employee))}
+        response = self.assertWithinQueryBudget(RefreshView, 'post', 'post', reverse('refresh'), data)
+        self.assertEqual(response.status_code, 200)
+
+    def test_logout(self):
+        self.authenticate(self.employee)
+        data = {'refresh': str(RefreshToken.for_user(self.employee))}
+        response = self.assertWithinQueryBudget(LogoutView, 'post', 'post', reverse('logout'), data)
+        self.assertEqual(response.status_code, 201)
+
+
+class ProfileQueryBudgetTests(QueryBudgetTestCase):
+    def setUp(self):
+        self.authenticate(self.employee)
+
+    def test_get(self):
+        response = self.assertWithinQueryBudget(ProfileView, 'get', 'get', reverse('profile'))
+        self.assertEqual(response.data['email'], self.employee.email)
+
+    def test_put(self):
+        response = self.assertWithinQueryBudget(ProfileView, 'put', 'put', reverse('profile'), {'username': 'renamed'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_patch(self):
+        response = self.assertWithinQueryBudget(ProfileView, 'patch', 'patch', reverse('profile'), {'username': 'renamed'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_delete(self):
+        response = self.assertWithinQueryBudget(ProfileView, 'delete', 'delete', reverse('profile'))
+        self.assertEqual(response.status_code, 204)
+
+
+class ScopeTests(QueryBudgetTestCase):
+    def request(self, user, method='get'):
+        request = getattr(RequestFactory(), method)('/')
+        request.user = user
+        return request
+
+    def test_resolved_once_per_request(self):
+        employee = self.org['employees'][0]
+        request = self.request(self.employee)
+        with self.assertNumQueries(1):
+            scope = get_scope(request)
+            self.assertEqual(
+                (scope.role, scope.user_id, scope.employee_id, scope.department_id, scope.company_id),
+                (User.Role.EMPLOYEE, self.employee.pk, employee.pk, employee.department_id, employee.company_id),
+            )
+            self.assertIs(get_scope(request), scope)
+            self.assertTrue(IsCompanyMember().has_object_permission(request, None, self.org['company']))
+
+    def test_role_checks_do_not_load_the_employee(self):
+        with self.assertNumQueries(0):
+            self.assertTrue(IsAdmin().has_permission(self.request(self.admin), None))
+
+    def test_object_permissions_compare_ids(self):
+        own = self.org['employees'][0]
+        other_department = next(e for e in self.org['employees'] if e.department_id != own.department_id)
+        permission = IsOwnerOrManagerOrAdmin()
+
+        def allowed(user, employee):
+            obj = SimpleNamespace(employee_id=employee.pk, employee=SimpleNamespace(department_id=employee.department_id))
+            return permission.has_object_permission(self.request(user, 'patch'), None, obj)
+
+        self.assertTrue(allowed(self.employee, own))
+        self.assertFalse(allowed(self.employee, other_department))
+        self.assertTrue(allowed(self.manager, own))
+        self.assertFalse(allowed(self.manager, other_department))
+        self.assertTrue(allowed(self.admin, other_department))
+
+
+class ScopedTokenTests(QueryBudgetTestCase):
+    def login(self, user):
+        refresh = ScopedRefreshToken.for_user(user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'JWT {refresh.access_token}')
+        return refresh
+
+    def test_claims(self):
+        employee = self.org['employees'][0]
+        access = ScopedRefreshToken.for_user(self.employee).access_token
+        self.assertEqual(
+            {claim: access[claim] for claim in ('role', 'employee_id', 'department_id', 'company_id')},
+            {'role': User.Role.EMPLOYEE, 'employee_id': employee.pk,
+             'department_id': employee.department_id, 'company_id': employee.company_id},
+        )
+
+    def test_authenticated_without_queries(self):
+        self.login(self.manager)
+        url = reverse('department-list')
+        self.client.get(url)
+        with self.assertNumQueries(0):  # A cached response, so only authentication could query.
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_tokens_without_claims_load_the_user(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'JWT {AccessToken.for_user(self.employee)}')
+        self.assertEqual(self.client.get(reverse('profile')).data['email'], self.employee.email)
+
+    def test_role_change_revokes(self):
+        self.login(self.employee)
+        self.assertEqual(self.client.get(reverse('profile')).status_code, 200)
+        self.employee.role = User.Role.MANAGER
+        self.employee.save()
+        self.assertEqual(self.client.get(reverse('profile')).status_code, 401)
+
+    def test_department_change_revokes_and_refresh_reads_new_claims(self):
+        refresh = self.login(self.employee)
+        employee = self.org['employees'][0]
+        employee.department = self.org['departments'][1]
+        employee.save()
+        self.assertEqual(self.client.get(reverse('profile')).status_code, 401)
+
+        response = self.client.post(reverse('refresh'), {'refresh': str(refresh)})
+        self.assertEqual(AccessToken(response.data['access'])['department_id'], self.org['departments'][1].pk)
+
+    def test_rotation_blacklists_the_used_refresh_token(self):
+        refresh = self.login(self.employee)
+        # simplejwt binds its settings at import, so they are patched where the refresh serializer reads them.
+        with mock.patch.multiple(jwt_serializers.api_settings, ROTATE_REFRESH_TOKENS=True, BLACKLIST_AFTER_ROTATION=True):
+            response = self.client.post(reverse('refresh'), {'refresh': str(refresh)})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(AccessToken(response.data['access'])['employee_id'], self.org['employees'][0].pk)
+            self.assertNotEqual(response.data['refresh'], str(refresh))
+            self.assertEqual(self.client.post(reverse('refresh'), {'refresh': str(refresh)}).status_code, 401)
+            rotated = self.client.post(reverse('refresh'), {'refresh': response.data['refresh']})
+            self.assertEqual(rotated.status_code, 200)
+
+    def test_deactivation_revokes(self):
+        refresh = self.login(self.employee)
+        self.assertEqual(self.client.delete(reverse('profile')).status_code, 204)
+        self.assertEqual(self.client.get(reverse('profile')).status_code, 401)
+        self.assertEqual(self.client.post(reverse('refresh'), {'refresh': str(refresh)}).status_code, 401)
+
+    @override_settings(SHARED_CACHE=False)
+    def test_claims_are_not_trusted_without_a_shared_cache(self):
+        self.login(self.employee)
+        self.assertEqual(self.client.get(reverse('profile')).status_code, 200)
+        # Deactivated by another process, whose revocation marker never reaches this one's cache.
+        User.objects.filter(pk=self.employee.pk).update(is_active=False)
+        self.assertEqual(self.client.get(reverse('profile')).status_code, 401)
+
+    def test_logout_revokes_the_access_token(self):
+        refresh = self.login(self.employee)
+        self.assertEqual(self.client.post(reverse('logout'), {'refresh': str(refresh)}).status_code, 201)
+        self.assertEqual(self.client.get(reverse('profile')).status_code, 401)
+
+
+class TokenBlacklistTests(QueryBudgetTestCase):
+    def refresh(self, token):
+        return self.client.post(reverse('refresh'), {'refresh': str(token)})
+
+    def test_logout_blacklists(self):
+        refresh = ScopedRefreshToken.for_user(self.employee)
+        self.authenticate(self.employee)
+        self.client.post(reverse('logout'), {'refresh': str(refresh)})
+        self.assertEqual(self.refresh(refresh).status_code, 401)
+
+    def test_tokens_blacklisted_elsewhere_are_rejected(self):
+        refresh = ScopedRefreshToken.for_user(self.employee)
+        self.assertEqual(self.refresh(refresh).status_code, 200)
+        BlacklistedToken.objects.create(token=OutstandingToken.objects.get(jti=refresh['jti']))
+        self.assertEqual(self.refresh(refresh).status_code, 401)
+
+    def test_refresh_does_not_query_the_blacklist(self):
+        self.refresh(ScopedRefreshToken.for_user(self.employee))  # Syncs the filter.
+        refresh = ScopedRefreshToken.for_user(self.manager)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.refresh(refresh).status_code, 200)
+        self.assertFalse([query for query in queries if 'token_blacklist' in query['sql']])
+
+    @override_settings(SHARED_CACHE=False)
+    def test_refresh_queries_the_blacklist_without_a_shared_cache(self):
+        self.refresh(ScopedRefreshToken.for_user(self.employee))
+        refresh = ScopedRefreshToken.for_user(self.manager)
+        # Blacklisted by another process, whose version token never reaches this one's cache.
+        with mock.patch('users.blacklist._BlacklistFilter.sync'):
+            BlacklistedToken.objects.create(token=OutstandingToken.objects.get(jti=refresh['jti']))
+            self.assertEqual(self.refresh(refresh).status_code, 401)
+
+    def test_sync_sees_rows_committed_out_of_id_order(self):
+        blacklist = _BlacklistFilter()
+        expires_at = timezone.now() + timedelta(days=1)
+
+        def blacklist_token(jti, pk):
+            token = OutstandingToken.objects.create(jti=jti, token='', expires_at=expires_at)
+            row = BlacklistedToken.objects.create(pk=pk, token=token)
+            blacklist_changed()
+            blacklist.sync()
+            return row
+
+        # A large batch took its ids first but committed after a later, higher id was synced.
+        base = (BlacklistedToken.objects.order_by('-pk').values_list('pk', flat=True).first() or 0) + 1
+        high = blacklist_token('high', base + 5000)
+        blacklist_token('low', base)
+        self.assertTrue(blacklist.might_contain('high'))
+        self.assertTrue(blacklist.might_contain('low'))
+
+        # Once rows are old enough to have committed, the watermark moves past them.
+        self.assertEqual(blacklist.watermark, 0)
+        BlacklistedToken.objects.update(blacklisted_at=timezone.now() - 2 * SYNC_OVERLAP)
+        blacklist_token('newer', base + 6000)
+        self.assertEqual(blacklist.watermark, high.pk)
+        self.assertTrue(blacklist.might_contain('newer'))
+
+    def test_bloom_filter(self):
+        bloom = BloomFilter(1000)
+        for i in range(1000):
+            bloom.add(f'in-{i}')
+        self.assertTrue(all(f'in-{i}' in bloom for i in range(1000)))
+        false_positives = sum(f'out-{i}' in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+    def test_purge_expired_tokens(self):
+        now = timezone.now()
+        expired = [
+            OutstandingToken.objects.create(jti=f'expired-{i}', token='', expires_at=now - timedelta(days=1))
+            for i in range(5)
+        ]
+        live = OutstandingToken.objects.create(jti='live', token='', expires_at=now + timedelta(days=1))
+        BlacklistedToken.objects.create(token=expired[0])
+        BlacklistedToken.objects.create(token=live)
+
+        self.assertEqual(list(purge_expired_tokens(batch_size=2)), [2, 2, 1])
+        self.assertEqual(list(OutstandingToken.objects.values_list('jti', flat=True)), ['live'])
+        self.assertEqual(BlacklistedToken.objects.get().token_id, live.pk)
+
+
+class OffboardTests(QueryBudgetTestCase):
+    def setUp(self):
+        self.authenticate(self.admin)
+
+    def offboard(self, **data):
+        return self.assertWithinQueryBudget(OffboardView, 'post', 'post', reverse('offboard'), data)
+
+    def test_offboard(self):
+        first, second = (employee.user for employee in self.org['employees'][:2])
+        refresh = ScopedRefreshToken.for_user(first)
+        User.objects.filter(pk=second.pk).update(is_active=False)
+
+        response = self.offboard(ids=[first.pk, 0], emails=[second.email, 'nobody@example.com'],
+                                 remove_from_projects=True)
+        self.assertEqual(response.data, {
+            'deactivated': [first.pk], 'already_inactive': [second.pk], 'unknown_ids': [0],
+            'unknown_emails': ['nobody@example.com'], 'tokens_blacklisted': 1,
+            'assignments_removed': 2 * ROWS_PER_PAGE,
+        })
+        self.assertFalse(User.objects.get(pk=first.pk).is_active)
+        self.assertTrue(BlacklistedToken.objects.filter(token__jti=refresh['jti']).exists())
+        self.assertFalse(Project.assigned_employees.through.objects.filter(employee__user__in=[first, second]).exists())
+
+        self.authenticate(first)
+        self.assertEqual(self.client.get(reverse('profile')).status_code, 401)
+
+    def test_queries_do_not_grow_with_the_batch(self):
+        def queries(employees):
+            with CaptureQueriesContext(connection) as captured:
+                self.offboard(ids=[employee.user_id for employee in employees], remove_from_projects=True)
+            return len(captured)
+
+        employees = self.org['employees']
+        self.assertEqual(queries(employees[:2]), queries(employees[2:]))
+
+    def test_requires_ids_or_emails(self):
+        self.assertEqual(self.offboard().status_code, 400)
+
+    def test_admins_only(self):
+        self.authenticate(self.manager)
+        self.assertEqual(self.client.post(reverse('offboard'), {'ids': [self.employee.pk]}).status_code, 403)
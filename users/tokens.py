@@ -0,0 +1,100 @@
+"""
+JWTs carrying the caller's scope as signed claims, and their revocation.
+
+Access tokens embed `role`, `employee_id`, `department_id` and `company_id`, so requests are
+authenticated and scoped without loading the user (see `users.authentication`). Claims are
+issued at login and re-read from the database on every refresh.
+
+Revocation is checked against the cache, with one lookup per request:
+
+- `revoke_user_tokens(user_id)` rejects every token the user was issued before now. It runs
+  when a user's role or active flag changes, or their employee profile moves, and its marker
+  outlives the access token lifetime, after which older tokens have expired anyway.
+- `revoke_token(token)` rejects one token until it expires, as logout does.
+
+Were the cache lost, revoked tokens would be accepted again until they expire, so the window
+is bounded by `ACCESS_TOKEN_LIFETIME` either way.
+
+Markers set by one process are only seen by the others through a shared cache. Without one
+(`SHARED_CACHE`), requests are authenticated by loading the user, so role, active flag and
+employee profile are read from the database; a logged-out access token is then only rejected
+by the process that handled the logout, and by the others once it expires.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from organizations.caching import employee_for_user
+from .blacklist import is_blacklisted
+
+ROLE_CLAIM = 'role'
+SCOPE_CLAIMS = ('employee_id', 'department_id', 'company_id')
+
+
+def scope_claims(user):
+    employee = employee_for_user(user)
+    return {
+        ROLE_CLAIM: user.role,
+        'employee_id': employee.pk if employee else None,
+        'department_id': employee.department_id if employee else None,
+        'company_id': employee.company_id if employee else None,
+    }
+
+
+class ScopedClaimsMixin:
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token.payload.update(scope_claims(user))
+        return token
+
+
+class ScopedAccessToken(ScopedClaimsMixin, AccessToken):
+    pass
+
+
+class ScopedRefreshToken(ScopedClaimsMixin, RefreshToken):
+    access_token_class = ScopedAccessToken
+
+    def check_blacklist(self):
+        if is_blacklisted(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_('Token is blacklisted'))
+
+
+def _user_key(user_id):
+    return f'auth:revoked:user:{user_id}'
+
+
+def _token_key(jti):
+    return f'auth:revoked:token:{jti}'
+
+
+def revoke_user_tokens(*user_ids):
+    """Rejects every token issued to the given users until now."""
+    def revoke():
+        # `iat` has whole seconds, so a token issued later in the same second as the
+        # revocation is rejected as well; refreshing a second later gets a working one.
+        now = time.time()
+        timeout = int(api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()) + 1
+        cache.set_many({_user_key(user_id): now for user_id in user_ids if user_id is not None}, timeout)
+
+    revoke()
+    # Again once committed, so a refresh racing the transaction cannot keep the old claims.
+    transaction.on_commit(revoke, robust=True)
+
+
+def revoke_token(token):
+    """Rejects `token` until it expires."""
+    timeout = max(int(token['exp'] - time.time()), 1)
+    cache.set(_token_key(token[api_settings.JTI_CLAIM]), True, timeout)
+
+
+def is_revoked(token):
+    user_key, token_key = _user_key(token[api_settings.USER_ID_CLAIM]), _token_key(token[api_settings.JTI_CLAIM])
+    markers = cache.get_many([user_key, token_key])
+    return token_key in markers or token['iat'] < markers.get(user_key, 0)
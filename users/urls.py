@@ -1,19 +1,19 @@
 from django.urls import path
 
 from users.views import (
+    LoginView,
     LogoutView,
+    OffboardView,
+    RefreshView,
     RegisterView,
     ProfileView,
 )
-from rest_framework_simplejwt.views import (
-    TokenObtainPairView,
-    TokenRefreshView,
-)
 
 urlpatterns = [
     path("profile/", ProfileView.as_view(), name="profile"),
     path("register/", RegisterView.as_view(), name="register"),
     path("logout/", LogoutView.as_view(), name="logout"),
-    path("login/", TokenObtainPairView.as_view(), name="login"),
-    path("refresh/", TokenRefreshView.as_view(), name="refresh"),
+    path("login/", LoginView.as_view(), name="login"),
+    path("refresh/", RefreshView.as_view(), name="refresh"),
+    path("offboard/", OffboardView.as_view(), name="offboard"),
 ]
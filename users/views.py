@@ -3,8 +3,13 @@ from rest_framework.generics import CreateAPIView
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from users.models import User
+from users.offboarding import offboard_users
+from users.permissions import IsAdmin
 from users.serializers import (
     LogoutSerializer,
+    OffboardSerializer,
     RegisterSerializer,
     RetrieveProfileSerializer,
     UpdateProfileSerializer,
@@ -13,38 +18,81 @@ from users.serializers import (
 
 class RegisterView(CreateAPIView):
     serializer_class = RegisterSerializer
+    query_budgets = {'post': 2}
+
+
+class LoginView(TokenObtainPairView):
+    # Tokens carry the scope claims, read from the user's employee profile.
+    query_budgets = {'post': 3}
+
+
+class RefreshView(TokenRefreshView):
+    # Reads the user and their employee profile; simplejwt reads the user once more before
+    # issuing the tokens. The blacklist is checked against an in-memory filter, which runs one
+    # query to catch up after tokens were blacklisted.
+    query_budgets = {'post': 4}
 
 
 class LogoutView(CreateAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = LogoutSerializer
+    # Includes loading the blacklist rows added since this process last synced its filter.
+    query_budgets = {'post': 8}
 
 
 class ProfileView(APIView):
     permission_classes = [IsAuthenticated]
+    # Renaming a user looks up their employee profile to invalidate the company's cached tree
+    # and updates the employee's search vector.
+    query_budgets = {'get': 1, 'put': 4, 'patch': 4, 'delete': 2}
+
+    def get_user(self):
+        # Requests authenticated from token claims carry no `User` row.
+        user = self.request.user
+        return user if isinstance(user, User) else User.objects.get(pk=user.pk)
 
     def get(self, request):
-        user = request.user
+        user = self.get_user()
         serializer = RetrieveProfileSerializer(user)
         return Response(serializer.data)
 
     def put(self, request):
-        user = request.user
+        user = self.get_user()
         serializer = UpdateProfileSerializer(user, data=request.data)
         serializer.is_valid(raise_exception=True)
         serializer.save()
         return Response(serializer.data)
 
     def patch(self, request):
-        user = request.user
+        user = self.get_user()
         serializer = UpdateProfileSerializer(user, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
         serializer.save()
         return Response(serializer.data)
 
     def delete(self, request):
-        user = request.user
+        user = self.get_user()
         user.is_active = False
         user.save()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+
+
+class OffboardView(APIView):
+    """
+    Deactivates users in bulk, by `ids` and/or `emails`, and blacklists their tokens.
+    With `remove_from_projects`, their project assignments are removed as well.
+    """
+    permission_classes = [IsAdmin]
+    serializer_class = OffboardSerializer
+    # Constant however many users are offboarded.
+    query_budgets = {'post': 8}
+
+    def post(self, request):
+        serializer = OffboardSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        summary = offboard_users(
+            serializer.validated_data['ids'], serializer.validated_data['emails'],
+            remove_from_projects=serializer.validated_data['remove_from_projects'],
+        )
+        return Response(summary)